@@ -12,13 +12,20 @@ import os
 #Add utils to path
 sys.path.append(os.path.dirname(__file__))
 
-from utils.data_generator import generate_demo_data
+from utils.data_generator import generate_demo_data, generate_demo_categories
+from utils.taxonomy import read_category_mapping
+from utils.profiling import build_dataset_profile
+from utils.columnar import to_dtype_backend
+from utils.validation import validate_csv
 from assets.styles import get_custom_css
 from components.sidebar import render_sidebar
 from components.overview_dashboard import render_overview_dashboard
-from components.smart_bundles import render_smart_bundles
+from components.smart_bundles import render_smart_bundles, render_segment_bundles
 from components.customer_segments import render_customer_segments
 from components.marketing_assistant import render_marketing_assistant
+from components.workspace_panel import get_workspace
+from components.performance_panel import render_performance_panel
+from components.validation_report import render_validation_report
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -46,59 +53,67 @@ st.markdown("""
 
 # --- LOAD OR GENERATE DATA (before sidebar to enable smart mode) ---
 @st.cache_data
-def load_data(uploaded_file):
+def load_data(uploaded_file, dtype_backend='numpy', validation_mode='repair'):
     """Load data from file or generate demo data with validation"""
     if uploaded_file is None:
         df = generate_demo_data(n_transactions=600, n_customers=60, n_days=45)
-        return df, True, None
+        if dtype_backend == 'pyarrow':
+            df = to_dtype_backend(df, dtype_backend)
+        return df, True, None, build_dataset_profile(df), None
     else:
         try:
             uploaded_file.seek(0)
-            df = pd.read_csv(uploaded_file)
+            # One chunked pass parses Date and Amount and checks every rule
+            df, report = validate_csv(uploaded_file, dtype_backend, validation_mode)
+            if report.error:
+                return None, False, report.error, None, report
             
-            # Validate required columns - ALL columns are now required
-            required_columns = ['Date', 'UserID', 'ProductID', 'Amount', 'TransactionID']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                error_msg = f"Missing required columns: {', '.join(missing_columns)}"
-                return None, False, error_msg
-            
-            # Validate data is not empty
-            if len(df) == 0:
-                return None, False, "CSV file is empty. Please upload a file with transaction data."
-            
-            # Convert date column
-            try:
-                df['Date'] = pd.to_datetime(df['Date'])
-            except Exception as e:
-                return None, False, f"Invalid date format in 'Date' column. Please use YYYY-MM-DD format. Error: {str(e)}"
-            
-            # Validate Amount column contains numeric values
-            try:
-                df['Amount'] = pd.to_numeric(df['Amount'])
-            except Exception as e:
-                return None, False, f"Invalid amount values in 'Amount' column. Please ensure all amounts are numbers. Error: {str(e)}"
-            
-            return df, False, None
+            return df, False, None, build_dataset_profile(df), report
             
         except pd.errors.EmptyDataError:
-            return None, False, "CSV file is empty or corrupted."
+            return None, False, "CSV file is empty or corrupted.", None, None
         except pd.errors.ParserError as e:
-            return None, False, f"Error parsing CSV file. Please check the file format. Error: {str(e)}"
+            return None, False, f"Error parsing CSV file. Please check the file format. Error: {str(e)}", None, None
         except Exception as e:
-            return None, False, f"Error loading file: {str(e)}"
+            return None, False, f"Error loading file: {str(e)}", None, None
+
+@st.cache_data(show_spinner=False)
+def load_saved_dataset(dataset_id, dtype_backend='numpy'):
+    """Reopen a dataset stored in the workspace"""
+    df = get_workspace().load_dataset(dataset_id)
+    if dtype_backend == 'pyarrow':
+        df = to_dtype_backend(df, dtype_backend)
+    return df, False, None, build_dataset_profile(df), None
+
+@st.cache_data
+def load_categories(category_file, is_demo):
+    """Load the optional product -> category mapping (the demo catalog has its own)"""
+    if category_file is None:
+        return (generate_demo_categories() if is_demo else None), None
+    try:
+        category_file.seek(0)
+        return read_category_mapping(category_file), None
+    except (ValueError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        return None, f"Category mapping ignored: {str(e)}"
+
+# Columnar mode and query engine live in the sidebar; their values are known from the previous run
+dtype_backend = 'pyarrow' if st.session_state.get('arrow_mode') else 'numpy'
+query_engine = st.session_state.get('query_engine', 'pandas')
+validation_mode = st.session_state.get('validation_mode', 'repair')
 
 # Pre-load data to check if we have an uploaded file
 if st.session_state.uploaded_file_name: # Check if a file name was previously stored
     # There's an uploaded file, load it from session state
-    temp_df, temp_is_demo, temp_error = load_data(st.session_state.get('temp_uploaded_file'))
+    temp_df, temp_is_demo, temp_error, temp_profile, _ = load_data(st.session_state.get('temp_uploaded_file'), dtype_backend, validation_mode)
+elif st.session_state.get('workspace_dataset'):
+    # A dataset reopened from the workspace
+    temp_df, temp_is_demo, temp_error, temp_profile, _ = load_saved_dataset(st.session_state.workspace_dataset, dtype_backend)
 else:
     # Load demo data for smart mode calculation
-    temp_df, temp_is_demo, temp_error = load_data(None)
+    temp_df, temp_is_demo, temp_error, temp_profile, _ = load_data(None, dtype_backend)
 
 # --- SIDEBAR (now with data for smart mode) ---
-uploaded_file, min_support, min_confidence, n_clusters = render_sidebar(temp_df)
+uploaded_file, category_file, min_support, min_confidence, n_clusters = render_sidebar(temp_profile)
 
 # Store uploaded file in session state for reload
 if uploaded_file:
@@ -109,13 +124,19 @@ else:
     st.session_state.temp_uploaded_file = None
     st.session_state.uploaded_file_name = None
 
-# Now load the actual data with the uploaded file
-df, is_demo, error_msg = load_data(uploaded_file)
+# Now load the actual data with the uploaded file (or the reopened dataset)
+reopened = uploaded_file is None and bool(st.session_state.get('workspace_dataset'))
+if reopened:
+    df, is_demo, error_msg, profile, validation_report = load_saved_dataset(st.session_state.workspace_dataset, dtype_backend)
+else:
+    df, is_demo, error_msg, profile, validation_report = load_data(uploaded_file, dtype_backend, validation_mode)
 
 # Handle errors from CSV upload
 if error_msg:
     st.error(f"**Error Loading CSV File**")
     st.error(error_msg)
+    if validation_report is not None:
+        render_validation_report(validation_report)
     st.info("""
     **Required CSV Format:**
     
@@ -136,15 +157,32 @@ if error_msg:
     """)
     st.stop()
 
+if validation_report is not None:
+    render_validation_report(validation_report)
+
+categories, category_error = load_categories(category_file, is_demo)
+if category_error:
+    st.warning(category_error)
+
+# Datasets in the workspace keep their derived artifacts (components read and store them by dataset_id)
+workspace = get_workspace()
+if workspace is not None and st.session_state.get('workspace_save') and not reopened:
+    workspace.save_dataset(df, profile.fingerprint, st.session_state.uploaded_file_name or "Demo data")
+in_workspace = workspace is not None and (reopened or workspace.has_dataset(profile.fingerprint))
+st.session_state.workspace_dataset_id = profile.fingerprint if in_workspace else None
+
+# Analysis results are shared across sessions by dataset content (see the Performance panel)
+st.session_state.dataset_key = (profile.fingerprint, dtype_backend)
+
 # Display data info banner or analyze prompt
-# Auto-analyze demo data, but require button click for uploaded data
+# Auto-analyze demo data and reopened datasets, but require button click for uploaded data
 if not st.session_state.data_analyzed:
-    if is_demo:
-        # Automatically show demo data insights without requiring button click
+    if is_demo or reopened:
+        # Automatically show insights without requiring button click
         st.session_state.data_analyzed = True
     else:
         # For uploaded data, require the analyze button click
-        st.success(f"**Data Loaded Successfully** - {len(df):,} transactions from {df['UserID'].nunique()} customers. Click 'Analyze Data' to proceed!")
+        st.success(f"**Data Loaded Successfully** - {profile.n_rows:,} transactions from {profile.n_customers} customers. Click 'Analyze Data' to proceed!")
         st.stop()
 
 # --- MAIN ANALYSIS (Only show when analyzed) ---
@@ -164,22 +202,30 @@ tab1, tab2, tab3, tab4 = st.tabs([
 # TAB 1: OVERVIEW DASHBOARD
 # ============================================
 with tab1:
-    render_overview_dashboard(df)
+    render_overview_dashboard(df, profile, query_engine)
 
 # ============================================
 # TAB 2: SMART BUNDLES
 # ============================================
 with tab2:
-    render_smart_bundles(df, min_support, min_confidence)
+    rules = render_smart_bundles(df, min_support, min_confidence, categories)
 
 # ============================================
 # TAB 3: CUSTOMER SEGMENTS
 # ============================================
 with tab3:
-    customer_metrics, segment_profiles, segment_insights = render_customer_segments(df, n_clusters)
+    customer_metrics, segment_profiles, segment_insights, similarity_index = render_customer_segments(df, n_clusters, query_engine)
+
+# Segment bundles need the segmentation, so they are appended to the Smart Bundles tab afterwards
+with tab2:
+    render_segment_bundles(df, customer_metrics, min_support, min_confidence)
 
 # ============================================
 # TAB 4: MARKETING ASSISTANT
 # ============================================
 with tab4:
-    render_marketing_assistant(df, customer_metrics)
\ No newline at end of file
+    render_marketing_assistant(df, customer_metrics, similarity_index, rules)
+
+# Rendered last so the cache metrics include this run
+with st.sidebar:
+    render_performance_panel()
@@ -0,0 +1,128 @@
+"""Memory and runtime of the NumPy versus Arrow (pyarrow) dtype backends
+
+Writes a simulated transaction log to CSV, loads it with each backend and
+times the main group-by / value_counts paths, checking that the results
+agree. The object column is the NumPy frame with object string columns, as
+pandas < 3 loads them. Run from the repository root:
+
+    python -m benchmarks.bench_arrow_backend --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregations import build_overview_aggregates
+from utils.columnar import read_transactions, to_dtype_backend
+from utils.market_basket import encode_baskets
+from utils.profiling import build_dataset_profile
+from utils.segmentation import calculate_customer_metrics, get_segment_insights
+
+
+def simulate_log(n_rows, n_customers, n_products, seed=0):
+    """Transaction lines with string customer and product IDs over one year"""
+    rng = np.random.default_rng(seed)
+    n_transactions = n_rows // 3
+    transaction_ids = np.sort(rng.integers(0, n_transactions, n_rows))
+    customers = rng.integers(0, n_customers, n_transactions)[transaction_ids]
+    days = rng.integers(0, 365, n_transactions)[transaction_ids]
+    popularity = 1.0 / np.arange(1, n_products + 1)
+    products = rng.choice(n_products, n_rows, p=popularity / popularity.sum())
+    return pd.DataFrame({
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(days, unit='D'),
+        'UserID': pd.Index([f'U{i:07d}' for i in range(n_customers)])[customers],
+        'ProductID': pd.Index([f'SKU-{i:06d}' for i in range(n_products)])[products],
+        'TransactionID': transaction_ids,
+        'Amount': rng.integers(5, 500, n_rows)
+    })
+
+
+def timed(function, *args, repeat=1):
+    """(result, best seconds over repeat calls)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def segment_metrics(df):
+    """Customer metrics with a simple spend-tercile segment, plus segment insights"""
+    customer_metrics = calculate_customer_metrics(df)
+    terciles = pd.qcut(customer_metrics['TotalSpend'].astype('float64'), 3, labels=['Low', 'Mid', 'High'])
+    customer_metrics['SegmentName'] = terciles.astype(str).to_numpy()
+    return customer_metrics, get_segment_insights(customer_metrics, df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--repeat', type=int, default=3, help="Best of this many runs per step")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'transactions.csv')
+        simulate_log(args.rows, args.customers, args.products).to_csv(path, index=False)
+        print(f"{args.rows:,} rows, {args.customers:,} customers, {args.products:,} products, "
+              f"CSV {os.path.getsize(path) / 2**20:.0f} MiB")
+
+        frames, timings = {}, {}
+        for backend in ['numpy', 'pyarrow']:
+            def load():
+                # Same steps as load_data in app.py
+                df = read_transactions(path, backend)
+                if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+                    df['Date'] = pd.to_datetime(df['Date'])
+                return to_dtype_backend(df, backend) if backend == 'pyarrow' else df
+
+            frames[backend], timings[(backend, 'read_csv + dates')] = timed(load, repeat=args.repeat)
+        # pandas < 3 keeps NumPy-backed strings as object columns
+        frames['object'] = frames['numpy'].astype({'UserID': object, 'ProductID': object})
+        timings[('object', 'read_csv + dates')] = timings[('numpy', 'read_csv + dates')]
+
+        steps = [
+            ('dataset profile', build_dataset_profile),
+            ('overview aggregates', build_overview_aggregates),
+            ('customer metrics + insights', segment_metrics),
+            ('encode baskets', encode_baskets),
+            ('ProductID value_counts', lambda d: d['ProductID'].value_counts())
+        ]
+        results = {}
+        for backend, df in frames.items():
+            for label, function in steps:
+                results[(backend, label)], timings[(backend, label)] = timed(function, df, repeat=args.repeat)
+
+        backends = ['object', 'numpy', 'pyarrow']
+        print(f"\n{'':<34}{'object':>10}{'numpy':>10}{'pyarrow':>10}")
+        usage = [frames[backend].memory_usage(deep=True).sum() / 2**20 for backend in backends]
+        print(f"{'memory (MiB)':<34}" + ''.join(f"{value:>10.1f}" for value in usage))
+        for label in ['read_csv + dates'] + [label for label, _ in steps]:
+            print(f"{label + ' (s)':<34}" + ''.join(f"{timings[(backend, label)]:>10.3f}" for backend in backends))
+
+        # Every backend must give the same answers
+        metrics, insights = results[('numpy', 'customer metrics + insights')]
+        daily = results[('numpy', 'overview aggregates')]['daily'].reset_index()
+        baskets = results[('numpy', 'encode baskets')]
+        for backend in ['object', 'pyarrow']:
+            other_metrics, other_insights = results[(backend, 'customer metrics + insights')]
+            pd.testing.assert_frame_equal(metrics, to_dtype_backend(other_metrics, 'numpy'),
+                                          check_dtype=False, check_exact=False, rtol=1e-9)
+            assert insights.keys() == other_insights.keys()
+            other_daily = results[(backend, 'overview aggregates')]['daily'].reset_index()
+            pd.testing.assert_frame_equal(daily, to_dtype_backend(other_daily, 'numpy'), check_dtype=False)
+            other_baskets = results[(backend, 'encode baskets')]
+            assert (baskets.matrix != other_baskets.matrix).nnz == 0
+            assert list(baskets.items) == list(other_baskets.items)
+        print("results match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""CLV scoring time at scale: purchase summary, BG/NBD fit, Gamma-Gamma fit and prediction
+
+Transactions are simulated from the BG/NBD and Gamma-Gamma generative
+processes. Run from the repository root:
+
+    python -m benchmarks.bench_clv --customers 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.churn import BetaGeoModel, purchase_summary
+from utils.clv import CLV_HORIZONS, GammaGammaModel, predict_clv
+
+
+def simulate_transactions(n_customers, days=365, seed=0):
+    """Transaction lines for n_customers drawn from BG/NBD purchase timing and Gamma-Gamma spend"""
+    rng = np.random.default_rng(seed)
+    rate = rng.gamma(0.5, 1 / 20.0, n_customers)
+    dropout = rng.beta(0.8, 3.0, n_customers)
+    spend_scale = rng.gamma(4.0, 1 / 60.0, n_customers)
+    birth = rng.integers(0, days - 1, n_customers).astype(np.float64)
+
+    users = [np.arange(n_customers)]
+    times = [birth]
+    now = birth.copy()
+    alive = np.ones(n_customers, dtype=bool)
+    while alive.any():
+        active = np.flatnonzero(alive)
+        now[active] += rng.exponential(1 / rate[active])
+        bought = active[now[active] < days]
+        users.append(bought)
+        times.append(now[bought])
+        alive[:] = False
+        alive[bought[rng.random(len(bought)) >= dropout[bought]]] = True
+
+    users = np.concatenate(users)
+    times = np.concatenate(times)
+    return pd.DataFrame({
+        'UserID': users,
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.floor(times), unit='D'),
+        'Amount': rng.gamma(6.0, 1 / spend_scale[users])
+    })
+
+
+def timed(label, function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    print(f"{label:<28}{time.perf_counter() - started:>8.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = timed("simulate", simulate_transactions, args.customers)
+    print(f"{len(df):,} lines, {args.customers:,} customers")
+
+    summary = timed("purchase summary", purchase_summary, df)
+    x, t_x, T = summary['RepeatPurchases'], summary['PurchaseSpan'], summary['Age']
+    purchase_model = timed("BG/NBD fit", BetaGeoModel().fit, x, t_x, T)
+    spend_model = timed("Gamma-Gamma fit", GammaGammaModel().fit, x, summary['AvgRepeatValue'])
+    timed(f"predict CLV{CLV_HORIZONS}", predict_clv, df, summary=summary, purchase_model=purchase_model)
+    timed("end to end predict_clv", predict_clv, df)
+
+    print("BG/NBD:", {k: round(v, 3) for k, v in purchase_model.params_.items()})
+    print("Gamma-Gamma:", {k: round(v, 3) for k, v in spend_model.params_.items()})
+
+
+if __name__ == '__main__':
+    main()
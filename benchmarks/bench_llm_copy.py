@@ -0,0 +1,50 @@
+"""Throughput of the copy generation layer against the stub backend
+
+Run from the repository root:
+
+    python -m benchmarks.bench_llm_copy --prompts 400 --latency 0.05
+"""
+import argparse
+import tempfile
+import time
+
+from utils.llm_copy import CopyGenerator, ResponseCache, StubBackend
+
+
+def run(prompts, latency, failure_rate, **generator_args):
+    """Generate all prompts once and return (seconds, stats)"""
+    generator = CopyGenerator(StubBackend(latency, failure_rate), backoff=latency, **generator_args)
+    started = time.perf_counter()
+    generator.generate(prompts)
+    return time.perf_counter() - started, generator.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prompts', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.05, help="Simulated seconds per backend call")
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    prompts = [f"Write a campaign email for customer group {i}. Feature these products: SKU{i}." for i in range(args.prompts)]
+
+    configs = [
+        ('serial', dict(max_concurrency=1, batch_size=1)),
+        ('concurrent', dict(max_concurrency=16, batch_size=1)),
+        ('concurrent + batched', dict(max_concurrency=16, batch_size=8)),
+    ]
+    print(f"{'mode':<24}{'seconds':>10}{'prompts/s':>12}{'calls':>8}{'retries':>9}")
+    for name, config in configs:
+        seconds, stats = run(prompts, args.latency, args.failure_rate, **config)
+        print(f"{name:<24}{seconds:>10.2f}{len(prompts) / seconds:>12.0f}{stats['backend_calls']:>8}{stats['retries']:>9}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(directory)
+        for name in ['cold cache', 'warm cache']:
+            seconds, stats = run(prompts, args.latency, args.failure_rate,
+                                 cache=cache, max_concurrency=16, batch_size=8)
+            print(f"{name:<24}{seconds:>10.2f}{len(prompts) / seconds:>12.0f}{stats['backend_calls']:>8}{stats['retries']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Runtime of the pandas, Polars and DuckDB query engines on the transaction group-bys
+
+Times the customer RFM group-by, the segment insights and the overview
+rollups on a simulated log with every installed engine, in each dtype
+backend, and checks that each engine returns the same results (values and
+dtypes) as pandas. Run from the repository root:
+
+    python -m benchmarks.bench_query_engine --rows 10000000
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_arrow_backend import simulate_log, timed
+from utils.aggregations import build_overview_aggregates
+from utils.columnar import to_dtype_backend
+from utils.query_engine import available_engines, customer_aggregates
+from utils.segmentation import get_segment_insights
+
+
+def check_insights(expected, actual, df, line_segments):
+    """Insights must agree; top products may differ only in the order of equal counts"""
+    assert expected.keys() == actual.keys()
+    for segment, values in expected.items():
+        assert values.keys() == actual[segment].keys()
+        counts = df.loc[line_segments == segment, 'ProductID'].value_counts()
+        for key, value in values.items():
+            other = actual[segment][key]
+            if key == 'top_products':
+                assert sorted(value.values()) == sorted(other.values())
+                assert all(counts[product] == count for product, count in other.items())
+            else:
+                assert np.isclose(value, other, rtol=1e-12, atol=0), (segment, key, value, other)
+
+
+def compare_engines(df, backend, repeat):
+    """Time every engine on df and check each one against pandas"""
+    engines = available_engines()
+    metrics = customer_aggregates(df, 'pandas')
+    terciles = pd.qcut(metrics['TotalSpend'].astype('float64'), 3, labels=['Low', 'Mid', 'High'])
+    metrics['SegmentName'] = terciles.astype(str).to_numpy()
+    line_segments = metrics.set_index('UserID')['SegmentName'].reindex(df['UserID']).to_numpy()
+
+    steps = [
+        ('customer RFM group-by', lambda engine: customer_aggregates(df, engine)),
+        ('segment insights', lambda engine: get_segment_insights(metrics, df, engine)),
+        ('overview rollups', lambda engine: build_overview_aggregates(df, engine))
+    ]
+    results, timings = {}, {}
+    for engine in engines:
+        for label, function in steps:
+            results[(engine, label)], timings[(engine, label)] = timed(function, engine, repeat=repeat)
+
+    print(f"\n{backend + ' backend':<28}" + ''.join(f"{engine:>10}" for engine in engines))
+    for label, _ in steps:
+        print(f"{label + ' (s)':<28}" + ''.join(f"{timings[(engine, label)]:>10.3f}" for engine in engines))
+
+    # Every engine must give the pandas results, dtypes included
+    for engine in engines[1:]:
+        pd.testing.assert_frame_equal(results[('pandas', 'customer RFM group-by')],
+                                      results[(engine, 'customer RFM group-by')])
+        check_insights(results[('pandas', 'segment insights')], results[(engine, 'segment insights')],
+                       df, line_segments)
+        for table in ['daily', 'daily_products']:
+            pd.testing.assert_frame_equal(results[('pandas', 'overview rollups')][table],
+                                          results[(engine, 'overview rollups')][table])
+    print("results match")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--customers', type=int, default=200_000)
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--backend', nargs='+', choices=['numpy', 'pyarrow'], default=['numpy', 'pyarrow'],
+                        help="Dtype backends of the frame")
+    parser.add_argument('--repeat', type=int, default=3, help="Best of this many runs per step")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    started = time.perf_counter()
+    log = simulate_log(args.rows, args.customers, args.products)
+    print(f"{args.rows:,} rows, {args.customers:,} customers, {args.products:,} products "
+          f"simulated in {time.perf_counter() - started:.1f}s")
+    for backend in args.backend:
+        compare_engines(to_dtype_backend(log, backend), backend, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Concurrent sessions requesting the same analysis with and without the shared result cache
+
+Starts several threads that each need the customer metrics of the same
+simulated log, first computing them independently and then through one
+ResultCache, and times a repeat lookup against hashing the DataFrame as a
+per-call cache key would. Run from the repository root:
+
+    python -m benchmarks.bench_result_cache --rows 1000000 --sessions 8
+"""
+import argparse
+import threading
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.bench_arrow_backend import simulate_log, timed
+from utils.profiling import dataset_fingerprint
+from utils.result_cache import ResultCache
+from utils.segmentation import calculate_customer_metrics
+
+
+def run_sessions(n_sessions, request):
+    """Run request() in n_sessions threads at once; returns their results and the wall time"""
+    results = [None] * n_sessions
+
+    def session(i):
+        results[i] = request()
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(n_sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--cache-mb', type=int, default=1024)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    df = simulate_log(args.rows, args.customers, args.products)
+    print(f"{args.rows:,} rows, {args.customers:,} customers, {args.sessions} concurrent sessions\n")
+
+    independent, seconds = run_sessions(args.sessions, lambda: calculate_customer_metrics(df))
+    print(f"{'without cache (each session computes)':<44}{seconds:>8.2f}s")
+
+    cache = ResultCache(args.cache_mb * 2**20)
+    fingerprint = dataset_fingerprint(df)
+    key = ('customer_metrics', fingerprint)
+    shared, seconds = run_sessions(args.sessions, lambda: cache.get_or_compute(key, lambda: calculate_customer_metrics(df)))
+    stats = cache.stats()
+    print(f"{'shared cache (single flight)':<44}{seconds:>8.2f}s"
+          f"  ({stats['misses']} computed, {stats['waits']} waited)")
+
+    _, seconds = timed(cache.get_or_compute, key, lambda: calculate_customer_metrics(df), repeat=5)
+    print(f"{'repeat lookup by fingerprint':<44}{seconds * 1000:>8.2f} ms")
+    _, seconds = timed(pd.util.hash_pandas_object, df, repeat=3)
+    print(f"{'hashing the DataFrame as a cache key':<44}{seconds * 1000:>8.0f} ms")
+    print(f"{'cached customer metrics':<44}{stats['bytes'] / 2**20:>8.1f} MiB")
+
+    for result in independent + shared:
+        pd.testing.assert_frame_equal(independent[0], result)
+    print("results match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Rule index build, file size, load time and cart query latency
+
+Rules are drawn at random over a product catalog, with popular products
+appearing in more antecedents. Run from the repository root:
+
+    python -m benchmarks.bench_rule_index --rules 100000 --products 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.rule_index import RuleIndex
+
+
+def simulate_rules(n_rules, n_products, max_antecedent=3, seed=0):
+    """Rules DataFrame with frozenset antecedents/consequents and random metrics"""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_products + 1)
+    popularity /= popularity.sum()
+    products = np.array([f'P{i:05d}' for i in range(n_products)], dtype=object)
+
+    sizes = rng.integers(1, max_antecedent + 1, n_rules)
+    drawn = rng.choice(n_products, size=(n_rules, max_antecedent + 1), p=popularity)
+    antecedents, consequents = [], []
+    for row, size in zip(drawn, sizes):
+        itemset = list(dict.fromkeys(row.tolist()))
+        if len(itemset) < 2:
+            itemset.append((itemset[0] + 1) % n_products)
+        size = min(size, len(itemset) - 1)
+        antecedents.append(frozenset(products[itemset[:size]]))
+        consequents.append(frozenset(products[itemset[size:size + 1]]))
+
+    confidence = rng.uniform(0.1, 1.0, n_rules)
+    return pd.DataFrame({
+        'antecedents': antecedents,
+        'consequents': consequents,
+        'support': rng.uniform(0.001, 0.05, n_rules),
+        'confidence': confidence,
+        'lift': confidence / rng.uniform(0.01, 0.5, n_rules),
+        'leverage': rng.uniform(0.0, 0.01, n_rules)
+    }), products, popularity
+
+
+def naive_query(rules, cart, top_n=5, metric='confidence'):
+    """Scan every rule of the DataFrame (the baseline the index replaces)"""
+    cart = frozenset(cart)
+    matches = rules[rules['antecedents'].map(cart.issuperset)]
+    best = {}
+    for consequents, score in zip(matches['consequents'], matches[metric]):
+        for product in consequents - cart:
+            best[product] = max(best.get(product, -np.inf), score)
+    return sorted(best.items(), key=lambda kv: -kv[1])[:top_n]
+
+
+def latency(function, carts):
+    """p50/p99 latency in milliseconds of function over the carts"""
+    timings = []
+    for cart in carts:
+        started = time.perf_counter()
+        function(cart)
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--naive-queries', type=int, default=50)
+    args = parser.parse_args()
+
+    rules, products, popularity = simulate_rules(args.rules, args.products)
+    rng = np.random.default_rng(1)
+    carts = [list(rng.choice(products, size=rng.integers(1, 7), replace=False, p=popularity))
+             for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    index = RuleIndex.from_rules(rules)
+    print(f"build from {len(rules):,} rules{'':<14}{time.perf_counter() - started:>8.3f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickled = os.path.join(directory, 'rules.pkl')
+        rules.to_pickle(pickled)
+        print(f"rules DataFrame pickle{'':<17}{os.path.getsize(pickled) / 2**20:>8.2f} MiB")
+        started = time.perf_counter()
+        pd.read_pickle(pickled)
+        print(f"rules DataFrame unpickle{'':<15}{(time.perf_counter() - started) * 1000:>8.1f} ms")
+
+        for compressed in (False, True):
+            label = 'compressed' if compressed else 'uncompressed'
+            path = os.path.join(directory, f'rules_{label}.npz')
+            index.save(path, compressed=compressed)
+            print(f"{'index file, ' + label:<39}{os.path.getsize(path) / 2**20:>8.2f} MiB")
+
+            load_times = []
+            for _ in range(5):
+                started = time.perf_counter()
+                index = RuleIndex.load(path)
+                load_times.append(time.perf_counter() - started)
+            print(f"{'load ' + label + ' (best of 5)':<39}{min(load_times) * 1000:>8.1f} ms")
+
+    index.query(carts[0])
+    p50, p99 = latency(index.query, carts)
+    print(f"index query, {len(carts):,} carts{'':<17}p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    p50, p99 = latency(lambda cart: naive_query(rules, cart), carts[:args.naive_queries])
+    print(f"DataFrame scan, {args.naive_queries} carts{'':<16}p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+    # Same answers as the scan
+    for cart in carts[:args.naive_queries]:
+        expected = {product for product, _ in naive_query(rules, cart, top_n=10_000)}
+        assert {r['product'] for r in index.query(cart, top_n=10_000)} == expected
+
+
+if __name__ == '__main__':
+    main()
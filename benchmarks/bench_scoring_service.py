@@ -0,0 +1,133 @@
+"""Load test of the scoring service: single versus batched requests from concurrent local clients
+
+Builds artifacts from demo data, starts the service in a subprocess and
+drives it with ScoringClient connections. Run from the repository root:
+
+    python -m benchmarks.bench_scoring_service --customers 5000 --connections 8 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_generator import generate_demo_data
+from utils.rule_index import RuleIndex
+from utils.scoring_service import CUSTOMERS_FILE, RULES_FILE, ScoringClient, build_scoring_artifacts
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+async def wait_until_up(port, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            client = ScoringClient(port=port)
+            status, health = await client.request('GET', '/health')
+            await client.close()
+            return health
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def make_payloads(endpoint, user_ids, products, rng, n, batch_size):
+    """n request payloads for an endpoint, each with batch_size items (1 = single-item form)"""
+    payloads = []
+    for _ in range(n):
+        if endpoint == '/recommend':
+            carts = [list(rng.choice(products, size=min(rng.integers(1, 4), len(products)), replace=False))
+                     for _ in range(batch_size)]
+            payloads.append({'cart': carts[0]} if batch_size == 1 else {'carts': carts})
+        else:
+            users = list(rng.choice(user_ids, size=batch_size))
+            payloads.append({'user_id': users[0]} if batch_size == 1 else {'user_ids': users})
+    return payloads
+
+
+async def drive(port, endpoint, payloads, connections):
+    """Send payloads over concurrent connections; returns (per-request latencies in ms, seconds)"""
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    latencies = []
+
+    async def worker():
+        client = ScoringClient(port=port)
+        while not queue.empty():
+            payload = queue.get_nowait()
+            started = time.perf_counter()
+            status, response = await client.request('POST', endpoint, payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert status == 200, response
+        await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(connections)])
+    return np.array(latencies), time.perf_counter() - started
+
+
+async def load_test(port, user_ids, products, args):
+    rng = np.random.default_rng(0)
+    print(f"{'endpoint':<14}{'batch':>6}{'requests':>10}{'items/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for endpoint in ['/segment', '/recommend', '/lookalikes']:
+        for batch_size in (1, args.batch_size):
+            n = args.requests if batch_size == 1 else max(args.requests // batch_size, args.connections * 8)
+            payloads = make_payloads(endpoint, user_ids, products, rng, n, batch_size)
+            latencies, seconds = await drive(port, endpoint, payloads, args.connections)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{endpoint:<14}{batch_size:>6}{n:>10}{n * batch_size / seconds:>10.0f}{p50:>9.2f}{p99:>9.2f}")
+
+    client = ScoringClient(port=port)
+    _, server_metrics = await client.request('GET', '/metrics')
+    await client.close()
+    print("server-side handler latency (/metrics):")
+    for endpoint, summary in server_metrics.items():
+        print(f"  {endpoint:<12}{summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=5_000)
+    parser.add_argument('--transactions', type=int, default=50_000)
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help="Single-item requests per endpoint")
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    df = generate_demo_data(n_transactions=args.transactions, n_customers=args.customers, n_days=180)
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        n_customers, n_rules = build_scoring_artifacts(df, directory, n_clusters=4, min_support=0.005)
+        print(f"artifacts for {n_customers:,} customers and {n_rules:,} rules in {time.perf_counter() - started:.2f}s")
+        user_ids = pd.read_csv(os.path.join(directory, CUSTOMERS_FILE), dtype={'UserID': str})['UserID'].to_numpy()
+        products = np.asarray(RuleIndex.load(os.path.join(directory, RULES_FILE)).items)
+        if len(products) == 0:
+            products = df['ProductID'].astype(str).unique()
+
+        port = free_port()
+        server = subprocess.Popen([sys.executable, '-m', 'utils.scoring_service', directory, '--port', str(port)],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            started = time.perf_counter()
+            asyncio.run(wait_until_up(port))
+            print(f"service ready in {time.perf_counter() - started:.2f}s")
+            asyncio.run(load_test(port, user_ids, products, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
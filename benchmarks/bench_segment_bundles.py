@@ -0,0 +1,88 @@
+"""Per-segment bundle mining from one shared basket matrix versus re-encoding each segment
+
+Run from the repository root:
+
+    python -m benchmarks.bench_segment_bundles --transactions 200000 --segments 5
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.market_basket import (
+    basket_frame, encode_baskets, find_product_bundles, mine_group_bundles,
+    prepare_basket_data, transaction_rows_by_group
+)
+
+
+def simulate_transactions(n_transactions, n_products=200, n_customers=20_000, seed=0):
+    """Transaction lines with Zipf-like product popularity and a few correlated product pairs"""
+    rng = np.random.default_rng(seed)
+    sizes = rng.poisson(2.0, n_transactions) + 1
+    transaction_ids = np.repeat(np.arange(n_transactions), sizes)
+    popularity = 1.0 / np.arange(1, n_products + 1)
+    products = rng.choice(n_products, size=len(transaction_ids), p=popularity / popularity.sum())
+    # Product 2k is often bought with 2k + 1
+    partner = (products % 2 == 0) & (products < 20) & (rng.random(len(products)) < 0.5)
+    transaction_ids = np.r_[transaction_ids, transaction_ids[partner]]
+    products = np.r_[products, products[partner] + 1]
+    customers = rng.integers(0, n_customers, n_transactions)
+    return pd.DataFrame({
+        'TransactionID': transaction_ids,
+        'UserID': customers[transaction_ids],
+        'ProductID': pd.Categorical(products).rename_categories(lambda p: f'P{p:03d}').astype(str)
+    })
+
+
+def timed(label, function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    print(f"{label:<44}{time.perf_counter() - started:>8.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=200_000)
+    parser.add_argument('--segments', type=int, default=5)
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--min-confidence', type=float, default=0.2)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    df = simulate_transactions(args.transactions)
+    users = df['UserID'].unique()
+    segments = pd.Series(np.arange(len(users)) % args.segments, index=users).map(lambda s: f'Segment {s}')
+    print(f"{len(df):,} lines, {args.transactions:,} transactions, {args.segments} segments")
+
+    baskets = timed("encode baskets", encode_baskets, df)
+    _, global_rules = timed(
+        "global mining", lambda: find_product_bundles(basket_frame(baskets, args.min_support),
+                                                      args.min_support, args.min_confidence)
+    )
+    rows = timed("transaction rows by segment", transaction_rows_by_group, baskets, df, segments)
+    shared = timed(
+        "segments from shared matrix", mine_group_bundles, baskets, rows,
+        args.min_support, args.min_confidence, n_jobs=args.n_jobs
+    )
+
+    def rebuild_per_segment():
+        results = {}
+        for segment, segment_df in df.groupby(segments.reindex(df['UserID']).to_numpy()):
+            results[segment] = find_product_bundles(prepare_basket_data(segment_df), args.min_support,
+                                                    args.min_confidence)[1]
+        return results
+
+    rebuilt = timed("segments re-encoded (prepare_basket_data)", rebuild_per_segment)
+
+    for segment in sorted(shared):
+        same = len(shared[segment]) == len(rebuilt[segment])
+        print(f"  {segment}: {len(shared[segment])} rules{'' if same else ' (MISMATCH)'}")
+    print(f"global: {len(global_rules)} rules")
+
+
+if __name__ == '__main__':
+    main()
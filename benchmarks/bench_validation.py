@@ -0,0 +1,108 @@
+"""Chunked validation versus the former load-time checks
+
+Writes a simulated log to CSV, clean and with injected bad dates, bad and
+negative amounts, empty fields, duplicate lines and TransactionIDs spread
+over several customers or days. Times the former load path (read, then
+to_datetime / to_numeric over full columns, which stops at the first bad
+value) and the chunked validation in both modes, and checks that the
+per-rule counts match a whole-file reference for every backend and chunk
+size. Run from the repository root:
+
+    python -m benchmarks.bench_validation --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_arrow_backend import simulate_log, timed
+from utils.columnar import PYARROW_AVAILABLE
+from utils.validation import REQUIRED_COLUMNS, validate_csv
+
+
+def legacy_load(path):
+    """The former checks: full-column conversions that raise on the first bad value"""
+    df = pd.read_csv(path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Amount'] = pd.to_numeric(df['Amount'])
+    return df
+
+
+def inject_issues(df, n_each, seed=0):
+    """Copy of df as CSV-ready strings with n_each lines broken per rule"""
+    rng = np.random.default_rng(seed)
+    dirty = df.assign(Date=df['Date'].dt.strftime('%Y-%m-%d'), Amount=df['Amount'].astype(str))
+    rows = rng.choice(len(df), 6 * n_each, replace=False).reshape(6, n_each)
+    dirty.loc[rows[0], 'Date'] = 'not a date'
+    dirty.loc[rows[1], 'Amount'] = 'abc'
+    dirty.loc[rows[2], 'UserID'] = None
+    dirty.loc[rows[3], 'Amount'] = '-' + dirty.loc[rows[3], 'Amount']
+    dirty.loc[rows[4], 'UserID'] = 'U-OTHER'
+    dirty.loc[rows[5], 'Date'] = (df.loc[rows[5], 'Date'] + pd.Timedelta(days=1)).dt.strftime('%Y-%m-%d')
+    duplicates = dirty.iloc[rng.choice(len(df), n_each, replace=False)]
+    return pd.concat([dirty, duplicates], ignore_index=True)
+
+
+def reference_counts(path):
+    """Per-rule line counts computed on the whole file at once"""
+    raw = pd.read_csv(path)
+    nulls = raw[REQUIRED_COLUMNS].isna()
+    dates = pd.to_datetime(raw['Date'], format='ISO8601', errors='coerce')
+    amounts = pd.to_numeric(raw['Amount'], errors='coerce')
+    parsed = raw.assign(Date=dates, Amount=amounts)
+    counts = {
+        'unparsable_dates': (dates.isna() & ~nulls['Date']).sum(),
+        'unparsable_amounts': (amounts.isna() & ~nulls['Amount']).sum(),
+        'null_values': nulls.any(axis=1).sum(),
+        'negative_amounts': (amounts < 0).sum(),
+        'duplicate_lines': parsed.duplicated().sum()
+    }
+    for rule, values in (('transaction_multiple_users', parsed['UserID']),
+                         ('transaction_multiple_dates', parsed['Date'].dt.normalize())):
+        keyed = parsed['TransactionID'].notna() & values.notna()
+        distinct = values[keyed].groupby(parsed.loc[keyed, 'TransactionID']).nunique()
+        counts[rule] = parsed['TransactionID'].isin(distinct.index[distinct > 1]).sum()
+    return {rule: int(count) for rule, count in counts.items() if count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--issues', type=int, default=1_000, help="Lines broken per rule")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    backends = ['numpy', 'pyarrow'] if PYARROW_AVAILABLE else ['numpy']
+    df = simulate_log(args.rows, args.customers, args.products)
+    with tempfile.TemporaryDirectory() as directory:
+        clean, dirty = os.path.join(directory, 'clean.csv'), os.path.join(directory, 'dirty.csv')
+        df.to_csv(clean, index=False)
+        inject_issues(df, args.issues).to_csv(dirty, index=False)
+        print(f"{args.rows:,} rows, {args.issues:,} broken lines per rule\n")
+
+        _, seconds = timed(legacy_load, clean)
+        print(f"{'former checks, clean file':<44}{seconds:>8.2f}s")
+        for backend in backends:
+            for path, label in ((clean, 'clean'), (dirty, 'dirty')):
+                for mode in ('strict', 'repair'):
+                    (_, report), seconds = timed(validate_csv, path, backend, mode)
+                    print(f"{f'{backend} {mode}, {label} file':<44}{seconds:>8.2f}s"
+                          f"  ({len(report.issues)} rules failed, {report.n_dropped:,} lines dropped)")
+
+        expected = reference_counts(dirty)
+        for backend in backends:
+            for chunksize in (50_000, 1_000_000):
+                _, report = validate_csv(dirty, backend, 'strict', chunksize=chunksize)
+                counts = {issue.rule: issue.count for issue in report.issues}
+                assert counts == expected, (backend, chunksize, counts, expected)
+        print("\n" + "\n".join(f"{rule:<32}{count:>10,}" for rule, count in expected.items()))
+        print("counts match the whole-file reference")
+
+
+if __name__ == '__main__':
+    main()
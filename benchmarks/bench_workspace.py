@@ -0,0 +1,71 @@
+"""Reopening a dataset from the workspace versus re-reading its CSV and recomputing customer metrics
+
+For each workspace backend, stores a simulated log with its customer
+metrics and times reopening both, checking they round-trip unchanged (empty artifacts too).
+Run from the repository root:
+
+    python -m benchmarks.bench_workspace --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.bench_arrow_backend import simulate_log, timed
+from utils.profiling import dataset_fingerprint
+from utils.segmentation import calculate_customer_metrics
+from utils.workspace import DUCKDB_AVAILABLE, Workspace
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--products', type=int, default=5_000)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'transactions.csv')
+        simulate_log(args.rows, args.customers, args.products).to_csv(path, index=False)
+        print(f"{args.rows:,} rows, {args.customers:,} customers, CSV {os.path.getsize(path) / 2**20:.0f} MiB\n")
+
+        df, seconds = timed(lambda: pd.read_csv(path, parse_dates=['Date']))
+        print(f"{'read CSV':<40}{seconds:>8.2f}s")
+        customer_metrics, seconds = timed(calculate_customer_metrics, df)
+        print(f"{'compute customer metrics':<40}{seconds:>8.2f}s")
+        dataset_id, seconds = timed(dataset_fingerprint, df)
+        print(f"{'fingerprint':<40}{seconds:>8.2f}s")
+
+        for backend in (['duckdb'] if DUCKDB_AVAILABLE else []) + ['sqlite']:
+            workspace = Workspace(os.path.join(directory, f'workspace.{backend}'), backend)
+            _, seconds = timed(workspace.save_dataset, df, dataset_id, 'transactions.csv')
+            print(f"{backend + ': save dataset (with indexes)':<40}{seconds:>8.2f}s")
+            _, seconds = timed(workspace.save_artifact, dataset_id, 'customer_metrics', customer_metrics)
+            print(f"{backend + ': save customer metrics':<40}{seconds:>8.2f}s")
+
+            reopened, seconds = timed(workspace.load_dataset, dataset_id)
+            print(f"{backend + ': reopen dataset':<40}{seconds:>8.2f}s")
+            stored_metrics, seconds = timed(workspace.load_artifact, dataset_id, 'customer_metrics')
+            print(f"{backend + ': load customer metrics':<40}{seconds:>8.2f}s")
+            user = df['UserID'].iloc[0]
+            _, seconds = timed(workspace.query, f"SELECT * FROM transactions_{dataset_id} WHERE UserID = ?", [user])
+            print(f"{backend + ': one customer by UserID index':<40}{seconds * 1000:>8.1f} ms")
+            # No rules or no columns at all, as when mining finds nothing
+            for empty in (customer_metrics.iloc[:0], pd.DataFrame()):
+                workspace.save_artifact(dataset_id, 'empty', empty, {'columns': len(empty.columns)})
+                stored_empty = workspace.load_artifact(dataset_id, 'empty', {'columns': len(empty.columns)})
+                assert stored_empty.empty and list(stored_empty.columns) == list(empty.columns), backend
+            workspace.close()
+            print(f"{backend + ': file size':<40}{os.path.getsize(workspace.path) / 2**20:>8.0f} MiB")
+
+            pd.testing.assert_frame_equal(df, reopened, check_dtype=False)
+            pd.testing.assert_frame_equal(customer_metrics, stored_metrics, check_dtype=False)
+        print("round trips match")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,135 @@
 """Customer Segments component for segmentation analysis"""
+import io
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.segmentation import calculate_customer_metrics, segment_customers, get_segment_insights
+from utils.segmentation import calculate_customer_metrics, segment_customers, get_segment_insights, sweep_cluster_counts
+from utils.features import CustomerFeatureTransformer, DEFAULT_FEATURES, OPTIONAL_FEATURES, FEATURE_SCALERS
+from utils.similarity import CustomerSimilarityIndex
+from components.sidebar import MAX_SEGMENTS
+from components.workspace_panel import load_artifact, save_artifact
+from components.performance_panel import shared_result
+
+
+def compute_customer_metrics(df, engine):
+    """Customer metrics from the workspace, or computed (and stored) when missing"""
+    # Churn and CLV fits are the slow part; a workspace dataset keeps them
+    customer_metrics = load_artifact('customer_metrics')
+    if customer_metrics is None:
+        customer_metrics = calculate_customer_metrics(df, engine)
+        save_artifact('customer_metrics', customer_metrics)
+    return customer_metrics
+
+
+def fit_features(transformer, customer_metrics):
+    """Fit the feature transform; returns the fitted transformer and the scaled features"""
+    features_scaled = transformer.fit_transform(customer_metrics)
+    return transformer, features_scaled
+
+
+def compute_segmentation(customer_metrics, df, n_clusters, sweep, transformer, features_scaled, engine):
+    """Segment a copy of the shared customer metrics and summarize the segments"""
+    customer_metrics, segment_profiles, model = segment_customers(
+        customer_metrics.copy(), n_clusters, sweep=sweep, transformer=transformer, return_model=True,
+        features_scaled=features_scaled
+    )
+    segment_insights = get_segment_insights(customer_metrics, df, engine)
+    return customer_metrics, segment_profiles, model, segment_insights
 
 
-def render_customer_segments(df, n_clusters):
+def render_customer_segments(df, n_clusters, engine='pandas'):
     """
     Render customer segmentation analysis tab
     
     Args:
         df: Transaction DataFrame
-        n_clusters: Number of customer segments
+        n_clusters: Number of customer segments, or 'auto'
+        engine: Query engine for the customer metrics and segment insights
     
     Returns:
-        tuple: (customer_metrics, segment_profiles, segment_insights)
+        tuple: (customer_metrics, segment_profiles, segment_insights, similarity_index)
     """
     st.markdown('<div class="animated">', unsafe_allow_html=True)
     st.markdown("### Customer Segmentation Analysis")
     st.markdown("Understand your customers through **K-Means clustering** and **RFM analysis**")
     
+    transformer = render_feature_settings()
+    
     with st.spinner("Analyzing customer behavior..."):
-        customer_metrics = calculate_customer_metrics(df)
-        customer_metrics, segment_profiles = segment_customers(customer_metrics, n_clusters)
-        segment_insights = get_segment_insights(customer_metrics, df)
+        # Shared across sessions by dataset; every query engine gives the same results
+        customer_metrics = shared_result('customer_metrics', lambda: compute_customer_metrics(df, engine))
+        feature_params = {
+            'features': transformer.features, 'log_features': transformer.log_features,
+            'clip_quantile': transformer.clip_quantile, 'scaler': transformer.scaler
+        }
+        transformer, features_scaled = shared_result(
+            'customer_features', lambda: fit_features(transformer, customer_metrics), **feature_params
+        )
+        k_max = MAX_SEGMENTS if n_clusters == 'auto' else max(MAX_SEGMENTS, n_clusters)
+        # Every segment count is fitted and scored once, so switching k never refits
+        sweep = shared_result(
+            'cluster_sweep', lambda: sweep_cluster_counts(features_scaled, k_max=k_max), k_max=k_max, **feature_params
+        )
+        customer_metrics, segment_profiles, model, segment_insights = shared_result(
+            'segmentation',
+            lambda: compute_segmentation(customer_metrics, df, n_clusters, sweep, transformer, features_scaled, engine),
+            n_clusters=n_clusters, k_max=k_max, **feature_params
+        )
+        segment_params = {'n_clusters': len(segment_profiles), **feature_params}
+        save_artifact('segments', customer_metrics, segment_params)
+        save_artifact(
+            'segment_insights',
+            pd.DataFrame.from_dict(segment_insights, orient='index').rename_axis('SegmentName').reset_index(),
+            segment_params
+        )
+        similarity_index = shared_result(
+            'similarity_index',
+            lambda: CustomerSimilarityIndex(customer_metrics['UserID'].to_numpy(), features_scaled),
+            **feature_params
+        )
     
-    st.success(f"Customers segmented into **{n_clusters}** distinct groups!")
+    if n_clusters == 'auto':
+        st.success(f"Customers segmented into **{len(segment_profiles)}** distinct groups (auto-selected by silhouette score)!")
+    else:
+        st.success(f"Customers segmented into **{len(segment_profiles)}** distinct groups!")
+    
+    with st.expander("Cluster Quality by Segment Count"):
+        scores = sweep.scores.reset_index()
+        col1, col2 = st.columns(2)
+        with col1:
+            fig_quality = px.line(scores, x='k', y=['Silhouette', 'DaviesBouldin'], markers=True,
+                                  title='Silhouette (higher is better) and Davies-Bouldin (lower is better)')
+            fig_quality.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='Inter, sans-serif'),
+                legend_title_text=''
+            )
+            st.plotly_chart(fig_quality, use_container_width=True)
+        with col2:
+            fig_elbow = px.line(scores, x='k', y='Inertia', markers=True, title='Inertia (elbow)')
+            fig_elbow.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='Inter, sans-serif')
+            )
+            st.plotly_chart(fig_elbow, use_container_width=True)
+        st.markdown(f"**Best silhouette:** k = {sweep.best_k} &nbsp;&nbsp; **Elbow:** k = {sweep.elbow_k}")
+        
+        model_file = io.BytesIO()
+        model.save(model_file)
+        st.download_button(
+            label="Download Segmentation Model",
+            data=model_file.getvalue(),
+            file_name="segmentation_model.joblib",
+            help="Feature transform, K-Means model and segment labels for scoring new customers"
+        )
     
     # Segment Overview
     st.markdown("### Segment Overview")
     
-    cols = st.columns(n_clusters)
+    cols = st.columns(len(segment_insights))
     
     for idx, (segment_name, insights) in enumerate(segment_insights.items()):
         with cols[idx]:
@@ -139,6 +238,11 @@ def render_customer_segments(df, n_clusters):
                 st.metric("Total Revenue Generated", f"₹{insights['total_revenue']:,.2f}")
                 st.metric("Average Spend per Customer", f"₹{insights['avg_spend_per_customer']:,.2f}")
                 st.metric("Purchase Frequency", f"{insights['avg_frequency']:.1f} transactions")
+                if 'avg_p_alive' in insights:
+                    st.metric("Probability Still Active", f"{insights['avg_p_alive']:.0%}",
+                              help="Average BG/NBD probability that a customer has not churned")
+                    st.metric("Likely Churned", f"{insights['likely_churned']}",
+                              help="Customers with under 50% probability of still being active")
             
             with col2:
                 st.markdown("#### Top Products")
@@ -150,4 +254,52 @@ def render_customer_segments(df, n_clusters):
     
     st.markdown('</div>', unsafe_allow_html=True)
     
-    return customer_metrics, segment_profiles, segment_insights
+    return customer_metrics, segment_profiles, segment_insights, similarity_index
+
+
+def render_feature_settings():
+    """
+    Render segmentation feature settings
+    
+    Returns:
+        Unfitted CustomerFeatureTransformer configured from the settings
+    """
+    with st.expander("Segmentation Features"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            extra_features = st.multiselect(
+                "Extra Features",
+                options=OPTIONAL_FEATURES,
+                help="Add lifetime value, average order value and probability of being active to the RFM features"
+            )
+            use_log = st.checkbox(
+                "Log-transform Spend & Counts",
+                value=False,
+                help="Compress heavy-tailed spend so a few big spenders don't get their own cluster"
+            )
+        
+        with col2:
+            clip_pct = st.selectbox(
+                "Clip Outliers",
+                options=[0, 1, 5],
+                format_func=lambda pct: "Off" if pct == 0 else f"{pct}% / {100 - pct}% quantiles"
+            )
+        
+        with col3:
+            scaler = st.selectbox(
+                "Scaling",
+                options=FEATURE_SCALERS,
+                format_func=str.title,
+                help="Standard: mean/std. Robust: median/IQR. Rank: percentile of each value"
+            )
+    
+    features = DEFAULT_FEATURES + extra_features
+    log_features = [f for f in features if f != 'Recency'] if use_log else []
+    
+    return CustomerFeatureTransformer(
+        features=features,
+        log_features=log_features,
+        clip_quantile=clip_pct / 100 if clip_pct else None,
+        scaler=scaler
+    )
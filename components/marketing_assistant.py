@@ -1,15 +1,55 @@
 """Marketing Assistant component for campaign generation"""
+import os
+import tempfile
+
+import pandas as pd
 import streamlit as st
-import numpy as np
+from utils.recommendations import BasketRecommender
+from utils.campaign_export import CampaignExportJob, EXPORT_FORMATS, campaign_offer, iter_customer_messages
+from utils.campaign_impact import estimate_campaign_impact, repurchase_outcomes
+from utils.llm_copy import COPY_BACKENDS, CopyGenerator, ResponseCache, build_copy_prompt, get_backend
+from components.performance_panel import shared_result
+
+COPY_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'business_segmenter_copy_cache')
+
+RECOMMENDATIONS_PER_CUSTOMER = 3
+
+
+def load_repurchase_outcomes(df):
+    """Per-customer repurchase history, computed once per dataset"""
+    return shared_result('repurchase_outcomes', lambda: repurchase_outcomes(df))
 
 
-def render_marketing_assistant(df, customer_metrics):
+def load_campaign_impact(df, segment_name, campaign_type, user_ids):
+    """Campaign estimate cached per segment, its customers and campaign type"""
+    users_key = int(pd.util.hash_pandas_object(pd.Series(user_ids), index=False).sum())
+    return shared_result(
+        'campaign_impact',
+        lambda: estimate_campaign_impact(load_repurchase_outcomes(df), list(user_ids), campaign_type),
+        segment=segment_name, campaign_type=campaign_type, users=users_key
+    )
+
+
+def get_recommender(df, rules=None):
+    """Recommender fitted once per dataset, keyed on the rules' content"""
+    if rules is not None and not rules.empty:
+        rules_key = int(pd.util.hash_pandas_object(
+            rules[['antecedents_str', 'consequents_str', 'confidence']], index=False
+        ).sum())
+    else:
+        rules, rules_key = None, None
+    return shared_result('recommender', lambda: BasketRecommender().fit(df, rules), rules=rules_key)
+
+
+def render_marketing_assistant(df, customer_metrics, similarity_index=None, rules=None):
     """
     Render marketing assistant tab for campaign generation
     
     Args:
         df: Transaction DataFrame
         customer_metrics: Customer metrics DataFrame with segments
+        similarity_index: Optional CustomerSimilarityIndex for lookalike audiences
+        rules: Optional association rules from the Smart Bundles tab
     """
     st.markdown('<div class="animated">', unsafe_allow_html=True)
     st.markdown("### AI-Powered Marketing Campaign Generator")
@@ -56,30 +96,37 @@ def render_marketing_assistant(df, customer_metrics):
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    with st.spinner("Scoring recommendations..."):
+        recommender = get_recommender(df, rules)
+    recommendations = render_customer_recommendations(segment_customers, recommender)
+    
+    preview_options = segment_customers.sort_values('TotalSpend', ascending=False)['UserID'].tolist()
+    preview_customer = st.selectbox(
+        "Preview Email For",
+        options=preview_options,
+        index=0,
+        help="Each customer's email lists their own recommended products"
+    )
+    customer_products = recommendations.loc[
+        recommendations['UserID'] == preview_customer, 'ProductID'
+    ].tolist()
+    customer_history = df.loc[df['UserID'] == preview_customer, 'ProductID'].value_counts()
+    if not customer_products:
+        # No co-purchase signal for this customer: fall back to segment favourites
+        customer_products = segment_products.index.tolist()[:RECOMMENDATIONS_PER_CUSTOMER]
+    
     # Generate Email Button
     if st.button("Generate Marketing Email", type="primary", use_container_width=True):
         with st.spinner("Crafting your personalized email..."):
             # Generate email content
             avg_spend = segment_customers['TotalSpend'].mean()
-            top_product = segment_products.index[0] if len(segment_products) > 0 else "our products"
+            top_product = customer_history.index[0] if len(customer_history) > 0 else "our products"
             
             # Customize email based on segment and campaign type
-            if "VIP" in selected_segment or "High" in selected_segment:
-                greeting = "Dear Valued Customer"
-                offer = "exclusive 20% VIP discount"
-                cta = "CLAIM YOUR VIP OFFER"
-            elif "Loyal" in selected_segment:
-                greeting = "Hello Loyal Friend"
-                offer = "special 15% loyalty reward"
-                cta = "REDEEM YOUR REWARD"
-            elif "Growing" in selected_segment or "New" in selected_segment:
-                greeting = "Hi there"
-                offer = "welcoming 10% discount"
-                cta = "START SHOPPING"
-            else:
-                greeting = "Hello"
-                offer = "special 10% discount"
-                cta = "SHOP NOW"
+            greeting, offer, cta = campaign_offer(selected_segment)
+            impact = load_campaign_impact(df, selected_segment, campaign_type, tuple(segment_user_ids))
+            conversions_low, conversions_high = impact['conversions_interval']
+            revenue_low, revenue_high = impact['revenue_interval']
             
             email_draft = f"""
 ### Generated Email Campaign
@@ -106,7 +153,7 @@ Based on your purchase history, especially your interest in **{top_product}**, w
 
 Get **{offer}** on your next purchase! This includes:
 
-{chr(10).join([f'• **{prod}** - One of your favorites!' for prod in segment_products.index.tolist()[:3]])}
+{chr(10).join([f'• **{prod}** - Picked for you!' for prod in customer_products])}
 
 **Why This Offer is Perfect for You:**
 
@@ -129,10 +176,10 @@ The Smart Retail Team
 
 **Campaign Performance Predictions:**
 
-- **Expected Open Rate:** {np.random.randint(25, 45)}%
-- **Expected Click Rate:** {np.random.randint(8, 18)}%
-- **Estimated Conversions:** {int(len(segment_customers) * np.random.uniform(0.05, 0.15))} customers
-- **Potential Revenue:** ₹{len(segment_customers) * avg_spend * np.random.uniform(0.05, 0.15):,.2f}
+- **Expected Open Rate:** {impact['open_rate']:.0%}
+- **Expected Click Rate:** {impact['click_rate']:.0%}
+- **Estimated Conversions:** {impact['conversions']:,.0f} customers (90% CI {conversions_low:,.0f}–{conversions_high:,.0f}), from a {impact['repurchase_rate']:.0%} lifted repurchase rate
+- **Potential Revenue:** ₹{impact['revenue']:,.2f} (90% CI ₹{revenue_low:,.0f}–₹{revenue_high:,.0f})
             """
             
             st.markdown(email_draft)
@@ -157,8 +204,224 @@ The Smart Retail Team
     
     # Show segment customers
     with st.expander(f"View All Customers in {selected_segment}"):
-        display_cols = ['UserID', 'TotalSpend', 'Frequency', 'UniqueProducts', 'Recency', 'CLV']
+        display_cols = ['UserID', 'TotalSpend', 'Frequency', 'UniqueProducts', 'Recency', 'CLV', 'PAlive', 'ExpectedPurchases90']
         segment_display = segment_customers[display_cols].sort_values('TotalSpend', ascending=False)
         st.dataframe(segment_display, use_container_width=True, height=400)
     
+    render_ai_copy(df, customer_metrics, campaign_type)
+    
+    render_bulk_export(df, customer_metrics, segment_customers, recommender)
+    
+    if similarity_index is not None:
+        render_lookalike_audience(customer_metrics, segment_customers, similarity_index)
+    
     st.markdown('</div>', unsafe_allow_html=True)
+
+
+def render_customer_recommendations(segment_customers, recommender):
+    """
+    Render per-customer product recommendations for the selected segment
+    
+    Args:
+        segment_customers: Customer metrics of the selected segment
+        recommender: Fitted BasketRecommender
+    
+    Returns:
+        DataFrame with UserID, Rank, ProductID, Score for the segment
+    """
+    st.markdown("### Personalized Recommendations")
+    st.markdown("Top products each customer has not bought yet, scored from co-purchases and bundle rules")
+    
+    recommendations = recommender.recommend(segment_customers['UserID'], top_n=RECOMMENDATIONS_PER_CUSTOMER)
+    
+    table = recommendations.pivot(index='UserID', columns='Rank', values='ProductID')
+    table.columns = [f'Product {rank}' for rank in table.columns]
+    table = table.reset_index()
+    
+    st.markdown(f"**{len(table):,}** of {len(segment_customers):,} customers have personalized picks")
+    st.dataframe(table, use_container_width=True, height=300)
+    
+    st.download_button(
+        label="Download Recommendations",
+        data=table.to_csv(index=False),
+        file_name=f"recommendations_{segment_customers['SegmentName'].iloc[0].replace(' ', '_')}.csv",
+        mime="text/csv"
+    )
+    
+    return recommendations
+
+
+def render_ai_copy(df, customer_metrics, campaign_type):
+    """
+    Render LLM copy generation for every segment at once
+    
+    Args:
+        df: Transaction DataFrame
+        customer_metrics: Customer metrics DataFrame with segments
+        campaign_type: Selected campaign type
+    """
+    with st.expander("AI Copy for All Segments"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            backend_name = st.selectbox(
+                "Backend",
+                options=COPY_BACKENDS,
+                format_func=lambda name: {'stub': 'Local stub (offline)', 'openai': 'OpenAI'}[name],
+                help="The local stub is deterministic and needs no API key"
+            )
+        
+        with col2:
+            max_concurrency = st.slider("Concurrent Requests", min_value=1, max_value=32, value=8)
+        
+        with col3:
+            temperature = st.slider("Temperature", min_value=0.0, max_value=1.0, value=0.7, step=0.1)
+        
+        if not st.button("Generate Copy"):
+            return
+        
+        segments = customer_metrics.groupby('SegmentName').agg(
+            Size=('UserID', 'size'), AvgSpend=('TotalSpend', 'mean')
+        )
+        segment_of_user = customer_metrics.set_index('UserID')['SegmentName']
+        top_products = (
+            df.assign(SegmentName=df['UserID'].map(segment_of_user))
+            .groupby('SegmentName')['ProductID']
+            .agg(lambda products: products.value_counts().index[:3].tolist())
+        )
+        prompts = [
+            build_copy_prompt(name, campaign_type, row.Size, row.AvgSpend, top_products.get(name, []))
+            for name, row in segments.iterrows()
+        ]
+        
+        try:
+            generator = CopyGenerator(
+                get_backend(backend_name), ResponseCache(COPY_CACHE_DIR), max_concurrency=max_concurrency
+            )
+            with st.spinner(f"Generating copy for {len(prompts)} segments..."):
+                completions = generator.generate(prompts, temperature=temperature)
+        except Exception as e:
+            st.error(f"Copy generation failed: {e}")
+            return
+        
+        stats = generator.stats
+        st.caption(f"{stats['prompts']} prompts in {stats['seconds']:.2f}s · "
+                   f"{stats['cache_hits']} from cache · {stats['backend_calls']} backend calls · "
+                   f"{stats['retries']} retries")
+        for name, completion in zip(segments.index, completions):
+            st.markdown(f"**{name}**")
+            st.text(completion)
+
+
+def render_bulk_export(df, customer_metrics, segment_customers, recommender):
+    """
+    Render the bulk export of one personalized email per customer
+    
+    The export runs on a background thread and is tracked in session state,
+    so the page stays usable while messages are written to disk.
+    
+    Args:
+        df: Transaction DataFrame
+        customer_metrics: Customer metrics DataFrame with segments
+        segment_customers: Customer metrics of the selected segment
+        recommender: Fitted BasketRecommender
+    """
+    st.markdown("### Bulk Campaign Export")
+    st.markdown("Render a personalized email for every customer and stream it to a file for your mail system")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        scope = st.radio("Customers", options=["Selected Segment", "All Customers"], horizontal=True)
+    
+    with col2:
+        file_format = st.selectbox("Format", options=EXPORT_FORMATS, format_func=str.upper)
+    
+    with col3:
+        chunk_size = st.number_input("Chunk Size", min_value=1_000, max_value=100_000, value=10_000, step=1_000)
+    
+    job = st.session_state.get('campaign_export_job')
+    running = job is not None and not job.done
+    
+    if st.button("Start Export", disabled=running):
+        customers = segment_customers if scope == "Selected Segment" else customer_metrics
+        path = os.path.join(tempfile.mkdtemp(prefix='campaign_'), f'campaign_emails.{file_format}')
+        messages = iter_customer_messages(df, customers, recommender, RECOMMENDATIONS_PER_CUSTOMER, chunk_size)
+        job = CampaignExportJob(messages, path, file_format, total=len(customers)).start()
+        st.session_state.campaign_export_job = job
+    
+    if job is None:
+        return
+    
+    if job.error is not None:
+        st.error(f"Export failed: {job.error}")
+    elif not job.done:
+        st.progress(job.rows / max(job.total or 1, 1), text=f"Written {job.rows:,} of {job.total:,} messages...")
+        st.button("Refresh Status")
+    else:
+        result = job.result
+        st.success(f"Exported **{result['rows']:,}** messages in {result['seconds']:.2f}s "
+                   f"({result['rows_per_second']:,.0f} messages/s) to `{result['path']}`")
+        with open(result['path'], 'rb') as handle:
+            st.download_button(
+                label="Download Export",
+                data=handle.read(),
+                file_name=os.path.basename(result['path']),
+                mime="application/jsonl" if result['path'].endswith('jsonl') else "text/csv"
+            )
+
+
+def render_lookalike_audience(customer_metrics, segment_customers, similarity_index):
+    """
+    Render lookalike audience builder based on customer similarity
+    
+    Args:
+        customer_metrics: Customer metrics DataFrame with segments
+        segment_customers: Customer metrics of the selected segment
+        similarity_index: CustomerSimilarityIndex over the segmentation features
+    """
+    st.markdown("### Lookalike Audience")
+    st.markdown("Find the customers who behave most like your best customers, across all segments")
+    
+    col1, col2 = st.columns([3, 1])
+    
+    seed_options = segment_customers.sort_values('TotalSpend', ascending=False)['UserID'].tolist()
+    
+    with col1:
+        seeds = st.multiselect(
+            "Seed Customers",
+            options=seed_options,
+            default=seed_options[:1],
+            help="Audience members are ranked by their distance to the closest seed"
+        )
+    
+    with col2:
+        audience_size = st.number_input(
+            "Audience Size",
+            min_value=5,
+            max_value=max(len(customer_metrics) - 1, 5),
+            value=min(50, max(len(customer_metrics) - 1, 5)),
+            step=5
+        )
+    
+    if not seeds:
+        st.info("Pick at least one seed customer to build an audience.")
+        return
+    
+    audience = similarity_index.lookalikes(seeds, audience_size)
+    audience = audience.merge(
+        customer_metrics[['UserID', 'SegmentName', 'TotalSpend', 'Frequency', 'Recency']],
+        on='UserID',
+        how='left'
+    )
+    
+    st.markdown(f"**{len(audience)}** lookalike customers — "
+                f"{(audience['SegmentName'] != segment_customers['SegmentName'].iloc[0]).sum()} from other segments")
+    st.dataframe(audience, use_container_width=True, height=300)
+    
+    st.download_button(
+        label="Download Lookalike Audience",
+        data=audience.to_csv(index=False),
+        file_name="lookalike_audience.csv",
+        mime="text/csv"
+    )
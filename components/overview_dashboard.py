@@ -1,26 +1,121 @@
 """Overview Dashboard component"""
+import numpy as np
 import streamlit as st
 import plotly.express as px
+from utils.aggregations import build_overview_aggregates, resample_rollup, top_products_from_rollup
+from utils.cohorts import COHORT_FREQUENCIES, build_cohort_matrix
+from components.performance_panel import shared_result
 
 
-def render_overview_dashboard(df):
+def load_overview_aggregates(df, engine):
+    """Build the overview rollups once per dataset (every engine gives the same rollups)"""
+    return shared_result('overview_aggregates', lambda: build_overview_aggregates(df, engine))
+
+
+def _extends(df, previous):
+    """Whether df is previous with new rows appended"""
+    n = len(previous)
+    if len(df) <= n:
+        return False
+    head = df.iloc[:n]
+    return all(np.array_equal(head[c].to_numpy(), previous[c].to_numpy()) for c in ['Date', 'UserID', 'Amount'])
+
+
+def load_cohort_matrix(df, frequency):
+    """
+    Cohort matrix for df, updated incrementally when df extends the last dataset
+
+    A reloaded export that only appends newer transactions is folded into the
+    previous matrix instead of being recounted from scratch.
+    """
+    cache = st.session_state.setdefault('cohort_matrices', {})
+    previous = cache.get(frequency)
+    if previous is not None and previous[0] is df:
+        return previous[1]
+
+    matrix = None
+    if previous is not None and _extends(df, previous[0]):
+        try:
+            matrix = previous[1].update(df.iloc[len(previous[0]):])
+        except ValueError:
+            # Appended rows reach back before the latest period: rebuild
+            matrix = None
+    if matrix is None:
+        matrix = build_cohort_matrix(df, frequency)
+
+    cache[frequency] = (df, matrix)
+    return matrix
+
+
+def render_cohort_retention(df):
+    """
+    Render acquisition-cohort retention and revenue heatmaps
+
+    Args:
+        df: Transaction DataFrame
+    """
+    st.markdown("### Cohort Retention")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        frequency = st.radio("Cohort Period", options=COHORT_FREQUENCIES, horizontal=True)
+    with col2:
+        view = st.radio("Show", options=["Retention %", "Revenue per Customer"], horizontal=True)
+
+    matrix = load_cohort_matrix(df, frequency)
+    if view == "Retention %":
+        values = matrix.retention() * 100
+        title, text_format, colorbar = 'Share of Cohort Purchasing (%)', '.0f', '%'
+    else:
+        values = matrix.revenue_per_customer(cumulative=True)
+        title, text_format, colorbar = 'Cumulative Revenue per Acquired Customer (₹)', ',.0f', '₹'
+
+    unit = 'Month' if frequency == 'Monthly' else 'Week'
+    label_format = '%b %Y' if frequency == 'Monthly' else '%d %b %Y'
+    labels = [f"{start.strftime(label_format)} ({size:,})"
+              for start, size in zip(values.index, matrix.cohort_sizes[matrix.cohort_sizes > 0])]
+
+    fig = px.imshow(
+        values.to_numpy(),
+        x=[f"{unit} {offset}" for offset in values.columns],
+        y=labels,
+        aspect='auto',
+        text_auto=text_format if values.size <= 400 else False,
+        color_continuous_scale=['#BDDDFC', '#88BDF2', '#6A89A7', '#384959'],
+        labels=dict(x=f'{unit}s Since First Purchase', y='Cohort (Customers)', color=colorbar),
+        title=title
+    )
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter, sans-serif', color='#384959'),
+        height=max(300, 28 * len(labels) + 120)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def render_overview_dashboard(df, profile, engine='pandas'):
     """
     Render overview dashboard with key metrics and charts
     
     Args:
         df: Transaction DataFrame
+        profile: DatasetProfile computed at ingestion
+        engine: Query engine for the rollups
     """
     st.markdown('<div class="animated">', unsafe_allow_html=True)
     
     # Key Metrics Row
     st.markdown("### Key Performance Metrics")
     
+    aggregates = load_overview_aggregates(df, engine)
+    
     col1, col2, col3, col4 = st.columns(4)
     
-    total_transactions = df['TransactionID'].nunique()
-    total_customers = df['UserID'].nunique()
-    total_products = df['ProductID'].nunique()
-    total_revenue = df['Amount'].sum()
+    total_transactions = profile.n_transactions
+    total_customers = profile.n_customers
+    total_products = profile.n_products
+    total_revenue = profile.total_revenue
     
     with col1:
         st.markdown(f"""
@@ -62,9 +157,10 @@ def render_overview_dashboard(df):
     with col1:
         st.markdown("### Revenue Insights")
         
-        avg_transaction_value = df.groupby('TransactionID')['Amount'].sum().mean()
-        avg_items_per_transaction = df.groupby('TransactionID').size().mean()
-        avg_customer_value = df.groupby('UserID')['Amount'].sum().mean()
+        # Means of per-transaction / per-customer sums reduce to ratios of totals
+        avg_transaction_value = total_revenue / max(total_transactions, 1)
+        avg_items_per_transaction = profile.avg_basket_size
+        avg_customer_value = total_revenue / max(total_customers, 1)
         
         st.metric("Average Transaction Value", f"₹{avg_transaction_value:.2f}")
         st.metric("Avg Items per Transaction", f"{int(round(avg_items_per_transaction))}")
@@ -73,7 +169,7 @@ def render_overview_dashboard(df):
     with col2:
         st.markdown("### Time-based Insights")
         
-        date_range = (df['Date'].max() - df['Date'].min()).days
+        date_range = profile.date_range_days
         daily_avg_transactions = total_transactions / max(date_range, 1)
         daily_avg_revenue = total_revenue / max(date_range, 1)
         
@@ -89,17 +185,19 @@ def render_overview_dashboard(df):
     with col1:
         st.markdown("### Transaction Timeline")
         
-        daily_transactions = df.groupby(df['Date'].dt.date).agg({
-            'TransactionID': 'nunique',
-            'Amount': 'sum'
-        }).reset_index()
-        daily_transactions.columns = ['Date', 'Transactions', 'Revenue']
+        granularity = st.radio(
+            "Time Grain",
+            options=["Daily", "Weekly", "Monthly"],
+            horizontal=True,
+            label_visibility="collapsed"
+        )
+        timeline = resample_rollup(aggregates['daily'], granularity)
         
         fig2 = px.line(
-            daily_transactions,
+            timeline,
             x='Date',
             y='Transactions',
-            title='Daily Transaction Volume',
+            title=f'{granularity} Transaction Volume',
             markers=True
         )
         fig2.update_layout(
@@ -115,12 +213,7 @@ def render_overview_dashboard(df):
     with col2:
         st.markdown("### Top Performing Products")
         
-        top_products = df.groupby('ProductID').agg({
-            'TransactionID': 'nunique',
-            'Amount': 'sum'
-        }).reset_index()
-        top_products.columns = ['Product', 'Times Sold', 'Total Revenue']
-        top_products = top_products.sort_values('Total Revenue', ascending=False).head(10)
+        top_products = top_products_from_rollup(aggregates['daily_products'], top_n=10)
         
         fig3 = px.bar(
             top_products.head(10).sort_values('Total Revenue', ascending=True),
@@ -141,6 +234,7 @@ def render_overview_dashboard(df):
         )
         st.plotly_chart(fig3, use_container_width=True)
     
+    render_cohort_retention(df)
     
     # Raw Data
     with st.expander("View Raw Transaction Data"):
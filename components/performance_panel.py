@@ -0,0 +1,78 @@
+"""Performance panel: the result cache shared by every session and its metrics"""
+import json
+import os
+
+import streamlit as st
+from utils.result_cache import ResultCache
+
+# Memory budget of the shared result cache, in MiB
+RESULT_CACHE_MB = int(os.getenv('RESULT_CACHE_MB', '1024'))
+
+
+@st.cache_resource(show_spinner=False)
+def load_result_cache(max_bytes):
+    """Create the result cache once per server process; every session shares it"""
+    return ResultCache(max_bytes)
+
+
+def get_result_cache():
+    """The shared result cache"""
+    return load_result_cache(RESULT_CACHE_MB * 2**20)
+
+
+def shared_result(name, compute, **params):
+    """
+    Result of compute() for the current dataset, computed once across sessions
+
+    Results are keyed by the dataset fingerprint and dtype backend, so
+    identical uploads in different sessions share them without hashing the
+    DataFrame on every rerun. Concurrent requests for the same result wait
+    for one computation. Results are shared objects: callers must not
+    modify them.
+
+    Args:
+        name: Result name
+        compute: Function of no arguments producing the result
+        **params: Everything besides the dataset the result depends on
+
+    Returns:
+        The result
+    """
+    dataset_key = st.session_state.get('dataset_key')
+    if dataset_key is None:
+        return compute()
+    key = (name, *dataset_key, json.dumps(params, sort_keys=True, default=str))
+    return get_result_cache().get_or_compute(key, compute)
+
+
+def render_performance_panel():
+    """Sidebar metrics of the shared result cache"""
+    cache = get_result_cache()
+    stats = cache.stats()
+    with st.expander("Performance"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+            st.metric("Evictions", f"{stats['evictions']:,}")
+        with col2:
+            st.metric("Time Saved", f"{stats['seconds_saved']:,.1f}s")
+            st.metric("Shared Waits", f"{stats['waits']:,}",
+                      help="Requests that waited for the same computation in another session instead of repeating it")
+
+        st.progress(
+            min(stats['bytes'] / stats['max_bytes'], 1.0),
+            text=f"Memory: {stats['bytes'] / 2**20:,.0f} / {stats['max_bytes'] / 2**20:,.0f} MiB "
+                 f"in {stats['entries']} results"
+        )
+        st.caption(f"{stats['hits']:,} hits · {stats['misses']:,} misses")
+
+        entries = cache.entries()
+        if len(entries):
+            entries['Key'] = entries['Key'].map(lambda key: f"{key[0]} · {key[1][:8]} · {key[2]} · {key[3]}")
+            st.dataframe(entries, hide_index=True, use_container_width=True,
+                         column_config={'Size (MiB)': st.column_config.NumberColumn(format="%.1f"),
+                                        'Compute (s)': st.column_config.NumberColumn(format="%.2f")})
+
+        if st.button("Clear Cache", help="Drop every shared result; they are recomputed on demand"):
+            cache.clear()
+            st.rerun()
@@ -1,33 +1,48 @@
 """Sidebar component for data upload and settings"""
 import streamlit as st
 import pandas as pd
+from utils.profiling import choose_support_for_itemset_budget
+from utils.columnar import PYARROW_AVAILABLE
+from utils.query_engine import available_engines
+from utils.validation import VALIDATION_MODES
+from components.workspace_panel import render_workspace_panel
 
+MAX_SEGMENTS = 5
 
-def calculate_smart_parameters(df):
+
+@st.cache_data(show_spinner=False)
+def load_itemset_budget_support(fingerprint, _profile, max_itemsets):
+    """Support for an itemset budget, searched once per dataset and budget rather than on every rerun"""
+    return choose_support_for_itemset_budget(_profile, max_itemsets)
+
+
+def calculate_smart_parameters(profile, max_itemsets=None):
     """
     Automatically calculate optimal parameters based on data characteristics
     
     Args:
-        df: Transaction DataFrame
+        profile: DatasetProfile computed at ingestion
+        max_itemsets: Optional budget of frequent itemsets; when set, support
+            is chosen empirically from the item-frequency distribution
     
     Returns:
         tuple: (min_support, min_confidence, n_clusters)
     """
     # Get data characteristics
-    n_transactions = df['TransactionID'].nunique()
-    n_customers = df['UserID'].nunique()
-    n_products = df['ProductID'].nunique()
+    n_transactions = profile.n_transactions
+    n_customers = profile.n_customers
     
     # Calculate average basket size
-    avg_items_per_transaction = df.groupby('TransactionID').size().mean()
+    avg_items_per_transaction = profile.avg_basket_size
     
     # Calculate data sparsity (how diverse the purchases are)
-    total_possible_combinations = n_transactions * n_products
-    actual_transactions = len(df)
-    sparsity = actual_transactions / total_possible_combinations if total_possible_combinations > 0 else 0
+    sparsity = profile.sparsity
     
     # Smart support calculation based on transaction count AND sparsity
-    if n_transactions < 50:
+    if max_itemsets:
+        min_support = load_itemset_budget_support(profile.fingerprint, profile, max_itemsets)
+        support_reason = f"Bounded to ≤{max_itemsets:,} itemsets"
+    elif n_transactions < 50:
         min_support = 0.15  # 15% for very small datasets
         support_reason = "Small dataset (<50 txn)"
     elif n_transactions < 200:
@@ -73,15 +88,15 @@ def calculate_smart_parameters(df):
     return min_support, min_confidence, n_clusters, support_reason, conf_reason, cluster_reason
 
 
-def render_sidebar(df=None):
+def render_sidebar(profile=None):
     """
     Render sidebar with data upload and analysis settings
     
     Args:
-        df: Optional DataFrame for smart parameter calculation
+        profile: Optional DatasetProfile for smart parameter calculation
     
     Returns:
-        tuple: (uploaded_file, min_support, min_confidence, n_clusters)
+        tuple: (uploaded_file, category_file, min_support, min_confidence, n_clusters)
     """
     with st.sidebar:
         st.markdown("### Data Upload")
@@ -96,6 +111,38 @@ def render_sidebar(df=None):
             help="Upload transaction data for analysis"
         )
         
+        category_file = st.file_uploader(
+            "Product categories (optional)",
+            type=["csv"],
+            help="CSV with ProductID and Category columns. Bundles are then mined per category first and drilled down into frequent categories."
+        )
+        
+        st.toggle(
+            "Columnar (Arrow) Mode",
+            value=False,
+            key='arrow_mode',
+            disabled=not PYARROW_AVAILABLE,
+            help="Load data into Arrow-backed columns (dictionary-encoded products) for lower memory use and faster group-bys on large files. Requires pyarrow."
+        )
+        
+        st.selectbox(
+            "Validation Mode",
+            VALIDATION_MODES,
+            index=VALIDATION_MODES.index('repair'),
+            key='validation_mode',
+            format_func=str.title,
+            help="Strict rejects an upload with any invalid line. Repair drops unparsable, empty, negative and duplicate lines and transactions spanning several customers or days. Every issue is listed either way."
+        )
+        
+        st.selectbox(
+            "Query Engine",
+            available_engines(),
+            key='query_engine',
+            help="Engine for the customer metrics, segment insights and overview rollups. Polars and DuckDB run the same group-bys multithreaded and appear here when installed."
+        )
+        
+        render_workspace_panel()
+        
         # Check if file changed
         if uploaded_file is not None:
             if st.session_state.uploaded_file_name != uploaded_file.name:
@@ -115,15 +162,30 @@ def render_sidebar(df=None):
         )
         
         if use_smart_mode:
-            if df is not None:
+            if profile is not None:
+                bound_itemsets = st.checkbox(
+                    "Bound Itemset Count",
+                    value=False,
+                    help="Choose support from the item-frequency distribution so the number of frequent itemsets stays bounded"
+                )
+                max_itemsets = None
+                if bound_itemsets:
+                    max_itemsets = st.number_input(
+                        "Max Frequent Itemsets",
+                        min_value=10,
+                        max_value=100000,
+                        value=500,
+                        step=50
+                    )
+                
                 # Calculate smart parameters once
-                min_support, min_confidence, n_clusters, s_reason, c_reason, k_reason = calculate_smart_parameters(df)
+                min_support, min_confidence, n_clusters, s_reason, c_reason, k_reason = calculate_smart_parameters(profile, max_itemsets)
                 
                 # Display the calculated parameters
                 st.success("**Smart Parameters Selected:**")
                 
                 st.markdown(f"""<div style="font-size: 0.9em; color: #4a5568;">
-<strong>Bundle Support: {int(min_support * 100)}%</strong><br>
+<strong>Bundle Support: {min_support * 100:.3g}%</strong><br>
 <span style="color: #718096; font-size: 0.9em;">ℹ️ <em>{s_reason}</em></span><br><br>
 
 <strong>Confidence: {int(min_confidence * 100)}%</strong><br>
@@ -157,13 +219,22 @@ def render_sidebar(df=None):
                 help="Likelihood that customers who buy the first product will also buy the second product"
             ) / 100
             
+            auto_clusters = st.checkbox(
+                "Auto-select Segment Count",
+                value=False,
+                help="Pick the number of segments with the best silhouette score"
+            )
+            
             n_clusters = st.slider(
                 "Customer Segments",
                 min_value=2,
-                max_value=5,
+                max_value=MAX_SEGMENTS,
                 value=3,
+                disabled=auto_clusters,
                 help="Number of customer segments to create"
             )
+            if auto_clusters:
+                n_clusters = 'auto'
         
         st.markdown("---")
         
@@ -181,5 +252,5 @@ def render_sidebar(df=None):
         else:
             st.info("Using demo data")
     
-    return uploaded_file, min_support, min_confidence, n_clusters
+    return uploaded_file, category_file, min_support, min_confidence, n_clusters
 
@@ -1,10 +1,76 @@
 """Smart Bundles component for market basket analysis"""
+import io
+import time
+
+import pandas as pd
 import streamlit as st
 import plotly.express as px
-from utils.market_basket import prepare_basket_data, find_product_bundles, calculate_bundle_revenue_potential
+from utils.market_basket import (
+    encode_baskets, basket_frame, find_product_bundles, add_value_metrics, calculate_bundle_revenue_potential,
+    transaction_rows_by_group, mine_group_bundles, RULE_METRICS
+)
+from utils.rule_index import RuleIndex
+from utils.taxonomy import build_taxonomy, mine_hierarchical_bundles
+from utils.temporal_basket import build_window_counts, WINDOW_FREQUENCIES
+from components.workspace_panel import load_artifact, save_artifact
+from components.performance_panel import shared_result
+
+
+def load_basket_matrix(df):
+    """Encode the transaction log once per dataset; global and segment mining share it"""
+    return shared_result('basket_matrix', lambda: encode_baskets(df))
+
+
+def load_taxonomy(df, categories, categories_key):
+    """Align the category mapping with the basket matrix columns"""
+    return shared_result(
+        'taxonomy', lambda: build_taxonomy(load_basket_matrix(df).items, categories), categories=categories_key
+    )
+
+
+def compute_bundle_rules(df, taxonomy, rule_params):
+    """Bundle rules (and category rules when mining through the taxonomy) from the workspace or mined"""
+    baskets = load_basket_matrix(df)
+    min_support, min_confidence, metric = rule_params['min_support'], rule_params['min_confidence'], rule_params['metric']
+    hierarchical = rule_params['category_min_support'] is not None
+    # Rules of a workspace dataset are mined once per parameter set
+    rules = load_artifact('rules', rule_params)
+    category_rules = load_artifact('category_rules', rule_params) if hierarchical else None
+    if rules is None or (hierarchical and category_rules is None):
+        if hierarchical:
+            category_rules, _, rules = mine_hierarchical_bundles(
+                baskets, taxonomy, min_support, min_confidence, metric,
+                category_min_support=rule_params['category_min_support']
+            )
+            save_artifact('category_rules', category_rules, rule_params)
+        else:
+            _, rules = find_product_bundles(
+                basket_frame(baskets, min_support), min_support, min_confidence,
+                top_k=rule_params['top_k'],
+                metric=metric
+            )
+        rules = add_value_metrics(rules, baskets)
+        save_artifact('rules', rules, rule_params)
+    return rules, category_rules
+
+
+def compute_segment_bundles(df, customer_metrics, min_support, min_confidence, top_k, metric):
+    """Mine bundles for every segment; returns the rules, transactions per segment and seconds taken"""
+    baskets = load_basket_matrix(df)
+    groups = customer_metrics.set_index('UserID')['SegmentName']
+    started = time.perf_counter()
+    segment_rows = transaction_rows_by_group(baskets, df, groups)
+    segment_rules = mine_group_bundles(baskets, segment_rows, min_support, min_confidence, top_k=top_k, metric=metric)
+    sizes = {segment: len(rows) for segment, rows in segment_rows.items()}
+    return segment_rules, sizes, time.perf_counter() - started
+
 
+def load_window_counts(df, frequency):
+    """Count items and pairs per window once per dataset and window length"""
+    return shared_result('window_counts', lambda: build_window_counts(df, frequency), frequency=frequency)
 
-def render_smart_bundles(df, min_support, min_confidence):
+
+def render_smart_bundles(df, min_support, min_confidence, categories=None):
     """
     Render smart bundles analysis tab
     
@@ -12,21 +78,91 @@ def render_smart_bundles(df, min_support, min_confidence):
         df: Transaction DataFrame
         min_support: Minimum support threshold
         min_confidence: Minimum confidence threshold
+        categories: Optional DataFrame mapping ProductID to Category; bundles
+            are then mined at category level first
+    
+    Returns:
+        DataFrame of mined association rules (empty if none were found)
     """
     st.markdown('<div class="animated">', unsafe_allow_html=True)
     st.markdown("### Product Bundle Analysis")
     st.markdown("Discover which products are frequently purchased together using **Apriori Algorithm**")
     
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        metric = st.selectbox(
+            "Rank Bundles By",
+            options=RULE_METRICS,
+            format_func=str.title,
+            help="Metric used to order bundles",
+            key="bundle_metric"
+        )
+    
+    with col2:
+        use_top_k = st.toggle(
+            "Top-K Mining",
+            value=False,
+            help="Only mine the best bundles by the chosen metric. Much faster at low support.",
+            key="bundle_use_top_k"
+        )
+    
+    with col3:
+        top_k = st.number_input(
+            "Bundles to Keep",
+            min_value=5,
+            max_value=500,
+            value=25,
+            step=5,
+            disabled=not use_top_k,
+            key="bundle_top_k"
+        )
+    
+    categories_key = int(pd.util.hash_pandas_object(categories, index=False).sum()) if categories is not None else None
+    taxonomy = load_taxonomy(df, categories, categories_key) if categories is not None else None
+    category_min_support = min_support
+    if taxonomy is not None:
+        category_min_support = st.number_input(
+            "Category Support %",
+            min_value=float(min_support * 100),
+            max_value=100.0,
+            value=float(min_support * 100),
+            step=0.5,
+            format="%.2f",
+            disabled=use_top_k,
+            help="Only category combinations above this support are drilled into. "
+                 "Equal to the bundle support, product bundles are the same as without categories."
+        ) / 100
+    
+    hierarchical = taxonomy is not None and not use_top_k
+    rule_params = {
+        'min_support': min_support, 'min_confidence': min_confidence, 'metric': metric,
+        'top_k': top_k if use_top_k else None,
+        'category_min_support': category_min_support if hierarchical else None,
+        'categories': categories_key if hierarchical else None
+    }
+    
     with st.spinner("Analyzing product combinations..."):
-        basket_sets = prepare_basket_data(df)
-        frequent_itemsets, rules = find_product_bundles(basket_sets, min_support, min_confidence)
+        baskets = load_basket_matrix(df)
+        rules, category_rules = shared_result(
+            'bundle_rules', lambda: compute_bundle_rules(df, taxonomy, rule_params), **rule_params
+        )
+    
+    if category_rules is not None:
+        with st.expander(f"Category Bundles ({len(category_rules)})"):
+            if category_rules.empty:
+                st.info("No category combinations meet the thresholds.")
+            else:
+                display_df = category_rules[['antecedents_str', 'consequents_str', 'confidence_pct', 'lift_score', 'support_pct']].copy()
+                display_df.columns = ['Category A', 'Category B', 'Confidence %', 'Lift', 'Support %']
+                st.dataframe(display_df, use_container_width=True, height=300)
     
     if not rules.empty:
         st.success(f"Found **{len(rules)}** product bundle opportunities!")
         
         # Revenue Potential
         st.markdown("### Revenue Opportunity Analysis")
-        revenue_potential = calculate_bundle_revenue_potential(df, rules)
+        revenue_potential = calculate_bundle_revenue_potential(baskets, rules)
         
         if not revenue_potential.empty:
             col1, col2, col3 = st.columns(3)
@@ -54,9 +190,9 @@ def render_smart_bundles(df, min_support, min_confidence):
         for idx, row in rules.head(8).iterrows():
             col1, col2 = st.columns([3, 1])
             
-            # Get potential revenue from the revenue_potential dataframe if available
-            if idx < len(revenue_potential):
-                potential = revenue_potential.iloc[idx]['potential_revenue']
+            # Revenue potential is indexed like rules (one-to-one rules only)
+            if idx in revenue_potential.index:
+                potential = revenue_potential.loc[idx, 'potential_revenue']
             else:
                 potential = 0.0
             
@@ -72,6 +208,8 @@ def render_smart_bundles(df, min_support, min_confidence):
                     <div style="margin-top: 15px;">
                         <span class="badge badge-info">Support: {row['support_pct']}%</span>
                         <span class="badge badge-info">Lift: {row['lift_score']}x</span>
+                        <span class="badge badge-info">Revenue Share: {row['revenue_support_pct']}%</span>
+                        <span class="badge badge-info">Avg Bundle: ₹{row['avg_bundle_value']:,.0f}</span>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -93,10 +231,14 @@ def render_smart_bundles(df, min_support, min_confidence):
         
         # Detailed Table
         with st.expander("View All Bundle Details"):
-            display_df = rules[['antecedents_str', 'consequents_str', 'confidence_pct', 'lift_score', 'support_pct']].copy()
-            display_df.columns = ['Product(s) A', 'Product(s) B', 'Confidence %', 'Lift', 'Support %']
+            display_df = rules[['antecedents_str', 'consequents_str', 'confidence_pct', 'lift_score', 'support_pct',
+                                'revenue_support_pct', 'avg_bundle_value']].copy()
+            display_df.columns = ['Product(s) A', 'Product(s) B', 'Confidence %', 'Lift', 'Support %',
+                                  'Revenue Support %', 'Avg Bundle Value']
             st.dataframe(display_df, use_container_width=True, height=400)
         
+        render_cart_addons(rules, metric)
+        
         # Visualization
         st.markdown("### Bundle Confidence Visualization")
         
@@ -108,7 +250,7 @@ def render_smart_bundles(df, min_support, min_confidence):
                     color='lift_score',
                     color_continuous_scale='Viridis',
                     labels={'confidence_pct': 'Confidence %', 'Bundle': '', 'lift_score': 'Lift Score'},
-                    title='Top 10 Product Bundles by Confidence')
+                    title=f'Top 10 Product Bundles by {metric.title()}')
         fig.update_layout(
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
@@ -121,4 +263,182 @@ def render_smart_bundles(df, min_support, min_confidence):
         st.warning(f"No bundles found with the current thresholds. Try adjusting the settings in the sidebar.")
         st.info("**Tip:** Lower the Support % or Confidence % to discover more patterns.")
     
+    render_bundle_trends(df, min_support, min_confidence, metric)
+    
     st.markdown('</div>', unsafe_allow_html=True)
+    
+    return rules
+
+
+def render_cart_addons(rules, metric):
+    """
+    Look up add-on products for a cart with the rule index and offer the index for download
+    
+    Args:
+        rules: Rules DataFrame from find_product_bundles
+        metric: Rule metric used to score add-ons
+    """
+    index = RuleIndex.from_rules(rules)
+    
+    st.markdown("### Cart Add-Ons")
+    cart = st.multiselect(
+        "Products in Cart",
+        options=list(index.items),
+        key='bundle_cart',
+        help="Products suggested by every bundle whose antecedent is in the cart, best rule first"
+    )
+    if cart:
+        addons = index.query(cart, top_n=5, metric=metric)
+        if addons:
+            addons_df = pd.DataFrame({
+                'Add-On': [addon['product'] for addon in addons],
+                metric.title(): [round(addon['score'], 3) for addon in addons],
+                'Because Of': [', '.join(addon['because_of']) for addon in addons]
+            })
+            st.dataframe(addons_df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No bundle applies to this cart.")
+    
+    index_file = io.BytesIO()
+    index.save(index_file)
+    st.download_button(
+        label="Download Rule Index",
+        data=index_file.getvalue(),
+        file_name="bundle_rules.npz",
+        help="Indexed bundle rules for serving cart add-on lookups (load with RuleIndex.load)"
+    )
+
+
+def render_bundle_trends(df, min_support, min_confidence, metric):
+    """
+    Render windowed bundle analysis for a date range and rule trends over time
+    
+    Args:
+        df: Transaction DataFrame
+        min_support: Minimum support threshold
+        min_confidence: Minimum confidence threshold
+        metric: Rule metric used for ranking
+    """
+    st.markdown("### Bundle Trends Over Time")
+    st.markdown("Mine bundles for any period and see how each bundle's strength changes from window to window")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        frequency = st.radio(
+            "Window",
+            options=list(WINDOW_FREQUENCIES),
+            horizontal=True
+        )
+    
+    with st.spinner("Counting bundles per window..."):
+        window_counts = load_window_counts(df, frequency)
+    
+    n_windows = len(window_counts.windows)
+    
+    with col2:
+        span = st.slider(
+            "Rolling Span (windows)",
+            min_value=1,
+            max_value=max(n_windows, 2),
+            value=1,
+            help="1 shows each window on its own; larger values smooth trends over several windows"
+        )
+    
+    window_starts = window_counts.windows.to_timestamp()
+    if n_windows > 1:
+        start, end = st.select_slider(
+            "Date Range",
+            options=list(window_starts),
+            value=(window_starts[0], window_starts[-1]),
+            format_func=lambda ts: ts.strftime('%Y-%m-%d')
+        )
+    else:
+        start = end = window_starts[0]
+    
+    range_rules = window_counts.rules(start, end, min_support, min_confidence, metric)
+    
+    if range_rules.empty:
+        st.info("No single-product bundles meet the thresholds in this date range.")
+        return
+    
+    st.markdown(f"**{len(range_rules)}** bundles between {start:%Y-%m-%d} and {end:%Y-%m-%d}")
+    
+    top_rules = range_rules.head(5)
+    trends = window_counts.rule_trends(top_rules, span)
+    
+    col1, col2 = st.columns(2)
+    
+    for col, value in ((col1, 'Support'), (col2, 'Confidence')):
+        with col:
+            fig = px.line(
+                trends,
+                x='Window',
+                y=value,
+                color='Rule',
+                markers=True,
+                title=f'{value} of Top Bundles per {frequency[:-2]}'
+            )
+            fig.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='Inter, sans-serif'),
+                yaxis=dict(tickformat='.0%'),
+                legend=dict(orientation='h', y=-0.3)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("View Bundles for Selected Range"):
+        display_df = range_rules[['antecedents_str', 'consequents_str', 'confidence_pct', 'lift_score', 'support_pct']].copy()
+        display_df.columns = ['Product A', 'Product B', 'Confidence %', 'Lift', 'Support %']
+        st.dataframe(display_df, use_container_width=True, height=300)
+
+
+def render_segment_bundles(df, customer_metrics, min_support, min_confidence):
+    """
+    Render bundles mined within each customer segment
+    
+    Uses the ranking and Top-K settings chosen above the global bundles.
+    
+    Args:
+        df: Transaction DataFrame
+        customer_metrics: DataFrame with UserID and SegmentName
+        min_support: Minimum support threshold (relative to the segment's transactions)
+        min_confidence: Minimum confidence threshold
+    """
+    st.markdown("### Bundles by Customer Segment")
+    st.markdown("What each segment buys together, mined from the same basket matrix as the bundles above")
+    
+    metric = st.session_state.get('bundle_metric', RULE_METRICS[0])
+    top_k = st.session_state.get('bundle_top_k', 25) if st.session_state.get('bundle_use_top_k') else None
+    segments_key = int(pd.util.hash_pandas_object(customer_metrics[['UserID', 'SegmentName']], index=False).sum())
+    
+    with st.spinner("Mining bundles for every segment..."):
+        segment_rules, sizes, seconds = shared_result(
+            'segment_bundles',
+            lambda: compute_segment_bundles(df, customer_metrics, min_support, min_confidence, top_k, metric),
+            segments=segments_key, min_support=min_support, min_confidence=min_confidence, top_k=top_k, metric=metric
+        )
+    
+    segments = sorted(segment_rules, key=lambda segment: -sizes[segment])
+    if not segments:
+        st.info("No segment transactions to mine.")
+        return
+    
+    segment = st.selectbox(
+        "Segment",
+        options=segments,
+        format_func=lambda name: f"{name} ({sizes[name]:,} transactions, {len(segment_rules[name])} bundles)"
+    )
+    st.caption(f"{len(segments)} segments mined in {seconds:.2f}s")
+    
+    rules = segment_rules[segment]
+    if rules.empty:
+        st.info(f"No bundles meet the thresholds within {segment}. Try lowering Support % or Confidence %.")
+        return
+    
+    display_df = rules[['antecedents_str', 'consequents_str', 'confidence_pct', 'lift_score', 'support_pct',
+                        'revenue_support_pct', 'avg_bundle_value']].copy()
+    display_df.columns = ['Product(s) A', 'Product(s) B', 'Confidence %', 'Lift', 'Support %',
+                          'Revenue Support %', 'Avg Bundle Value']
+    st.dataframe(display_df, use_container_width=True, height=300)
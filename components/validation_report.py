@@ -0,0 +1,28 @@
+"""Validation report of an uploaded transaction file"""
+import streamlit as st
+
+
+def render_validation_report(report):
+    """
+    Render every validation issue of an upload with sample lines
+
+    Args:
+        report: ValidationReport from utils.validation
+    """
+    if report.issues and report.error is None:
+        st.warning(
+            f"**Data repaired:** {report.n_dropped:,} of {report.n_rows:,} lines dropped "
+            f"({len(report.issues)} validation rule(s) failed)"
+        )
+
+    with st.expander(f"Data Validation ({len(report.issues)} issue(s), {report.mode} mode)", expanded=report.error is not None):
+        st.caption(f"{report.n_rows:,} lines validated in {report.seconds:.2f}s")
+        if not report.issues:
+            st.success("Every validation rule passed")
+            return
+
+        st.dataframe(report.summary(), use_container_width=True, hide_index=True)
+        for issue in report.issues:
+            if issue.sample is not None:
+                st.markdown(f"**{issue.rule}** · first offending lines")
+                st.dataframe(issue.sample, use_container_width=True)
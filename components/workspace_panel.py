@@ -0,0 +1,79 @@
+"""Workspace panel: reopen stored datasets and keep analysis artifacts across runs"""
+import os
+
+import streamlit as st
+from utils.workspace import Workspace
+
+# Database file of the shared workspace (defaults to workspace.duckdb / workspace.sqlite)
+WORKSPACE_PATH = os.getenv('WORKSPACE_PATH')
+
+
+@st.cache_resource(show_spinner=False)
+def load_workspace(path):
+    """Open the workspace once per server process; every session shares it"""
+    return Workspace(path)
+
+
+def get_workspace():
+    """The shared workspace, or None if its database cannot be opened"""
+    try:
+        return load_workspace(WORKSPACE_PATH)
+    except Exception as e:
+        # e.g. a DuckDB file locked by another process
+        st.session_state.workspace_error = str(e)
+        return None
+
+
+def render_workspace_panel():
+    """Sidebar controls to save the current dataset and reopen stored ones"""
+    workspace = get_workspace()
+    with st.expander("Workspace"):
+        if workspace is None:
+            st.warning(f"Workspace unavailable: {st.session_state.get('workspace_error')}")
+            return
+        
+        st.toggle(
+            "Save to Workspace",
+            value=False,
+            key='workspace_save',
+            help="Store this dataset and its customer metrics, segments, insights and bundle rules on disk. Reopening it later skips parsing and recomputation."
+        )
+        
+        datasets = workspace.list_datasets()
+        labels = {
+            row.dataset_id: f"{row.name} ({row.n_rows:,} rows, {str(row.saved_at)[:16]})"
+            for row in datasets.itertuples()
+        }
+        st.selectbox(
+            "Reopen Dataset",
+            options=[None] + list(labels),
+            format_func=lambda dataset_id: "—" if dataset_id is None else labels.get(dataset_id, dataset_id),
+            key='workspace_dataset',
+            help="Open a stored dataset instead of the upload"
+        )
+        st.caption(f"{workspace.backend} · {workspace.path}")
+
+
+def load_artifact(name, params=None):
+    """
+    Stored artifact of the current dataset
+
+    Args:
+        name: Artifact name
+        params: Parameters it was computed with
+
+    Returns:
+        DataFrame, or None when the dataset is not in the workspace or the
+        artifact was never stored
+    """
+    dataset_id = st.session_state.get('workspace_dataset_id')
+    workspace = get_workspace() if dataset_id else None
+    return workspace.load_artifact(dataset_id, name, params) if workspace else None
+
+
+def save_artifact(name, frame, params=None):
+    """Store an artifact of the current dataset once, when the dataset is in the workspace"""
+    dataset_id = st.session_state.get('workspace_dataset_id')
+    workspace = get_workspace() if dataset_id else None
+    if workspace and not workspace.has_artifact(dataset_id, name, params):
+        workspace.save_artifact(dataset_id, name, frame, params)
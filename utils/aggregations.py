@@ -0,0 +1,66 @@
+"""Pre-aggregated rollup tables for the overview dashboard"""
+from utils.query_engine import overview_aggregates, resolve_engine
+
+RESAMPLE_RULES = {
+    'Daily': 'D',
+    'Weekly': 'W',
+    'Monthly': 'MS'
+}
+
+
+def build_overview_aggregates(df, engine='pandas'):
+    """
+    Build the daily rollup tables used by the overview charts
+
+    The transaction frame is scanned once here; every chart on the overview
+    is then derived from these (much smaller) tables.
+
+    Args:
+        df: DataFrame with columns Date, UserID, ProductID, Amount, TransactionID
+        engine: Query engine for the rollups ('pandas', 'polars' or 'duckdb';
+            falls back to pandas when not installed)
+
+    Returns:
+        Dictionary with keys:
+            'daily': DataFrame indexed by day with Transactions, Revenue, Items
+            'daily_products': DataFrame with Date, ProductID, Transactions, Revenue
+    """
+    daily, daily_products = overview_aggregates(df, resolve_engine(engine))
+
+    return {
+        'daily': daily,
+        'daily_products': daily_products
+    }
+
+
+def resample_rollup(daily, granularity='Daily'):
+    """
+    Resample the daily rollup to a coarser time grain
+
+    Args:
+        daily: Daily rollup DataFrame from build_overview_aggregates
+        granularity: One of 'Daily', 'Weekly' or 'Monthly'
+
+    Returns:
+        DataFrame with Date, Transactions, Revenue, Items columns
+    """
+    rule = RESAMPLE_RULES[granularity]
+    if rule == 'D':
+        return daily.reset_index()
+    return daily.resample(rule).sum().reset_index()
+
+
+def top_products_from_rollup(daily_products, top_n=10):
+    """
+    Rank products by revenue using the per-day product rollup
+
+    Args:
+        daily_products: Per-day product rollup from build_overview_aggregates
+        top_n: Number of products to return
+
+    Returns:
+        DataFrame with Product, Times Sold, Total Revenue columns
+    """
+    top_products = daily_products.groupby('ProductID')[['Transactions', 'Revenue']].sum().reset_index()
+    top_products.columns = ['Product', 'Times Sold', 'Total Revenue']
+    return top_products.sort_values('Total Revenue', ascending=False).head(top_n)
@@ -0,0 +1,137 @@
+"""Data-driven campaign impact estimates from historical repurchase behaviour"""
+import numpy as np
+import pandas as pd
+
+# Multiplier on the segment's organic repurchase rate by campaign type
+CAMPAIGN_LIFT = {
+    'Product Recommendation': 1.10,
+    'Exclusive Discount': 1.25,
+    'VIP Upgrade': 1.15,
+    'Re-engagement': 1.20,
+    'New Product Launch': 1.05
+}
+
+# Typical retail email engagement by campaign type: (open rate, click rate)
+CAMPAIGN_ENGAGEMENT = {
+    'Product Recommendation': (0.30, 0.12),
+    'Exclusive Discount': (0.36, 0.15),
+    'VIP Upgrade': (0.40, 0.14),
+    'Re-engagement': (0.25, 0.08),
+    'New Product Launch': (0.32, 0.11)
+}
+
+# Upper bound on the bootstrap x customer weight block held in memory
+MAX_BLOCK_ELEMENTS = 2**24
+
+
+def repurchase_outcomes(df, horizon_days=None):
+    """
+    Per-customer repurchase record over a fixed horizon
+
+    Every order placed at least horizon_days before the end of the data is
+    an opportunity; it converts if the same customer orders again within
+    the horizon, and the value of that next order is recorded.
+
+    Args:
+        df: DataFrame with columns Date, UserID, TransactionID, Amount
+        horizon_days: Days after an order within which a repurchase counts
+            (defaults to 30, or half the date range for shorter histories)
+
+    Returns:
+        DataFrame indexed by UserID with Opportunities, Repurchases, RepurchaseValue
+    """
+    orders = df.groupby(['UserID', 'TransactionID'], sort=False).agg(Date=('Date', 'min'), Amount=('Amount', 'sum'))
+    orders = orders.reset_index().sort_values(['UserID', 'Date'], kind='stable')
+
+    users = orders['UserID'].to_numpy()
+    dates = orders['Date'].to_numpy()
+    amounts = orders['Amount'].to_numpy(dtype=np.float64)
+
+    if horizon_days is None:
+        span_days = (dates.max() - dates.min()) // np.timedelta64(1, 'D') if len(dates) else 0
+        horizon_days = int(min(30, max(span_days // 2, 1)))
+
+    # Next order of the same customer, found by shifting within the sorted frame
+    same_user = np.r_[users[1:] == users[:-1], False]
+    next_dates = np.r_[dates[1:], dates[-1:]] if len(dates) else dates
+    next_amounts = np.r_[amounts[1:], 0.0] if len(amounts) else amounts
+    horizon = np.timedelta64(horizon_days, 'D')
+
+    opportunity = dates <= dates.max() - horizon if len(dates) else np.zeros(0, dtype=bool)
+    repurchased = opportunity & same_user & (next_dates - dates <= horizon)
+
+    outcomes = pd.DataFrame({
+        'UserID': users,
+        'Opportunities': opportunity.astype(np.int64),
+        'Repurchases': repurchased.astype(np.int64),
+        'RepurchaseValue': np.where(repurchased, next_amounts, 0.0)
+    })
+    return outcomes.groupby('UserID', sort=False).sum()
+
+
+def estimate_campaign_impact(outcomes, user_ids, campaign_type, n_bootstrap=200, confidence=0.9, seed=42):
+    """
+    Expected conversions and revenue of a campaign to a set of customers
+
+    Conversions are the segment's pooled repurchase rate, lifted by the
+    campaign type, times the number of customers; revenue uses the average
+    value of those repurchases. Intervals come from a Poisson bootstrap over
+    customers, evaluated as weight-matrix products in blocks. A fixed seed
+    keeps the numbers identical across reruns.
+
+    Args:
+        outcomes: DataFrame from repurchase_outcomes
+        user_ids: Customers targeted by the campaign
+        campaign_type: Key of CAMPAIGN_LIFT
+        n_bootstrap: Number of bootstrap replicates
+        confidence: Width of the reported interval
+        seed: Random seed
+
+    Returns:
+        Dictionary with open_rate, click_rate, repurchase_rate, conversions,
+        revenue and their (low, high) intervals
+    """
+    lift = CAMPAIGN_LIFT.get(campaign_type, 1.0)
+    open_rate, click_rate = CAMPAIGN_ENGAGEMENT.get(campaign_type, (0.30, 0.10))
+    n_customers = len(user_ids)
+
+    segment = outcomes.reindex(user_ids).fillna(0)
+    # Columns: opportunities, repurchases, repurchase value
+    stats = segment[['Opportunities', 'Repurchases', 'RepurchaseValue']].to_numpy(dtype=np.float64)
+
+    def rate_and_value(totals):
+        opportunities, repurchases, value = totals[..., 0], totals[..., 1], totals[..., 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(opportunities > 0, repurchases / opportunities, 0.0)
+            order_value = np.where(repurchases > 0, value / repurchases, 0.0)
+        return np.minimum(rate * lift, 1.0), order_value
+
+    rate, order_value = rate_and_value(stats.sum(axis=0))
+
+    rng = np.random.default_rng(seed)
+    block = max(MAX_BLOCK_ELEMENTS // max(len(stats), 1), 1)
+    replicate_totals = []
+    for start in range(0, n_bootstrap, block):
+        weights = rng.poisson(1.0, size=(min(block, n_bootstrap - start), len(stats)))
+        replicate_totals.append(weights @ stats)
+    boot_rate, boot_value = rate_and_value(np.vstack(replicate_totals) if replicate_totals else np.zeros((0, 3)))
+
+    tail = (1 - confidence) / 2
+    quantiles = [tail, 1 - tail]
+    boot_conversions = boot_rate * n_customers
+    boot_revenue = boot_conversions * boot_value
+
+    def interval(samples, point):
+        return tuple(float(q) for q in np.quantile(samples, quantiles)) if len(samples) else (point, point)
+
+    conversions = rate * n_customers
+    revenue = conversions * order_value
+    return {
+        'open_rate': open_rate,
+        'click_rate': click_rate,
+        'repurchase_rate': float(rate),
+        'conversions': float(conversions),
+        'conversions_interval': interval(boot_conversions, conversions),
+        'revenue': float(revenue),
+        'revenue_interval': interval(boot_revenue, revenue)
+    }
@@ -0,0 +1,236 @@
+"""Acquisition-cohort retention and revenue matrices"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+COHORT_FREQUENCIES = ['Monthly', 'Weekly']
+
+# 1969-12-29 is the Monday before the epoch, so weekly periods start on Mondays
+WEEK_ORIGIN_DAYS = -3
+
+
+def period_codes(dates, frequency='Monthly'):
+    """
+    Integer period numbers of a datetime column
+
+    Args:
+        dates: Series of datetimes
+        frequency: 'Monthly' or 'Weekly'
+
+    Returns:
+        int64 array of months (or Monday-starting weeks) since the epoch
+    """
+    if frequency not in COHORT_FREQUENCIES:
+        raise ValueError(f"Unknown cohort frequency '{frequency}'. Choose from {COHORT_FREQUENCIES}")
+    if frequency == 'Monthly':
+        return dates.to_numpy(dtype='datetime64[M]').astype(np.int64)
+    days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return (days - WEEK_ORIGIN_DAYS) // 7
+
+
+def period_starts(codes, frequency='Monthly'):
+    """Start dates of integer period numbers"""
+    codes = np.asarray(codes, dtype=np.int64)
+    if frequency == 'Monthly':
+        return pd.DatetimeIndex(codes.astype('datetime64[M]'))
+    return pd.DatetimeIndex((codes * 7 + WEEK_ORIGIN_DAYS).astype('datetime64[D]'))
+
+
+@dataclass
+class CohortMatrix:
+    """
+    Cohort x period-offset counts of active customers and revenue
+
+    Row i is the cohort of customers whose first purchase fell in period
+    first_period + i; column j counts activity j periods after that.
+
+    Attributes:
+        frequency: 'Monthly' or 'Weekly'
+        first_period: Period number of the first cohort
+        active_customers: int64 array (cohorts x offsets) of distinct active customers
+        revenue: float64 array (cohorts x offsets) of revenue
+        customer_cohorts: Series mapping UserID -> period number of first purchase
+        last_period: Latest period seen
+        last_period_users: UserIDs already counted as active in last_period
+    """
+    frequency: str
+    first_period: int
+    active_customers: np.ndarray
+    revenue: np.ndarray
+    customer_cohorts: pd.Series
+    last_period: int
+    last_period_users: pd.Index
+
+    @property
+    def cohorts(self):
+        """Start date of every cohort"""
+        return period_starts(self.first_period + np.arange(self.active_customers.shape[0]), self.frequency)
+
+    @property
+    def cohort_sizes(self):
+        """Customers acquired in each cohort"""
+        return self.active_customers[:, 0]
+
+    def _frame(self, values):
+        """Label a cohort x offset array, dropping cohorts without customers"""
+        frame = pd.DataFrame(values, index=self.cohorts, columns=pd.RangeIndex(values.shape[1], name='Offset'))
+        return frame[self.cohort_sizes > 0]
+
+    def _observed(self):
+        """Mask of (cohort, offset) cells that lie in the observed history"""
+        n_cohorts, n_offsets = self.active_customers.shape
+        cohort_periods = self.first_period + np.arange(n_cohorts)
+        return cohort_periods[:, None] + np.arange(n_offsets) <= self.last_period
+
+    def retention(self):
+        """
+        Share of each cohort active at each offset
+
+        Returns:
+            DataFrame (cohort start x offset), NaN for offsets not yet observed
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = self.active_customers / self.cohort_sizes[:, None]
+        return self._frame(np.where(self._observed(), rates, np.nan))
+
+    def revenue_per_customer(self, cumulative=True):
+        """
+        Revenue per acquired customer at each offset
+
+        Args:
+            cumulative: Accumulate across offsets (a lifetime-revenue curve)
+
+        Returns:
+            DataFrame (cohort start x offset), NaN for offsets not yet observed
+        """
+        values = np.cumsum(self.revenue, axis=1) if cumulative else self.revenue
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = values / self.cohort_sizes[:, None]
+        return self._frame(np.where(self._observed(), values, np.nan))
+
+    def update(self, df):
+        """
+        Add newly arrived transactions without recomputing the history
+
+        The new rows must not predate the latest period already counted;
+        rows in that period (e.g. the rest of a partial month) are merged
+        without double counting customers.
+
+        Args:
+            df: New transactions with Date, UserID, Amount
+
+        Returns:
+            Updated CohortMatrix (self is not modified)
+        """
+        if df.empty:
+            return self
+        periods = period_codes(df['Date'], self.frequency)
+        if periods.min() < self.last_period:
+            raise ValueError("Incremental cohort updates need transactions from the latest period onwards; rebuild instead")
+
+        user_ids = df['UserID']
+        known = self.customer_cohorts.reindex(user_ids.unique())
+        new_users = known.index[known.isna()]
+        # First purchase of new customers within the batch
+        new_cohorts = pd.Series(periods, index=user_ids.to_numpy()).loc[lambda s: s.index.isin(new_users)]
+        customer_cohorts = pd.concat([self.customer_cohorts, new_cohorts.groupby(level=0).min()])
+
+        cohort_of_row = customer_cohorts.reindex(user_ids).to_numpy(dtype=np.int64)
+        first_period = min(self.first_period, int(cohort_of_row.min()))
+        last_period = int(periods.max())
+
+        # Customers already counted in the previous last period are active there already
+        already_counted = (periods == self.last_period) & user_ids.isin(self.last_period_users).to_numpy()
+        active, revenue = _accumulate(
+            user_ids, periods, cohort_of_row, df['Amount'].to_numpy(dtype=np.float64),
+            first_period, last_period, skip_active=already_counted
+        )
+
+        # Old matrices are a sub-block of the grown ones
+        old_rows = slice(self.first_period - first_period, self.first_period - first_period + self.active_customers.shape[0])
+        old_cols = slice(0, self.active_customers.shape[1])
+        active[old_rows, old_cols] += self.active_customers
+        revenue[old_rows, old_cols] += self.revenue
+
+        in_last = user_ids[periods == last_period].unique()
+        if last_period == self.last_period:
+            in_last = self.last_period_users.union(in_last)
+
+        return CohortMatrix(
+            frequency=self.frequency,
+            first_period=first_period,
+            active_customers=active,
+            revenue=revenue,
+            customer_cohorts=customer_cohorts,
+            last_period=last_period,
+            last_period_users=pd.Index(in_last)
+        )
+
+
+def _accumulate(user_ids, periods, cohort_of_row, amounts, first_period, last_period, skip_active=None):
+    """
+    Bincount active customers and revenue into a cohort x offset grid
+
+    Args:
+        user_ids: UserID of every row
+        periods: Period number of every row
+        cohort_of_row: Cohort period number of every row's customer
+        amounts: Amount of every row
+        first_period: Period number of the first cohort row
+        last_period: Latest period, which fixes the number of offsets
+        skip_active: Optional mask of rows that must not count as activity
+
+    Returns:
+        Tuple of (active customer counts, revenue) arrays
+    """
+    n_periods = last_period - first_period + 1
+    cells = (cohort_of_row - first_period) * n_periods + (periods - cohort_of_row)
+
+    revenue = np.bincount(cells, weights=amounts, minlength=n_periods * n_periods)
+
+    # Distinct (customer, period) pairs: one sort over combined integer keys
+    user_codes = pd.factorize(user_ids)[0].astype(np.int64)
+    keep = np.ones(len(cells), dtype=bool) if skip_active is None else ~skip_active
+    keys = user_codes[keep] * n_periods + (periods[keep] - first_period)
+    order = np.argsort(keys, kind='stable')
+    distinct = order[np.r_[True, keys[order][1:] != keys[order][:-1]]] if len(keys) else order
+    active = np.bincount(cells[keep][distinct], minlength=n_periods * n_periods)
+
+    return active.reshape(n_periods, n_periods), revenue.reshape(n_periods, n_periods)
+
+
+def build_cohort_matrix(df, frequency='Monthly'):
+    """
+    Build first-purchase cohort x period-offset matrices in one pass
+
+    Customers and periods are integer coded; each customer's cohort is their
+    earliest period, and active-customer and revenue grids are filled with a
+    single bincount each.
+
+    Args:
+        df: DataFrame with columns Date, UserID, Amount
+        frequency: 'Monthly' or 'Weekly'
+
+    Returns:
+        CohortMatrix
+    """
+    periods = period_codes(df['Date'], frequency)
+    user_codes, user_ids = pd.factorize(df['UserID'])
+    first_by_user = pd.Series(periods).groupby(user_codes).min()
+    cohort_of_row = first_by_user.to_numpy()[user_codes]
+
+    first_period, last_period = int(periods.min()), int(periods.max())
+    active, revenue = _accumulate(
+        df['UserID'], periods, cohort_of_row, df['Amount'].to_numpy(dtype=np.float64), first_period, last_period
+    )
+
+    return CohortMatrix(
+        frequency=frequency,
+        first_period=first_period,
+        active_customers=active,
+        revenue=revenue,
+        customer_cohorts=pd.Series(first_by_user.to_numpy(), index=user_ids),
+        last_period=last_period,
+        last_period_users=pd.Index(df['UserID'][periods == last_period].unique())
+    )
@@ -0,0 +1,110 @@
+"""Opt-in Arrow-backed (columnar) dataframe mode"""
+import numpy as np
+import pandas as pd
+
+DTYPE_BACKENDS = ['numpy', 'pyarrow']
+
+# Columns stored dictionary-encoded in Arrow mode: each distinct product is
+# kept once and rows hold int32 codes, so factorize and value_counts work on
+# the codes instead of hashing strings. UserID stays string[pyarrow]: pandas
+# cannot sort dictionary columns, and a single-key group-by on one lists every
+# dictionary value, even those absent from a filtered frame.
+DICTIONARY_COLUMNS = ['ProductID']
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+def _is_arrow_string_like(dtype):
+    """Arrow string or dictionary dtype"""
+    return isinstance(dtype, pd.ArrowDtype) and (
+        pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+        or pa.types.is_dictionary(dtype.pyarrow_dtype)
+    )
+
+
+def _to_numpy_column(series):
+    """NumPy copy of an Arrow numeric or temporal column (floats when integers have nulls)"""
+    arrow_type = series.dtype.pyarrow_dtype
+    if pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type):
+        # Cast in Arrow: pandas converts date32 values to NumPy one by one
+        timestamps = pa.compute.cast(pa.array(series), pa.timestamp('us'))
+        return pd.Series(timestamps.to_numpy(zero_copy_only=False), index=series.index)
+    if pa.types.is_floating(arrow_type) or series.hasnans:
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.to_numpy(dtype=series.dtype.numpy_dtype)
+
+
+def to_dtype_backend(df, dtype_backend='pyarrow'):
+    """
+    Convert a transaction DataFrame to the given dtype backend
+
+    Arrow mode stores string columns in Arrow: ProductID as a dictionary
+    (int32 codes into the distinct products) and the others (UserID, string
+    TransactionIDs) as string[pyarrow]. Numbers and dates are NumPy arrays
+    in both modes: they take the same memory either way, and pandas
+    group-bys and nunique run faster on NumPy keys and values than on Arrow
+    ones. The NumPy backend turns Arrow string columns back into pandas'
+    default dtypes.
+
+    Args:
+        df: Transaction DataFrame
+        dtype_backend: 'numpy' or 'pyarrow'
+
+    Returns:
+        Converted DataFrame (df itself is not modified)
+
+    Raises:
+        ValueError: If dtype_backend is unknown or pyarrow is not installed
+    """
+    if dtype_backend not in DTYPE_BACKENDS:
+        raise ValueError(f"Unknown dtype backend '{dtype_backend}'. Choose from {DTYPE_BACKENDS}")
+    if dtype_backend == 'pyarrow' and not PYARROW_AVAILABLE:
+        raise ValueError("The pyarrow backend requires the pyarrow package (pip install pyarrow)")
+
+    converted = df.copy()
+    for column, dtype in df.dtypes.items():
+        if dtype_backend == 'pyarrow' and column in DICTIONARY_COLUMNS:
+            if not (isinstance(dtype, pd.ArrowDtype) and pa.types.is_dictionary(dtype.pyarrow_dtype)):
+                # Numeric product IDs keep their type as dictionary values
+                if isinstance(dtype, pd.ArrowDtype):
+                    value_type = dtype.pyarrow_dtype
+                elif pd.api.types.is_numeric_dtype(dtype):
+                    value_type = pa.from_numpy_dtype(dtype)
+                else:
+                    value_type = pa.string()
+                converted[column] = df[column].astype(pd.ArrowDtype(pa.dictionary(pa.int32(), value_type)))
+        elif isinstance(dtype, pd.ArrowDtype) and not _is_arrow_string_like(dtype):
+            converted[column] = _to_numpy_column(df[column])
+        elif dtype_backend == 'numpy':
+            if _is_arrow_string_like(dtype):
+                converted[column] = pd.Series(df[column].to_numpy(), index=df.index).infer_objects()
+        elif pd.api.types.is_string_dtype(dtype) and not _is_arrow_string_like(dtype):
+            converted[column] = df[column].astype(pd.ArrowDtype(pa.string()))
+    return converted
+
+
+def read_transactions(file, dtype_backend='numpy'):
+    """
+    Read a transaction CSV with the given dtype backend
+
+    In Arrow mode the file is parsed by pyarrow's multithreaded CSV reader
+    straight into Arrow columns (no intermediate Python string objects),
+    then converted with to_dtype_backend.
+
+    Args:
+        file: Path or file-like CSV
+        dtype_backend: 'numpy' or 'pyarrow'
+
+    Returns:
+        DataFrame
+    """
+    if dtype_backend == 'pyarrow':
+        if not PYARROW_AVAILABLE:
+            raise ValueError("The pyarrow backend requires the pyarrow package (pip install pyarrow)")
+        return to_dtype_backend(pd.read_csv(file, engine='pyarrow', dtype_backend='pyarrow'), 'pyarrow')
+    return pd.read_csv(file)
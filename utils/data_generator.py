@@ -112,3 +112,23 @@ def generate_demo_data(n_transactions=500, n_customers=50, n_days=30):
     df = df.sort_values('Date').reset_index(drop=True)
     
     return df
+
+def generate_demo_categories():
+    """
+    Product category mapping for the demo catalog
+    
+    Returns:
+        DataFrame with columns: ProductID, Category
+    """
+    categories = {
+        'Gaming': ['Gaming Mouse', 'Mousepad', 'Mechanical Keyboard'],
+        'Computers': ['Laptop', 'Monitor', 'External SSD', 'Laptop Stand'],
+        'Cables & Hubs': ['HDMI Cable', 'USB-C Hub', 'USB Cable', 'Cable Organizer'],
+        'Audio & Video': ['4K Webcam', 'Headphones', 'Bluetooth Speaker', 'Microphone', 'Webcam Cover'],
+        'Mobile': ['Phone Case', 'Screen Protector', 'Wireless Charger'],
+        'Home Office': ['Desk Lamp']
+    }
+    return pd.DataFrame(
+        [(product, category) for category, products in categories.items() for product in products],
+        columns=['ProductID', 'Category']
+    )
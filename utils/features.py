@@ -0,0 +1,134 @@
+"""Feature transformation for customer segmentation"""
+import numpy as np
+
+DEFAULT_FEATURES = ['Recency', 'Frequency', 'TotalSpend', 'UniqueProducts']
+OPTIONAL_FEATURES = ['CLV', 'AvgOrderValue', 'PAlive']
+FEATURE_SCALERS = ['standard', 'robust', 'rank']
+
+# Reference points kept per feature for rank scaling
+RANK_GRID_SIZE = 1001
+
+
+class CustomerFeatureTransformer:
+    """
+    Configurable log / clip / scale pipeline over customer metric columns
+
+    All steps run in place on a single float32 array, so transforming costs
+    one copy of the selected columns. Fitted parameters are plain arrays and
+    pickle with the segmentation model, so new customers are scored with
+    exactly the transform the clusters were fitted on.
+
+    Args:
+        features: Metric columns to use
+        log_features: Columns to pass through log1p (negative values are floored at 0)
+        clip_quantile: Clip each column to [q, 1 - q] quantiles of the fit data (None to skip)
+        scaler: 'standard' (mean/std), 'robust' (median/IQR) or 'rank' (empirical CDF)
+    """
+
+    def __init__(self, features=None, log_features=(), clip_quantile=None, scaler='standard'):
+        if scaler not in FEATURE_SCALERS:
+            raise ValueError(f"Unknown scaler '{scaler}'. Choose from {FEATURE_SCALERS}")
+
+        self.features = list(features or DEFAULT_FEATURES)
+        self.log_features = [f for f in log_features if f in self.features]
+        self.clip_quantile = clip_quantile
+        self.scaler = scaler
+
+        self.clip_bounds_ = None
+        self.center_ = None
+        self.scale_ = None
+        self.rank_reference_ = None
+
+    @property
+    def is_fitted(self):
+        """Whether fit has been called"""
+        return self.center_ is not None or self.rank_reference_ is not None
+
+    def _prepare(self, customer_metrics):
+        """Copy the feature columns to float32 and apply log1p in place"""
+        X = customer_metrics[self.features].to_numpy(dtype=np.float32)
+        if not X.flags.writeable:
+            # Copy-on-write pandas may hand back a read-only view
+            X = X.copy()
+        for name in self.log_features:
+            column = X[:, self.features.index(name)]
+            np.maximum(column, 0, out=column)
+            np.log1p(column, out=column)
+        return X
+
+    def fit(self, customer_metrics):
+        """
+        Learn clipping and scaling parameters
+
+        Args:
+            customer_metrics: DataFrame with the feature columns
+
+        Returns:
+            self
+        """
+        self._fit_array(self._prepare(customer_metrics))
+        return self
+
+    def _fit_array(self, X):
+        """Fit on a prepared array and transform it in place"""
+        if self.clip_quantile:
+            self.clip_bounds_ = np.quantile(X, [self.clip_quantile, 1 - self.clip_quantile], axis=0).astype(np.float32)
+            np.clip(X, self.clip_bounds_[0], self.clip_bounds_[1], out=X)
+
+        if self.scaler == 'rank':
+            grid = np.linspace(0, 1, RANK_GRID_SIZE)
+            self.rank_reference_ = np.quantile(X, grid, axis=0).astype(np.float32)
+        elif self.scaler == 'robust':
+            q25, median, q75 = np.quantile(X, [0.25, 0.5, 0.75], axis=0)
+            self.center_ = median.astype(np.float32)
+            self.scale_ = (q75 - q25).astype(np.float32)
+        else:
+            self.center_ = X.mean(axis=0, dtype=np.float64).astype(np.float32)
+            self.scale_ = X.std(axis=0, dtype=np.float64).astype(np.float32)
+
+        if self.scale_ is not None:
+            self.scale_[self.scale_ == 0] = 1.0
+
+        self._scale_in_place(X)
+        return X
+
+    def _scale_in_place(self, X):
+        """Apply the fitted scaling to a prepared (and clipped) array"""
+        if self.scaler == 'rank':
+            grid = np.linspace(0, 1, RANK_GRID_SIZE, dtype=np.float32)
+            for j in range(X.shape[1]):
+                X[:, j] = np.interp(X[:, j], self.rank_reference_[:, j], grid)
+        else:
+            X -= self.center_
+            X /= self.scale_
+
+    def transform(self, customer_metrics):
+        """
+        Transform customer metrics with the fitted parameters
+
+        Args:
+            customer_metrics: DataFrame with the feature columns
+
+        Returns:
+            float32 array (customers x features)
+        """
+        if not self.is_fitted:
+            raise ValueError("CustomerFeatureTransformer must be fitted before transform")
+
+        X = self._prepare(customer_metrics)
+        if self.clip_bounds_ is not None:
+            np.clip(X, self.clip_bounds_[0], self.clip_bounds_[1], out=X)
+        self._scale_in_place(X)
+        return X
+
+    def fit_transform(self, customer_metrics):
+        """
+        Fit on customer metrics and return the transformed features
+
+        Args:
+            customer_metrics: DataFrame with the feature columns
+
+        Returns:
+            float32 array (customers x features)
+        """
+        return self._fit_array(self._prepare(customer_metrics))
@@ -0,0 +1,260 @@
+"""Concurrent, cached generation of marketing copy with pluggable LLM backends"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+COPY_BACKENDS = ['stub', 'openai']
+
+
+class TransientBackendError(Exception):
+    """Backend failure that may succeed on retry (rate limit, overload)"""
+
+
+# Errors worth retrying: rate limits, timeouts and dropped connections
+RETRYABLE_ERRORS = (TransientBackendError, TimeoutError, ConnectionError)
+
+
+def build_copy_prompt(segment_name, campaign_type, segment_size, avg_spend, products):
+    """
+    Prompt asking for a campaign email for one segment
+
+    Args:
+        segment_name: Segment label
+        campaign_type: Campaign type chosen in the Marketing Assistant
+        segment_size: Number of customers in the segment
+        avg_spend: Average spend per customer
+        products: Products to feature
+
+    Returns:
+        Prompt string
+    """
+    return (
+        f"Write a short {campaign_type.lower()} marketing email for the '{segment_name}' customer segment "
+        f"({segment_size:,} customers, average spend ₹{avg_spend:,.2f}). "
+        f"Feature these products: {', '.join(products)}. "
+        "Return a subject line on the first line, then the email body."
+    )
+
+
+class StubBackend:
+    """
+    Deterministic offline backend
+
+    Output depends only on the prompt and parameters, so cached and uncached
+    runs agree and the generation layer can be exercised without network
+    access. An optional simulated latency and failure rate make it usable
+    for throughput and retry benchmarks.
+
+    Args:
+        latency: Seconds each batch call sleeps
+        failure_rate: Probability that a call raises TransientBackendError
+        seed: Seed for the failure draws
+    """
+    name = 'stub'
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    async def generate(self, prompts, **params):
+        """Return one completion per prompt"""
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise TransientBackendError("Simulated backend overload")
+
+        completions = []
+        for prompt in prompts:
+            digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+            completions.append(
+                f"Something special picked for you [{digest}]\n\n"
+                f"{prompt.split('Feature these products: ')[-1].split('.')[0]} - "
+                f"exclusively for you this week."
+            )
+        return completions
+
+
+class OpenAIBackend:
+    """
+    Chat model backend through langchain-openai
+
+    Args:
+        model: Chat model name
+        api_key: API key (defaults to the OPENAI_API_KEY environment variable)
+    """
+    name = 'openai'
+
+    def __init__(self, model='gpt-4o-mini', api_key=None):
+        try:
+            from langchain_openai import ChatOpenAI
+        except ImportError as e:
+            raise ImportError("The OpenAI backend requires langchain-openai: pip install langchain-openai") from e
+
+        self.model = model
+        # Model is part of the cache key
+        self.name = f'openai:{model}'
+        self._chat = ChatOpenAI(model=model, api_key=api_key or os.getenv('OPENAI_API_KEY'))
+
+    async def generate(self, prompts, **params):
+        """Return one completion per prompt using a single batched request"""
+        chat = self._chat.bind(**params) if params else self._chat
+        try:
+            messages = await chat.abatch(prompts)
+        except Exception as e:
+            # Rate limits and 5xx responses come back as openai.APIError subclasses
+            if type(e).__name__ in ('RateLimitError', 'APITimeoutError', 'APIConnectionError', 'InternalServerError'):
+                raise TransientBackendError(str(e)) from e
+            raise
+        return [message.content for message in messages]
+
+
+def get_backend(name, **kwargs):
+    """
+    Build a copy backend by name
+
+    Args:
+        name: 'stub' or 'openai'
+        **kwargs: Backend constructor arguments
+
+    Returns:
+        Backend instance
+    """
+    if name not in COPY_BACKENDS:
+        raise ValueError(f"Unknown copy backend '{name}'. Choose from {COPY_BACKENDS}")
+    return StubBackend(**kwargs) if name == 'stub' else OpenAIBackend(**kwargs)
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of completions on disk
+
+    Each completion is stored in its own file named by the SHA-256 of the
+    backend, model parameters and prompt, so identical requests are served
+    from disk across sessions and processes.
+
+    Args:
+        directory: Cache directory (created if missing)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(backend_name, prompt, params):
+        """Cache key for a prompt and its generation parameters"""
+        payload = json.dumps({'backend': backend_name, 'prompt': prompt, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        """Cached completion or None"""
+        try:
+            with open(self._path(key), encoding='utf-8') as handle:
+                return json.load(handle)['completion']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key, completion):
+        """Store a completion (atomically, so concurrent writers never leave partial files)"""
+        temporary = self._path(key) + f'.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump({'completion': completion}, handle)
+        os.replace(temporary, self._path(key))
+
+
+class CopyGenerator:
+    """
+    Generate completions for many prompts with batching, bounded concurrency and retries
+
+    Cached prompts are answered from disk; the rest are grouped into batches
+    of batch_size and sent with at most max_concurrency batches in flight.
+    Batches failing with a retryable error are retried with exponential
+    backoff and jitter.
+
+    Args:
+        backend: Backend with an async generate(prompts, **params) method
+        cache: Optional ResponseCache
+        max_concurrency: Maximum concurrent backend calls
+        batch_size: Prompts per backend call
+        max_retries: Retries per batch before giving up
+        backoff: Base delay in seconds, doubled on each retry
+    """
+
+    def __init__(self, backend, cache=None, max_concurrency=8, batch_size=8, max_retries=3, backoff=0.5):
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = {'prompts': 0, 'cache_hits': 0, 'backend_calls': 0, 'retries': 0, 'seconds': 0.0}
+
+    async def _generate_batch(self, semaphore, prompts, params):
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                try:
+                    self.stats['backend_calls'] += 1
+                    return await self.backend.generate(prompts, **params)
+                except RETRYABLE_ERRORS:
+                    if attempt == self.max_retries:
+                        raise
+            self.stats['retries'] += 1
+            # Sleep outside the semaphore so waiting batches can proceed
+            await asyncio.sleep(self.backoff * 2**attempt * (0.5 + random.random()))
+
+    async def agenerate(self, prompts, **params):
+        """
+        Generate a completion for every prompt
+
+        Args:
+            prompts: List of prompt strings
+            **params: Generation parameters passed to the backend (e.g. temperature)
+
+        Returns:
+            List of completions aligned with prompts
+        """
+        started = time.perf_counter()
+        completions = [None] * len(prompts)
+        keys = [ResponseCache.key(self.backend.name, prompt, params) for prompt in prompts]
+
+        # Identical prompts in one call are generated once
+        pending = {}
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                completions[i] = cached
+                self.stats['cache_hits'] += 1
+            else:
+                pending.setdefault(key, []).append(i)
+
+        misses = list(pending)
+        batches = [misses[start:start + self.batch_size] for start in range(0, len(misses), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*[
+            self._generate_batch(semaphore, [prompts[pending[key][0]] for key in batch], params)
+            for batch in batches
+        ])
+
+        for batch, batch_completions in zip(batches, results):
+            for key, completion in zip(batch, batch_completions):
+                if self.cache is not None:
+                    self.cache.put(key, completion)
+                for i in pending[key]:
+                    completions[i] = completion
+
+        self.stats['prompts'] += len(prompts)
+        self.stats['seconds'] += time.perf_counter() - started
+        return completions
+
+    def generate(self, prompts, **params):
+        """Synchronous wrapper around agenerate for scripts and Streamlit callbacks"""
+        return asyncio.run(self.agenerate(prompts, **params))
@@ -1,6 +1,175 @@
 """Market basket analysis using Apriori algorithm"""
+import heapq
+from dataclasses import dataclass
+from itertools import combinations
+from math import ceil, sqrt
+
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
 from mlxtend.frequent_patterns import apriori, association_rules
+from scipy import sparse
+
+RULE_METRICS = ['confidence', 'lift', 'leverage']
+
+@dataclass
+class BasketMatrix:
+    """
+    Sparse transaction x product encoding of the transaction log
+    
+    Attributes:
+        matrix: CSR matrix with 1 where a transaction contains a product
+        transaction_ids: Index of TransactionIDs (row labels)
+        items: Index of ProductIDs (column labels)
+        quantities: Optional CSR matrix of units per transaction and product
+            (same sparsity as matrix)
+        amounts: Optional CSR matrix of line amounts per transaction and
+            product (same sparsity as matrix)
+    """
+    matrix: sparse.csr_matrix
+    transaction_ids: pd.Index
+    items: pd.Index
+    quantities: sparse.csr_matrix = None
+    amounts: sparse.csr_matrix = None
+    
+    def take(self, rows):
+        """Basket matrix of a subset of transactions (a row slice, nothing is re-encoded)"""
+        return BasketMatrix(
+            self.matrix[rows], self.transaction_ids[rows], self.items,
+            None if self.quantities is None else self.quantities[rows],
+            None if self.amounts is None else self.amounts[rows]
+        )
+
+def encode_baskets(df, with_values=True):
+    """
+    Encode transactions as a sparse binary basket matrix
+    
+    Lines with a missing TransactionID or ProductID are skipped. Lines are
+    sorted once by (transaction, product); the binary matrix and, when df
+    has an Amount column, the quantity and amount matrices are all built
+    from that one sort. Quantity comes from a Quantity column if present,
+    otherwise every line counts as one unit.
+    
+    Args:
+        df: DataFrame with columns TransactionID, ProductID (and optionally Amount, Quantity)
+        with_values: Also build the quantity and amount matrices
+    
+    Returns:
+        BasketMatrix
+    """
+    txn_codes, transaction_ids = pd.factorize(df['TransactionID'], sort=True)
+    item_codes, items = pd.factorize(df['ProductID'], sort=True)
+    
+    # factorize codes missing values as -1, which csr_matrix rejects
+    valid = (txn_codes >= 0) & (item_codes >= 0)
+    txn_codes, item_codes = txn_codes[valid], item_codes[valid]
+    n_transactions, n_items = len(transaction_ids), len(items)
+    
+    # One sort over combined keys groups repeated lines of the same product
+    keys = txn_codes.astype(np.int64) * n_items + item_codes
+    with_values = with_values and 'Amount' in df
+    if with_values:
+        order = np.argsort(keys)
+        keys = keys[order]
+    else:
+        keys = np.sort(keys)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    rows, columns = np.divmod(keys[starts], n_items)
+    indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=n_transactions))]
+    
+    def csr(data):
+        return sparse.csr_matrix((data, columns, indptr), shape=(n_transactions, n_items))
+    
+    matrix = csr(np.ones(len(starts), dtype=np.int32))
+    quantities = amounts = None
+    if with_values:
+        def line_sums(values):
+            values = values.to_numpy(dtype=np.float64)[valid][order]
+            return np.add.reduceat(values, starts) if len(starts) else values
+        
+        amounts = csr(line_sums(df['Amount']))
+        quantities = csr(line_sums(df['Quantity']) if 'Quantity' in df else np.diff(np.r_[starts, len(keys)]).astype(np.float64))
+    
+    return BasketMatrix(matrix, pd.Index(transaction_ids), pd.Index(items), quantities, amounts)
+
+def basket_frame(baskets, min_support=0.0):
+    """
+    One-hot basket DataFrame from a BasketMatrix, for find_product_bundles
+    
+    Products below min_support cannot be part of a frequent itemset, so only
+    the remaining columns are densified.
+    
+    Args:
+        baskets: BasketMatrix
+        min_support: Minimum support threshold
+    
+    Returns:
+        Boolean basket DataFrame indexed by TransactionID
+    """
+    n_transactions = baskets.matrix.shape[0]
+    counts = np.bincount(baskets.matrix.indices, minlength=len(baskets.items))
+    keep = np.flatnonzero((counts > 0) & (counts >= min_support * n_transactions))
+    dense = baskets.matrix[:, keep].toarray().astype(bool)
+    return pd.DataFrame(dense, index=baskets.transaction_ids, columns=baskets.items[keep])
+
+def transaction_rows_by_group(baskets, df, groups):
+    """
+    Basket matrix rows of each group's transactions
+    
+    Args:
+        baskets: BasketMatrix encoded from df
+        df: DataFrame with columns TransactionID, UserID
+        groups: Series mapping UserID to a group label (e.g. segment name)
+    
+    Returns:
+        Dictionary of group label -> sorted array of row positions
+    """
+    rows = baskets.transaction_ids.get_indexer(df['TransactionID'])
+    labels = df['UserID'].map(groups)
+    valid = (rows >= 0) & labels.notna().to_numpy()
+    
+    # A transaction belongs to the group of its (first) customer
+    pairs = pd.DataFrame({'row': rows[valid], 'group': labels.to_numpy()[valid]}).drop_duplicates('row')
+    return {group: np.sort(rows_of_group) for group, rows_of_group in pairs.groupby('group')['row'].apply(np.asarray).items()}
+
+def _mine_basket_matrix(baskets, min_support, min_confidence, top_k, metric, max_len):
+    """Rules of one BasketMatrix, or an empty DataFrame when it has too few frequent products"""
+    basket_sets = basket_frame(baskets, min_support)
+    if basket_sets.shape[1] < 2:
+        return pd.DataFrame()
+    rules = find_product_bundles(basket_sets, min_support, min_confidence, top_k=top_k, metric=metric, max_len=max_len)[1]
+    return add_value_metrics(rules, baskets)
+
+def mine_group_bundles(baskets, group_rows, min_support=0.05, min_confidence=0.3, top_k=None,
+                       metric='confidence', max_len=None, n_jobs=-1):
+    """
+    Mine bundles separately for each group of transactions in parallel
+    
+    Every group is a row slice of one shared basket matrix, so the log is
+    encoded once however many groups there are. Support is relative to the
+    group's own transaction count.
+    
+    Args:
+        baskets: BasketMatrix of all transactions
+        group_rows: Dictionary of group label -> row positions (see transaction_rows_by_group)
+        min_support: Minimum support threshold
+        min_confidence: Minimum confidence threshold
+        top_k: If set, only mine the best top_k rules per group by metric
+        metric: Rule metric used for ranking
+        max_len: Maximum itemset length (None for no limit)
+        n_jobs: Parallel workers (joblib convention, -1 for all CPUs)
+    
+    Returns:
+        Dictionary of group label -> rules DataFrame in the find_product_bundles
+        format, with value metrics when baskets has amounts (see add_value_metrics)
+    """
+    labels = list(group_rows)
+    n_jobs = min(effective_n_jobs(n_jobs), max(len(labels), 1))
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_mine_basket_matrix)(baskets.take(group_rows[label]), min_support, min_confidence, top_k, metric, max_len)
+        for label in labels
+    )
+    return dict(zip(labels, results))
 
 def prepare_basket_data(df):
     """
@@ -19,7 +188,7 @@ def prepare_basket_data(df):
     
     return basket_sets
 
-def find_product_bundles(basket_sets, min_support=0.05, min_confidence=0.3):
+def find_product_bundles(basket_sets, min_support=0.05, min_confidence=0.3, top_k=None, metric='confidence', max_len=None):
     """
     Find frequent itemsets and association rules
     
@@ -27,12 +196,18 @@ def find_product_bundles(basket_sets, min_support=0.05, min_confidence=0.3):
         basket_sets: One-hot encoded basket DataFrame
         min_support: Minimum support threshold
         min_confidence: Minimum confidence threshold
+        top_k: If set, only mine the best top_k rules by metric (see mine_top_k_rules)
+        metric: Rule metric used for ranking ('confidence', 'lift' or 'leverage')
+        max_len: Maximum itemset length (None for no limit)
     
     Returns:
         Tuple of (frequent_itemsets, rules DataFrame)
     """
+    if top_k:
+        return mine_top_k_rules(basket_sets, top_k, metric, min_support, min_confidence, max_len)
+    
     # Find frequent itemsets
-    frequent_itemsets = apriori(basket_sets, min_support=min_support, use_colnames=True)
+    frequent_itemsets = apriori(basket_sets, min_support=min_support, use_colnames=True, max_len=max_len)
     
     if frequent_itemsets.empty or len(frequent_itemsets) < 2:
         return frequent_itemsets, pd.DataFrame()
@@ -42,15 +217,7 @@ def find_product_bundles(basket_sets, min_support=0.05, min_confidence=0.3):
         rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_confidence)
         
         if not rules.empty:
-            # Format rules for display
-            rules['antecedents_str'] = rules['antecedents'].apply(lambda x: ', '.join(list(x)))
-            rules['consequents_str'] = rules['consequents'].apply(lambda x: ', '.join(list(x)))
-            rules['confidence_pct'] = (rules['confidence'] * 100).round(1)
-            rules['lift_score'] = rules['lift'].round(2)
-            rules['support_pct'] = (rules['support'] * 100).round(2)
-            
-            # Sort by confidence
-            rules = rules.sort_values('confidence', ascending=False)
+            rules = format_rules(rules, metric)
         
         return frequent_itemsets, rules
     
@@ -58,6 +225,216 @@ def find_product_bundles(basket_sets, min_support=0.05, min_confidence=0.3):
         print(f"Error generating rules: {e}")
         return frequent_itemsets, pd.DataFrame()
 
+def format_rules(rules, metric='confidence'):
+    """
+    Add display columns to a rules DataFrame and sort it by a metric
+    
+    Args:
+        rules: Rules DataFrame with antecedents, consequents, support, confidence, lift
+        metric: Column to sort by (descending)
+    
+    Returns:
+        Formatted rules DataFrame
+    """
+    rules['antecedents_str'] = rules['antecedents'].apply(lambda x: ', '.join(list(x)))
+    rules['consequents_str'] = rules['consequents'].apply(lambda x: ', '.join(list(x)))
+    rules['confidence_pct'] = (rules['confidence'] * 100).round(1)
+    rules['lift_score'] = rules['lift'].round(2)
+    rules['support_pct'] = (rules['support'] * 100).round(2)
+    
+    return rules.sort_values(metric, ascending=False)
+
+def suggest_max_len(basket_sets, coverage=0.95, cap=4):
+    """
+    Pick a maximum itemset length that covers most baskets
+    
+    Args:
+        basket_sets: One-hot encoded basket DataFrame
+        coverage: Share of baskets whose size should fit within max_len
+        cap: Hard upper limit on the returned length
+    
+    Returns:
+        Integer max_len between 2 and cap
+    """
+    basket_sizes = basket_sets.to_numpy(dtype=bool).sum(axis=1)
+    if len(basket_sizes) == 0:
+        return 2
+    return int(min(max(np.quantile(basket_sizes, coverage), 2), cap))
+
+def _confidence_floor(metric, threshold, itemset_support):
+    """Lowest confidence a rule from an itemset needs to beat threshold on metric"""
+    if metric == 'confidence':
+        return threshold
+    if metric == 'lift':
+        # lift = conf / s(Y) and s(Y) >= s(Z)
+        return threshold * itemset_support
+    # leverage = s(Z) - s(X)s(Y) and s(Y) >= s(Z)
+    if itemset_support <= threshold:
+        return np.inf
+    return itemset_support ** 2 / (itemset_support - threshold)
+
+def mine_top_k_rules(basket_sets, k=10, metric='confidence', min_support=0.01, min_confidence=0.0, max_len=None):
+    """
+    Mine only the best k association rules by a metric
+    
+    Itemsets are grown level by level over vertical transaction-id lists while
+    a min-heap holds the best k rules seen so far. Once the heap is full its
+    smallest score prunes the search: rule generation inside an itemset skips
+    consequents that can no longer reach the threshold (confidence is
+    anti-monotone in the consequent), and for leverage the support threshold
+    itself is raised, since no rule from an itemset with support s can have
+    leverage above s - s^2.
+    
+    Args:
+        basket_sets: One-hot encoded basket DataFrame
+        k: Number of rules to keep
+        metric: Ranking metric ('confidence', 'lift' or 'leverage')
+        min_support: Minimum support threshold
+        min_confidence: Minimum confidence threshold
+        max_len: Maximum itemset length (defaults to suggest_max_len)
+    
+    Returns:
+        Tuple of (frequent_itemsets, rules DataFrame) in the same format as
+        find_product_bundles; frequent_itemsets only covers the itemsets that
+        survived pruning
+    """
+    if metric not in RULE_METRICS:
+        raise ValueError(f"Unknown rule metric '{metric}'. Choose from {RULE_METRICS}")
+    
+    if max_len is None:
+        max_len = suggest_max_len(basket_sets)
+    
+    items = basket_sets.columns.to_numpy()
+    matrix = basket_sets.to_numpy(dtype=bool)
+    n_transactions = matrix.shape[0]
+    if n_transactions == 0:
+        return pd.DataFrame(columns=['support', 'itemsets']), pd.DataFrame()
+    
+    min_count = max(ceil(min_support * n_transactions), 1)
+    
+    # Vertical layout: sorted transaction indices per item
+    tidsets = {}
+    counts = {}
+    for col in range(matrix.shape[1]):
+        tids = np.flatnonzero(matrix[:, col])
+        if len(tids) >= min_count:
+            tidsets[(col,)] = tids
+            counts[(col,)] = len(tids)
+    
+    heap = []
+    tiebreak = 0
+    
+    def threshold():
+        return heap[0][0] if len(heap) >= k else -np.inf
+    
+    def support_of(itemset):
+        return counts[itemset] / n_transactions
+    
+    def generate_rules(itemset):
+        nonlocal tiebreak
+        itemset_support = support_of(itemset)
+        consequents = [(item,) for item in itemset]
+        
+        while consequents:
+            kept = []
+            for consequent in consequents:
+                antecedent = tuple(item for item in itemset if item not in consequent)
+                antecedent_support = support_of(antecedent)
+                consequent_support = support_of(consequent)
+                confidence = itemset_support / antecedent_support
+                
+                floor = max(min_confidence, _confidence_floor(metric, threshold(), itemset_support))
+                if confidence < floor:
+                    continue
+                kept.append(consequent)
+                
+                lift = confidence / consequent_support
+                leverage = itemset_support - antecedent_support * consequent_support
+                score = {'confidence': confidence, 'lift': lift, 'leverage': leverage}[metric]
+                
+                if score > threshold():
+                    rule = (antecedent, consequent, antecedent_support, consequent_support,
+                            itemset_support, confidence, lift, leverage)
+                    tiebreak += 1
+                    if len(heap) >= k:
+                        heapq.heapreplace(heap, (score, tiebreak, rule))
+                    else:
+                        heapq.heappush(heap, (score, tiebreak, rule))
+            
+            # Grow surviving consequents by one item while an antecedent remains
+            size = len(consequents[0]) + 1
+            if size >= len(itemset):
+                break
+            kept_set = set(kept)
+            consequents = [
+                candidate for candidate in join_level(sorted(kept))
+                if all(sub in kept_set for sub in combinations(candidate, size - 1))
+            ]
+    
+    level = sorted(tidsets)
+    for size in range(2, max_len + 1):
+        if metric == 'leverage' and 0 <= threshold() < 0.25:
+            # Smallest support whose s - s^2 bound can still beat the heap
+            bound_support = (1 - sqrt(1 - 4 * threshold())) / 2
+            min_count = max(min_count, ceil(bound_support * n_transactions))
+        
+        next_level = []
+        next_tidsets = {}
+        for candidate in join_level(level):
+            if not all(sub in counts for sub in combinations(candidate, size - 1)):
+                continue
+            tids = np.intersect1d(tidsets[candidate[:-1]], tidsets[(candidate[-1],)], assume_unique=True)
+            if len(tids) < min_count:
+                continue
+            counts[candidate] = len(tids)
+            next_tidsets[candidate] = tids
+            next_level.append(candidate)
+            generate_rules(candidate)
+        
+        if not next_level:
+            break
+        # Keep single-item lists for the joins plus the current level
+        tidsets = {key: value for key, value in tidsets.items() if len(key) == 1}
+        tidsets.update(next_tidsets)
+        level = next_level
+    
+    frequent_itemsets = pd.DataFrame({
+        'support': [count / n_transactions for count in counts.values()],
+        'itemsets': [frozenset(items[list(itemset)]) for itemset in counts]
+    })
+    
+    if not heap:
+        return frequent_itemsets, pd.DataFrame()
+    
+    rules = pd.DataFrame(
+        [rule for _, _, rule in heap],
+        columns=['antecedents', 'consequents', 'antecedent support', 'consequent support',
+                 'support', 'confidence', 'lift', 'leverage']
+    )
+    rules['antecedents'] = rules['antecedents'].apply(lambda x: frozenset(items[list(x)]))
+    rules['consequents'] = rules['consequents'].apply(lambda x: frozenset(items[list(x)]))
+    
+    return frequent_itemsets, format_rules(rules, metric).reset_index(drop=True)
+
+def join_level(level):
+    """
+    Apriori-gen join: combine sorted itemsets that share all but the last item
+
+    Args:
+        level: Sorted list of same-size itemsets, each a sorted tuple of item codes
+
+    Returns:
+        List of candidate itemsets one item larger, in sorted order (not yet
+        pruned by their subsets)
+    """
+    candidates = []
+    for i, left in enumerate(level):
+        for right in level[i + 1:]:
+            if left[:-1] != right[:-1]:
+                break
+            candidates.append(left + (right[-1],))
+    return candidates
+
 def get_product_recommendations(df, product_name, top_n=5):
     """
     Get top N products that are frequently bought with a given product
@@ -81,45 +458,116 @@ def get_product_recommendations(df, product_name, top_n=5):
     
     return other_products.to_dict()
 
-def calculate_bundle_revenue_potential(df, rules):
+def _containing_baskets(baskets, itemsets):
+    """
+    Baskets containing each itemset, as a sparse transaction x itemset indicator
+    
+    One sparse product counts how many of each itemset's products every
+    basket holds; a basket contains the itemset when that count equals the
+    itemset's length.
+    
+    Args:
+        baskets: BasketMatrix
+        itemsets: List of collections of ProductIDs
+    
+    Returns:
+        Tuple of (CSC containment matrix, CSR itemset x product indicator)
+    """
+    columns = [baskets.items.get_indexer(list(itemset)) for itemset in itemsets]
+    lengths = np.array([len(c) for c in columns], dtype=np.int64)
+    # Products absent from the matrix are dropped, so their itemsets never match
+    columns = [c[c >= 0] for c in columns]
+    indicator = sparse.csr_matrix(
+        (np.ones(sum(len(c) for c in columns), dtype=np.float64),
+         np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64),
+         np.r_[0, np.cumsum([len(c) for c in columns])]),
+        shape=(len(columns), len(baskets.items))
+    )
+    hits = (baskets.matrix @ indicator.T).tocsc()
+    itemset_of_entry = np.repeat(np.arange(len(columns)), np.diff(hits.indptr))
+    hits.data = (hits.data == lengths[itemset_of_entry]).astype(np.float64)
+    hits.eliminate_zeros()
+    return hits, indicator
+
+def add_value_metrics(rules, baskets):
+    """
+    Add revenue-weighted support and average bundle value to rules
+    
+    revenue_support is the share of total revenue in baskets containing the
+    whole bundle (antecedents and consequents); avg_bundle_value is the
+    average amount spent on the bundle's products in those baskets. Both are
+    reductions of the basket amount matrix.
+    
+    Args:
+        rules: Rules DataFrame with antecedents and consequents
+        baskets: BasketMatrix with amounts (rules are returned unchanged without)
+    
+    Returns:
+        Rules DataFrame with revenue_support, revenue_support_pct and avg_bundle_value
+    """
+    if rules.empty or baskets.amounts is None:
+        return rules
+    
+    bundles = [antecedents | consequents for antecedents, consequents in zip(rules['antecedents'], rules['consequents'])]
+    containment, indicator = _containing_baskets(baskets, bundles)
+    basket_totals = np.asarray(baskets.amounts.sum(axis=1)).ravel()
+    total_revenue = basket_totals.sum()
+    
+    n_baskets = np.diff(containment.indptr)
+    bundle_spend = np.asarray(containment.multiply(baskets.amounts @ indicator.T).sum(axis=0)).ravel()
+    
+    rules = rules.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rules['revenue_support'] = (containment.T @ basket_totals) / total_revenue if total_revenue else 0.0
+        rules['avg_bundle_value'] = np.where(n_baskets > 0, bundle_spend / n_baskets, 0.0)
+    rules['revenue_support_pct'] = (rules['revenue_support'] * 100).round(2)
+    return rules
+
+def calculate_bundle_revenue_potential(baskets, rules):
     """
     Calculate potential revenue impact of promoting bundles
     
+    For every one-to-one rule, the baskets with the antecedent but not the
+    consequent are potential buyers; expected revenue is their number times
+    the rule's confidence times the consequent's average price. Counts and
+    prices come from column sums of the basket matrices.
+    
     Args:
-        df: Transaction DataFrame with Amount column
+        baskets: BasketMatrix with quantities and amounts (see encode_baskets)
         rules: Association rules DataFrame
     
     Returns:
-        DataFrame with revenue potential for each rule
+        DataFrame with revenue potential for each one-to-one rule, indexed like rules
     """
+    if rules.empty or baskets.amounts is None:
+        return pd.DataFrame()
+    
+    single = (rules['antecedents'].map(len) == 1) & (rules['consequents'].map(len) == 1)
+    rules = rules[single]
     if rules.empty:
         return pd.DataFrame()
     
-    revenue_potential = []
+    antecedents = rules['antecedents'].map(lambda x: next(iter(x)))
+    consequents = rules['consequents'].map(lambda x: next(iter(x)))
+    antecedent_columns = baskets.items.get_indexer(antecedents)
+    consequent_columns = baskets.items.get_indexer(consequents)
     
-    for idx, rule in rules.iterrows():
-        antecedent = list(rule['antecedents'])[0] if len(rule['antecedents']) == 1 else None
-        consequent = list(rule['consequents'])[0] if len(rule['consequents']) == 1 else None
-        
-        if antecedent and consequent:
-            # Get average price of consequent
-            avg_price = df[df['ProductID'] == consequent]['Amount'].mean()
-            
-            # Get number of transactions with antecedent but not consequent
-            ant_transactions = set(df[df['ProductID'] == antecedent]['TransactionID'])
-            cons_transactions = set(df[df['ProductID'] == consequent]['TransactionID'])
-            potential_customers = len(ant_transactions - cons_transactions)
-            
-            # Potential revenue = potential customers * confidence * avg_price
-            potential_revenue = potential_customers * rule['confidence'] * avg_price
-            
-            revenue_potential.append({
-                'bundle': f"{antecedent} + {consequent}",
-                'potential_customers': potential_customers,
-                'expected_conversion': int(potential_customers * rule['confidence']),
-                'avg_item_price': avg_price,
-                'potential_revenue': potential_revenue,
-                'confidence': rule['confidence_pct']
-            })
-    
-    return pd.DataFrame(revenue_potential).sort_values('potential_revenue', ascending=False)
+    item_baskets = np.diff(baskets.matrix.tocsc().indptr)
+    item_amounts = np.asarray(baskets.amounts.sum(axis=0)).ravel()
+    item_units = np.asarray(baskets.quantities.sum(axis=0)).ravel()
+    
+    containment, _ = _containing_baskets(baskets, [{a, c} for a, c in zip(antecedents, consequents)])
+    potential_customers = item_baskets[antecedent_columns] - np.diff(containment.indptr)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_price = item_amounts[consequent_columns] / item_units[consequent_columns]
+    confidence = rules['confidence'].to_numpy()
+    
+    revenue_potential = pd.DataFrame({
+        'bundle': antecedents.to_numpy() + ' + ' + consequents.to_numpy(),
+        'potential_customers': potential_customers,
+        'expected_conversion': (potential_customers * confidence).astype(int),
+        'avg_item_price': avg_price,
+        'potential_revenue': potential_customers * confidence * avg_price,
+        'confidence': rules['confidence_pct'].to_numpy()
+    }, index=rules.index)
+    return revenue_potential.sort_values('potential_revenue', ascending=False)
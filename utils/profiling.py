@@ -0,0 +1,353 @@
+"""Dataset profile computed once at ingestion time"""
+import hashlib
+from dataclasses import dataclass
+from itertools import combinations
+from math import comb, sqrt
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.market_basket import join_level
+
+# Number of frequent-item cut-offs at which basket sizes are tabulated
+PROFILE_GRID_SIZE = 48
+
+# Upper bound on the basket x grid block materialized while profiling
+MAX_BLOCK_ELEMENTS = 2**22
+
+# Most frequent items whose pairwise co-occurrence counts are kept exactly
+MAX_PAIR_ITEMS = 4096
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Cheap summary statistics of a transaction dataset
+
+    Attributes:
+        fingerprint: Content hash of the transaction lines (see dataset_fingerprint)
+        n_rows: Number of transaction lines
+        n_transactions: Number of unique TransactionIDs
+        n_customers: Number of unique UserIDs
+        n_products: Number of unique ProductIDs
+        total_revenue: Sum of Amount
+        date_min: Earliest transaction date
+        date_max: Latest transaction date
+        basket_size_counts: Series mapping distinct items per basket -> number of baskets
+        item_frequency: Series mapping ProductID -> number of baskets containing it,
+            sorted descending
+        top_item_grid: Array of cut-offs m (number of most frequent items kept)
+        top_item_size_counts: Array (len(top_item_grid), largest basket + 1); row g
+            counts baskets by how many of the top_item_grid[g] items they contain
+        pair_items: Number of most frequent items covered by pair_counts
+        pair_counts: Sorted co-occurrence counts of every pair of those items
+            that appears together at least once
+        top_item_baskets: Sparse CSC baskets x pair_items matrix, column r
+            holding the baskets that contain the item of frequency rank r
+    """
+    fingerprint: str
+    n_rows: int
+    n_transactions: int
+    n_customers: int
+    n_products: int
+    total_revenue: float
+    date_min: pd.Timestamp
+    date_max: pd.Timestamp
+    basket_size_counts: pd.Series
+    item_frequency: pd.Series
+    top_item_grid: np.ndarray
+    top_item_size_counts: np.ndarray
+    pair_items: int
+    pair_counts: np.ndarray
+    top_item_baskets: sparse.csc_matrix
+
+    @property
+    def avg_basket_size(self):
+        """Average number of lines per transaction"""
+        return self.n_rows / max(self.n_transactions, 1)
+
+    @property
+    def sparsity(self):
+        """Share of the transaction x product grid that is filled"""
+        total_possible_combinations = self.n_transactions * self.n_products
+        return self.n_rows / total_possible_combinations if total_possible_combinations > 0 else 0
+
+    @property
+    def date_range_days(self):
+        """Number of days between the first and last transaction"""
+        return (self.date_max - self.date_min).days
+
+
+def dataset_fingerprint(df):
+    """
+    Content hash identifying a transaction dataset
+
+    Hashes the values of every line in order, so the same data gives the same
+    fingerprint whichever dtype backend it was loaded with.
+
+    Args:
+        df: Transaction DataFrame
+
+    Returns:
+        16-character hex string
+    """
+    digest = hashlib.sha256(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def build_dataset_profile(df):
+    """
+    Compute the dataset profile in a single pass over the key columns
+
+    Args:
+        df: DataFrame with columns Date, UserID, ProductID, Amount, TransactionID
+
+    Returns:
+        DatasetProfile
+    """
+    # Distinct (basket, item) pairs drive both the basket-size distribution
+    # and the item-frequency histogram
+    pairs = df[['TransactionID', 'ProductID']].dropna().drop_duplicates()
+    basket_sizes = pairs.groupby('TransactionID').size()
+    item_frequency = pairs['ProductID'].value_counts()
+
+    basket_codes = pd.factorize(pairs['TransactionID'])[0]
+    item_ranks = item_frequency.index.get_indexer(pairs['ProductID'])
+    largest_basket = int(basket_sizes.max()) if len(basket_sizes) else 0
+    top_item_grid, top_item_size_counts = _tabulate_top_item_sizes(
+        basket_codes, item_ranks, len(basket_sizes), len(item_frequency), largest_basket
+    )
+    pair_items = min(len(item_frequency), MAX_PAIR_ITEMS)
+    keep = item_ranks < pair_items
+    top_item_baskets = sparse.csc_matrix(
+        (np.ones(int(keep.sum()), dtype=np.int32), (basket_codes[keep], item_ranks[keep])),
+        shape=(len(basket_sizes), pair_items)
+    )
+    top_item_baskets.sort_indices()
+
+    return DatasetProfile(
+        fingerprint=dataset_fingerprint(df),
+        n_rows=len(df),
+        n_transactions=len(basket_sizes),
+        n_customers=df['UserID'].nunique(),
+        n_products=len(item_frequency),
+        total_revenue=df['Amount'].sum(),
+        date_min=df['Date'].min(),
+        date_max=df['Date'].max(),
+        basket_size_counts=basket_sizes.value_counts().sort_index(),
+        item_frequency=item_frequency,
+        top_item_grid=top_item_grid,
+        top_item_size_counts=top_item_size_counts,
+        pair_items=pair_items,
+        pair_counts=_count_pairs(top_item_baskets),
+        top_item_baskets=top_item_baskets
+    )
+
+
+def _tabulate_top_item_sizes(basket_codes, item_ranks, n_baskets, n_items, largest_basket):
+    """
+    Histogram of basket sizes when only the m most frequent items are kept
+
+    Args:
+        basket_codes: Integer basket code of every distinct (basket, item) pair
+        item_ranks: Frequency rank (0 = most frequent) of every pair's item
+        n_baskets: Number of baskets
+        n_items: Number of items
+        largest_basket: Largest number of distinct items in a basket
+
+    Returns:
+        Tuple of (grid of m values, array (len(grid), largest_basket + 1) of counts)
+    """
+    grid = np.unique(np.geomspace(1, max(n_items, 1), PROFILE_GRID_SIZE).round().astype(np.int64))
+    size_counts = np.zeros((len(grid), largest_basket + 1), dtype=np.int64)
+    if n_baskets == 0:
+        return grid, size_counts
+
+    # A pair counts towards every cut-off m with rank < m, i.e. from this grid index on
+    first_cutoff = np.searchsorted(grid, item_ranks, side='right')
+    order = np.argsort(basket_codes, kind='stable')
+    basket_codes, first_cutoff = basket_codes[order], first_cutoff[order]
+
+    chunk = max(MAX_BLOCK_ELEMENTS // len(grid), 1)
+    bounds = np.searchsorted(basket_codes, np.arange(0, n_baskets + chunk, chunk))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start == end:
+            continue
+        local = basket_codes[start:end] - basket_codes[start]
+        n_local = local[-1] + 1
+        keep = first_cutoff[start:end] < len(grid)
+        per_basket = np.bincount(
+            local[keep] * len(grid) + first_cutoff[start:end][keep], minlength=n_local * len(grid)
+        ).reshape(n_local, len(grid)).cumsum(axis=1)
+        # Count baskets by (cut-off, kept size)
+        cells = np.arange(len(grid)) * (largest_basket + 1) + per_basket
+        size_counts += np.bincount(cells.ravel(), minlength=size_counts.size).reshape(size_counts.shape)
+
+    return grid, size_counts
+
+
+def _count_pairs(baskets):
+    """Sorted non-zero co-occurrence counts of every item pair in a basket x item matrix"""
+    co_occurrence = sparse.triu(baskets.T @ baskets, k=1).tocoo()
+    return np.sort(co_occurrence.data[co_occurrence.data > 0])
+
+
+def _binomial(n, k):
+    """C(n, k) for real n >= k - 1, zero below"""
+    if n < k:
+        return 0.0
+    value = 1.0
+    for i in range(k):
+        value *= (n - i) / (i + 1)
+    return value
+
+
+def estimate_itemset_bound(profile, min_count, max_len=None):
+    """
+    Upper bound on the number of frequent itemsets at a support count
+
+    With m frequent items, a frequent k-itemset needs min_count supporting
+    baskets, and a basket holding n of the frequent items supports at most
+    C(n, k) of them, so there are at most sum_n count(n) * C(n, k) / min_count.
+    When the frequent items are covered by the profile's pair counts, the
+    number of frequent pairs F_2 is exact, and writing F_2 = C(x, 2) the
+    Kruskal-Katona theorem gives F_k <= C(x, k) for every larger k, since
+    each frequent k-itemset has only frequent subsets. Otherwise C(m, k)
+    and k * F_k <= (m - k + 1) * F_(k-1) are used.
+
+    Args:
+        profile: DatasetProfile
+        min_count: Minimum number of supporting baskets
+        max_len: Maximum itemset length considered (defaults to largest basket)
+
+    Returns:
+        Integer upper bound on the number of frequent itemsets
+    """
+    n_frequent_items = int((profile.item_frequency >= min_count).sum())
+    if n_frequent_items == 0:
+        return 0
+
+    # Smallest tabulated cut-off keeping at least the frequent items, so
+    # basket sizes are never under-counted
+    row = int(np.searchsorted(profile.top_item_grid, n_frequent_items))
+    size_counts = profile.top_item_size_counts[row]
+    sizes = np.flatnonzero(size_counts)
+    largest_basket = int(sizes.max()) if len(sizes) else 0
+    max_len = min(max_len or largest_basket, largest_basket, n_frequent_items)
+
+    frequent_pairs = None
+    if n_frequent_items <= profile.pair_items:
+        frequent_pairs = len(profile.pair_counts) - int(np.searchsorted(profile.pair_counts, min_count))
+        # Real x with C(x, 2) = F_2
+        shadow_size = (1 + sqrt(1 + 8 * frequent_pairs)) / 2
+
+    bound = 0
+    previous = n_frequent_items
+    for k in range(1, max_len + 1):
+        k_subsets = sum(int(size_counts[size]) * comb(int(size), k) for size in sizes if size >= k)
+        level_bound = min(comb(n_frequent_items, k), k_subsets // min_count)
+        if k > 1:
+            level_bound = min(level_bound, previous * (n_frequent_items - k + 1) // k)
+        if k == 2 and frequent_pairs is not None:
+            level_bound = min(level_bound, frequent_pairs)
+        elif k > 2 and frequent_pairs is not None:
+            # Small tolerance keeps float rounding from cutting an exact C(x, k)
+            level_bound = min(level_bound, int(_binomial(shadow_size, k) + 1e-6))
+        if level_bound == 0:
+            break
+        bound += level_bound
+        previous = level_bound
+    return bound
+
+
+def count_frequent_itemsets(profile, min_count, limit=None, max_len=None):
+    """
+    Exact number of frequent itemsets, counted level-wise over tid-lists
+
+    Only valid when every frequent item is among profile.pair_items; returns
+    None otherwise.
+
+    Args:
+        profile: DatasetProfile
+        min_count: Minimum number of supporting baskets
+        limit: Stop counting once the total exceeds this
+        max_len: Maximum itemset length considered
+
+    Returns:
+        Number of frequent itemsets (limit + 1 if counting stopped early), or None
+    """
+    n_frequent_items = int((profile.item_frequency >= min_count).sum())
+    if n_frequent_items > profile.pair_items:
+        return None
+
+    baskets = profile.top_item_baskets
+    # Columns are in frequency rank order, so the frequent items come first
+    tidsets = {(rank,): baskets.indices[baskets.indptr[rank]:baskets.indptr[rank + 1]]
+               for rank in range(n_frequent_items)}
+    total = len(tidsets)
+    level = sorted(tidsets)
+    size = 1
+
+    while level and (max_len is None or size < max_len):
+        if limit is not None and total > limit:
+            return limit + 1
+        size += 1
+        next_tidsets = {}
+        for candidate in join_level(level):
+            if size > 2 and not all(sub in tidsets for sub in combinations(candidate, size - 1)):
+                continue
+            tids = np.intersect1d(tidsets[candidate[:-1]], tidsets[(candidate[-1],)], assume_unique=True)
+            if len(tids) >= min_count:
+                next_tidsets[candidate] = tids
+        total += len(next_tidsets)
+        # Keep single items for the intersections, and the previous level for subset checks
+        tidsets = {**{key: value for key, value in tidsets.items() if len(key) in (1, size - 1)}, **next_tidsets}
+        level = sorted(next_tidsets)
+
+    if limit is not None and total > limit:
+        return limit + 1
+    return total
+
+
+def choose_support_for_itemset_budget(profile, max_itemsets=500, max_len=None):
+    """
+    Pick the lowest support whose frequent-itemset bound stays within budget
+
+    Candidate thresholds are taken from the empirical item-frequency
+    distribution, so every candidate changes the set of frequent items.
+    Thresholds whose upper bound fits the budget are accepted directly;
+    below that, the number of frequent itemsets is counted exactly (with
+    early exit) and the lowest threshold within budget is binary searched.
+
+    Args:
+        profile: DatasetProfile
+        max_itemsets: Maximum number of frequent itemsets to allow
+        max_len: Maximum itemset length considered
+
+    Returns:
+        Minimum support as a fraction of transactions
+    """
+    candidate_counts = sorted(profile.item_frequency.unique(), reverse=True)
+    chosen_count = candidate_counts[0] if candidate_counts else 1
+
+    # Both the bound and the true count only grow as the threshold drops
+    first_unbounded = len(candidate_counts)
+    for position, count in enumerate(candidate_counts):
+        if estimate_itemset_bound(profile, int(count), max_len) > max_itemsets:
+            first_unbounded = position
+            break
+        chosen_count = count
+
+    low, high = first_unbounded, len(candidate_counts)
+    while low < high:
+        middle = (low + high) // 2
+        exact = count_frequent_itemsets(profile, int(candidate_counts[middle]), max_itemsets, max_len)
+        if exact is not None and exact <= max_itemsets:
+            chosen_count = candidate_counts[middle]
+            low = middle + 1
+        else:
+            high = middle
+
+    return float(chosen_count) / max(profile.n_transactions, 1)
@@ -0,0 +1,277 @@
+"""Pluggable query engines (pandas, Polars, DuckDB) for the transaction group-bys"""
+QUERY_ENGINES = ['pandas', 'polars', 'duckdb']
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import polars as pl
+    # Results come back to pandas through Arrow
+    POLARS_AVAILABLE = PYARROW_AVAILABLE
+except ImportError:
+    POLARS_AVAILABLE = False
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# Products listed per segment in the segment insights
+TOP_PRODUCTS = 5
+
+
+def available_engines():
+    """Query engines that can run in this environment"""
+    return [engine for engine in QUERY_ENGINES
+            if engine == 'pandas' or (engine == 'polars' and POLARS_AVAILABLE)
+            or (engine == 'duckdb' and DUCKDB_AVAILABLE)]
+
+
+def resolve_engine(engine):
+    """
+    Engine that will actually run a query
+
+    Args:
+        engine: One of QUERY_ENGINES
+
+    Returns:
+        engine, or 'pandas' when its package is not installed
+
+    Raises:
+        ValueError: If engine is unknown
+    """
+    if engine not in QUERY_ENGINES:
+        raise ValueError(f"Unknown query engine '{engine}'. Choose from {QUERY_ENGINES}")
+    return engine if engine in available_engines() else 'pandas'
+
+
+def _restore_dtypes(result, df, columns):
+    """Cast result columns to the dtypes pandas gives for the same group-by on df"""
+    dtypes = {}
+    for column, source in columns.items():
+        dtype = df[source].dtype if source in df else source
+        if result[column].dtype != dtype:
+            dtypes[column] = dtype
+    return result.astype(dtypes)
+
+
+def _lines(df, columns):
+    """Polars LazyFrame over the given columns of df"""
+    return pl.from_pandas(df[columns]).lazy()
+
+
+def _duckdb(**tables):
+    """In-memory DuckDB connection with the given DataFrames registered as views"""
+    connection = duckdb.connect()
+    for name, frame in tables.items():
+        # DuckDB scans Arrow tables natively but converts pandas string columns value by value
+        connection.register(name, pa.Table.from_pandas(frame, preserve_index=False) if PYARROW_AVAILABLE else frame)
+    return connection
+
+
+def customer_aggregates(df, engine):
+    """
+    Per-customer RFM group-by
+
+    Args:
+        df: DataFrame with columns Date, UserID, Amount, TransactionID, ProductID
+        engine: 'pandas', 'polars' or 'duckdb'
+
+    Returns:
+        DataFrame sorted by UserID with UserID, Recency (the last purchase date),
+        Frequency, TotalSpend, AvgOrderValue, UniqueProducts columns; the
+        engines return the same dtypes as pandas
+    """
+    if engine == 'pandas':
+        customer_metrics = df.groupby('UserID').agg({
+            'Date': 'max',  # Last purchase
+            'TransactionID': 'nunique',  # Frequency
+            'Amount': ['sum', 'mean'],  # Monetary
+            'ProductID': 'nunique'  # Variety
+        }).reset_index()
+        customer_metrics.columns = ['UserID', 'Recency', 'Frequency', 'TotalSpend', 'AvgOrderValue', 'UniqueProducts']
+        return customer_metrics
+
+    if engine == 'polars':
+        # Polars counts nulls as a distinct value and keeps a null group; pandas does neither
+        result = _lines(df, ['UserID', 'Date', 'TransactionID', 'Amount', 'ProductID']).filter(
+            pl.col('UserID').is_not_null()
+        ).group_by('UserID').agg(
+            pl.col('Date').max().alias('Recency'),
+            pl.col('TransactionID').drop_nulls().n_unique().alias('Frequency'),
+            pl.col('Amount').sum().alias('TotalSpend'),
+            pl.col('Amount').mean().alias('AvgOrderValue'),
+            pl.col('ProductID').drop_nulls().n_unique().alias('UniqueProducts')
+        ).sort('UserID').collect().to_pandas()
+    else:
+        result = _duckdb(lines=df).execute("""
+            SELECT UserID,
+                   max(Date) AS Recency,
+                   count(DISTINCT TransactionID) AS Frequency,
+                   sum(Amount) AS TotalSpend,
+                   avg(Amount) AS AvgOrderValue,
+                   count(DISTINCT ProductID) AS UniqueProducts
+            FROM lines
+            WHERE UserID IS NOT NULL
+            GROUP BY UserID
+            ORDER BY UserID
+        """).df()
+
+    return _restore_dtypes(result, df, {
+        'UserID': 'UserID', 'Recency': 'Date', 'Frequency': 'int64', 'TotalSpend': 'Amount',
+        'AvgOrderValue': 'float64', 'UniqueProducts': 'int64'
+    })
+
+
+def overview_aggregates(df, engine):
+    """
+    Daily and per-day product rollups
+
+    Args:
+        df: DataFrame with columns Date, ProductID, Amount, TransactionID
+        engine: 'pandas', 'polars' or 'duckdb'
+
+    Returns:
+        tuple: (daily, daily_products) as build_overview_aggregates returns them
+    """
+    if engine == 'pandas':
+        day = df['Date'].dt.normalize()
+
+        daily = df.groupby(day).agg(
+            Transactions=('TransactionID', 'nunique'),
+            Revenue=('Amount', 'sum'),
+            # Sized on the NumPy Date column: on Arrow frames a ProductID size is int64[pyarrow]
+            Items=('Date', 'size')
+        )
+        daily.index.name = 'Date'
+
+        daily_products = df.groupby([day, df['ProductID']]).agg(
+            Transactions=('TransactionID', 'nunique'),
+            Revenue=('Amount', 'sum')
+        ).reset_index()
+        return daily, daily_products
+
+    if engine == 'polars':
+        lines = _lines(df, ['Date', 'ProductID', 'TransactionID', 'Amount']).filter(
+            pl.col('Date').is_not_null()
+        ).with_columns(pl.col('Date').dt.truncate('1d'))
+        measures = [pl.col('TransactionID').drop_nulls().n_unique().alias('Transactions'),
+                    pl.col('Amount').sum().alias('Revenue')]
+        daily, daily_products = pl.collect_all([
+            lines.group_by('Date').agg(*measures, pl.len().alias('Items')).sort('Date'),
+            lines.filter(pl.col('ProductID').is_not_null()).group_by(['Date', 'ProductID']).agg(*measures)
+            .sort(['Date', 'ProductID'])
+        ])
+        daily, daily_products = daily.to_pandas(), daily_products.to_pandas()
+    else:
+        connection = _duckdb(lines=df)
+        daily = connection.execute("""
+            SELECT CAST(date_trunc('day', Date) AS TIMESTAMP) AS Date,
+                   count(DISTINCT TransactionID) AS Transactions,
+                   sum(Amount) AS Revenue,
+                   count(*) AS Items
+            FROM lines
+            WHERE Date IS NOT NULL
+            GROUP BY 1
+            ORDER BY 1
+        """).df()
+        daily_products = connection.execute("""
+            SELECT CAST(date_trunc('day', Date) AS TIMESTAMP) AS Date,
+                   ProductID,
+                   count(DISTINCT TransactionID) AS Transactions,
+                   sum(Amount) AS Revenue
+            FROM lines
+            WHERE Date IS NOT NULL AND ProductID IS NOT NULL
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """).df()
+
+    measures = {'Date': 'Date', 'Transactions': 'int64', 'Revenue': 'Amount'}
+    daily = _restore_dtypes(daily, df, {**measures, 'Items': 'int64'}).set_index('Date')
+    daily_products = _restore_dtypes(daily_products, df, {**measures, 'ProductID': 'ProductID'})
+    return daily, daily_products
+
+
+def segment_aggregates(customer_metrics, df, engine):
+    """
+    Per-segment totals for the segment insights on a Polars or DuckDB engine
+
+    Args:
+        customer_metrics: DataFrame with UserID and SegmentName columns
+        df: Transaction DataFrame
+        engine: 'polars' or 'duckdb'
+
+    Returns:
+        tuple: (summary, top_products) where summary is indexed by SegmentName
+        with Revenue, Lines, Transactions, AvgSpend, AvgOrders columns, and
+        top_products maps each segment to its TOP_PRODUCTS most frequent
+        products and their line counts (ties broken by ProductID)
+    """
+    segments = customer_metrics[['UserID', 'SegmentName']]
+    if engine == 'polars':
+        lines = _lines(df, ['UserID', 'ProductID', 'TransactionID', 'Amount']).join(
+            pl.from_pandas(segments).lazy(), on='UserID', how='inner'
+        )
+        per_customer = lines.group_by(['SegmentName', 'UserID']).agg(
+            pl.col('Amount').sum().alias('Spend'),
+            pl.col('TransactionID').drop_nulls().n_unique().alias('Orders')
+        ).group_by('SegmentName').agg(
+            pl.col('Spend').mean().alias('AvgSpend'), pl.col('Orders').mean().alias('AvgOrders')
+        )
+        summary = lines.group_by('SegmentName').agg(
+            pl.col('Amount').sum().alias('Revenue'),
+            pl.len().alias('Lines'),
+            pl.col('TransactionID').drop_nulls().n_unique().alias('Transactions')
+        ).join(per_customer, on='SegmentName')
+        products = lines.filter(pl.col('ProductID').is_not_null()).group_by(['SegmentName', 'ProductID']).agg(
+            pl.len().alias('Count')
+        ).sort(['SegmentName', 'Count', 'ProductID'], descending=[False, True, False]).group_by(
+            'SegmentName', maintain_order=True
+        ).head(TOP_PRODUCTS)
+        summary, products = (frame.to_pandas() for frame in pl.collect_all([summary, products]))
+    else:
+        connection = _duckdb(lines=df, segments=segments)
+        connection.execute("""
+            CREATE TEMP VIEW segmented AS
+            SELECT lines.*, segments.SegmentName FROM lines JOIN segments USING (UserID)
+        """)
+        summary = connection.execute("""
+            WITH per_customer AS (
+                SELECT SegmentName, UserID, sum(Amount) AS Spend, count(DISTINCT TransactionID) AS Orders
+                FROM segmented
+                GROUP BY SegmentName, UserID
+            )
+            SELECT SegmentName, Revenue, Lines, Transactions, AvgSpend, AvgOrders
+            FROM (
+                SELECT SegmentName, sum(Amount) AS Revenue, count(*) AS Lines,
+                       count(DISTINCT TransactionID) AS Transactions
+                FROM segmented
+                GROUP BY SegmentName
+            ) JOIN (
+                SELECT SegmentName, avg(Spend) AS AvgSpend, avg(Orders) AS AvgOrders
+                FROM per_customer
+                GROUP BY SegmentName
+            ) USING (SegmentName)
+        """).df()
+        products = connection.execute(f"""
+            SELECT SegmentName, ProductID, count(*) AS Count
+            FROM segmented
+            WHERE ProductID IS NOT NULL
+            GROUP BY SegmentName, ProductID
+            QUALIFY row_number() OVER (PARTITION BY SegmentName ORDER BY count(*) DESC, ProductID) <= {TOP_PRODUCTS}
+            ORDER BY SegmentName, Count DESC, ProductID
+        """).df()
+
+    summary = _restore_dtypes(summary, df, {
+        'Revenue': 'Amount', 'Lines': 'int64', 'Transactions': 'int64', 'AvgSpend': 'float64', 'AvgOrders': 'float64'
+    }).set_index('SegmentName')
+    products = _restore_dtypes(products, df, {'ProductID': 'ProductID', 'Count': 'int64'})
+    top_products = {
+        segment: group.set_index('ProductID')['Count'].to_dict()
+        for segment, group in products.groupby('SegmentName', sort=False)
+    }
+    return summary, top_products
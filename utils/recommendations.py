@@ -0,0 +1,155 @@
+"""Per-customer product recommendations from co-occurrence and association rules"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.market_basket import encode_baskets
+
+# Upper bound on customer x product scores materialized per batch
+MAX_BLOCK_ELEMENTS = 2**24
+
+
+class BasketRecommender:
+    """
+    Batch recommender scoring products for every customer at once
+
+    Item-to-item scores combine co-occurrence confidence P(j | i) with the
+    confidence of mined association rules. A customer's score for product j
+    is the sum over products i they bought of score(i, j), i.e. a sparse
+    user x item @ item x item product. Customers are scored in batches small
+    enough for a dense score block; already purchased products are zeroed
+    and the top N per customer are picked with a row-wise argpartition.
+
+    Args:
+        rule_weight: Weight of association-rule confidence relative to co-occurrence
+    """
+
+    def __init__(self, rule_weight=1.0):
+        self.rule_weight = rule_weight
+        self.user_ids = None
+        self.items = None
+        self.user_items = None
+        self.item_scores = None
+
+    def fit(self, df, rules=None):
+        """
+        Build the user x item and item x item matrices
+
+        Args:
+            df: DataFrame with columns UserID, TransactionID, ProductID
+            rules: Optional rules DataFrame from find_product_bundles
+
+        Returns:
+            self
+        """
+        baskets = encode_baskets(df, with_values=False)
+        self.items = baskets.items
+
+        # Co-occurrence confidence: baskets with i and j over baskets with i
+        co_occurrence = (baskets.matrix.T @ baskets.matrix).tocsr().astype(np.float32)
+        item_counts = co_occurrence.diagonal()
+        co_occurrence.setdiag(0)
+        co_occurrence.eliminate_zeros()
+        item_scores = sparse.diags(1 / np.maximum(item_counts, 1)) @ co_occurrence
+
+        if rules is not None and not rules.empty:
+            item_scores = item_scores + self.rule_weight * self._rule_scores(rules)
+
+        self.item_scores = item_scores.tocsr()
+
+        user_codes, self.user_ids = pd.factorize(df['UserID'])
+        item_codes = self.items.get_indexer(df['ProductID'])
+        self.user_items = sparse.csr_matrix(
+            (np.ones(len(df), dtype=np.float32), (user_codes, item_codes)),
+            shape=(len(self.user_ids), len(self.items))
+        )
+        self.user_items.data[:] = 1
+        self.user_ids = pd.Index(self.user_ids)
+
+        return self
+
+    def _rule_scores(self, rules):
+        """Item x item matrix of the best rule confidence from antecedent item to consequent item"""
+        rows, cols, values = [], [], []
+        for antecedents, consequents, confidence in zip(rules['antecedents'], rules['consequents'], rules['confidence']):
+            antecedent_codes = self.items.get_indexer(list(antecedents))
+            consequent_codes = self.items.get_indexer(list(consequents))
+            for a in antecedent_codes[antecedent_codes >= 0]:
+                for c in consequent_codes[consequent_codes >= 0]:
+                    rows.append(a)
+                    cols.append(c)
+                    values.append(confidence)
+
+        scores = pd.DataFrame({'row': rows, 'col': cols, 'value': values}).groupby(['row', 'col'])['value'].max()
+        return sparse.csr_matrix(
+            (scores.to_numpy(dtype=np.float32), (scores.index.get_level_values(0), scores.index.get_level_values(1))),
+            shape=(len(self.items), len(self.items))
+        )
+
+    def recommend(self, user_ids=None, top_n=3, batch_size=None):
+        """
+        Top-N unpurchased products for each customer
+
+        Args:
+            user_ids: UserIDs to score (None for all customers)
+            top_n: Recommendations per customer
+            batch_size: Customers scored per dense block (defaults to
+                MAX_BLOCK_ELEMENTS divided by the catalogue size)
+
+        Returns:
+            DataFrame with UserID, Rank, ProductID, Score (customers without any
+            co-purchase signal get no rows)
+        """
+        if user_ids is None:
+            positions = np.arange(len(self.user_ids))
+        else:
+            positions = self.user_ids.get_indexer(user_ids)
+            positions = positions[positions >= 0]
+
+        if batch_size is None:
+            batch_size = max(MAX_BLOCK_ELEMENTS // max(len(self.items), 1), 1)
+
+        top_n = min(top_n, len(self.items))
+        results = []
+        for start in range(0, len(positions) if top_n > 0 else 0, batch_size):
+            batch = positions[start:start + batch_size]
+            owned = self.user_items[batch]
+            scores = (owned @ self.item_scores).toarray()
+            # Drop products the customer already bought
+            scores[owned.nonzero()] = 0
+
+            top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            keep = top_scores > 0
+            rows = np.broadcast_to(batch[:, None], top.shape)[keep]
+            ranks = np.broadcast_to(np.arange(1, top_n + 1), top.shape)[keep]
+            results.append(pd.DataFrame({
+                'UserID': self.user_ids[rows],
+                'Rank': ranks,
+                'ProductID': self.items[top[keep]],
+                'Score': top_scores[keep]
+            }))
+
+        if not results:
+            return pd.DataFrame(columns=['UserID', 'Rank', 'ProductID', 'Score'])
+        return pd.concat(results, ignore_index=True)
+
+
+def recommend_for_customers(df, user_ids=None, rules=None, top_n=3):
+    """
+    Convenience wrapper: fit a BasketRecommender and score customers
+
+    Args:
+        df: Transaction DataFrame
+        user_ids: UserIDs to score (None for all customers)
+        rules: Optional rules DataFrame from find_product_bundles
+        top_n: Recommendations per customer
+
+    Returns:
+        DataFrame with UserID, Rank, ProductID, Score
+    """
+    return BasketRecommender().fit(df, rules).recommend(user_ids, top_n)
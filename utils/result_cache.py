@@ -0,0 +1,178 @@
+"""Process-wide, memory-bounded LRU cache of analysis results with single-flight computation"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Marks a computation that failed; callers waiting on it compute for themselves
+_FAILED = object()
+
+
+def estimate_size(value, _seen=None):
+    """
+    Approximate memory held by a result, in bytes
+
+    DataFrames, arrays and sparse matrices report their buffers; containers
+    and plain objects (fitted models, dataclasses) are walked recursively.
+
+    Args:
+        value: Any Python object
+
+    Returns:
+        int
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if sparse.issparse(value):
+        return sum(getattr(value, name).nbytes for name in ('data', 'indices', 'indptr', 'row', 'col')
+                   if isinstance(getattr(value, name, None), np.ndarray))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(key, seen) + estimate_size(item, seen) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item, seen) for item in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_size(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    """Cached result with its size, the time it took to compute and its hit count"""
+    __slots__ = ('value', 'size', 'seconds', 'hits')
+
+    def __init__(self, value, size, seconds):
+        self.value = value
+        self.size = size
+        self.seconds = seconds
+        self.hits = 0
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of computed results, bounded by memory
+
+    A result is computed at most once at a time per key: callers asking for
+    a key that is being computed wait for that computation instead of
+    starting their own (single flight). When the cached results exceed
+    max_bytes, the least recently used ones are evicted; a result larger
+    than max_bytes is returned without being cached. Cached results are
+    shared between callers, so they must not be modified.
+
+    Args:
+        max_bytes: Memory budget of the cached results
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached result for key, computing it with compute() on a miss
+
+        Args:
+            key: Hashable key, e.g. (name, dataset fingerprint, parameters)
+            compute: Function of no arguments producing the result
+
+        Returns:
+            The result
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                self.hits += 1
+                self.seconds_saved += entry.seconds
+                return entry.value
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.waits += 1
+
+        if not leader:
+            value = flight.result()
+            if value is _FAILED:
+                # The leader's error (or rerun) is its own; try again here
+                return self.get_or_compute(key, compute)
+            return value
+
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                del self._in_flight[key]
+            flight.set_result(_FAILED)
+            raise
+        seconds = time.perf_counter() - started
+        size = estimate_size(value)
+
+        with self._lock:
+            del self._in_flight[key]
+            if size <= self.max_bytes:
+                self._entries[key] = _Entry(value, size, seconds)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes -= evicted.size
+                    self.evictions += 1
+        flight.set_result(value)
+        return value
+
+    def stats(self):
+        """Counters and memory use as a dictionary"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.waits
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.waits) / lookups if lookups else 0.0,
+                'seconds_saved': self.seconds_saved
+            }
+
+    def entries(self):
+        """DataFrame of the cached results, most recently used first"""
+        with self._lock:
+            rows = [
+                {'Key': key, 'Size (MiB)': entry.size / 2**20, 'Compute (s)': entry.seconds, 'Hits': entry.hits}
+                for key, entry in reversed(self._entries.items())
+            ]
+        return pd.DataFrame(rows, columns=['Key', 'Size (MiB)', 'Compute (s)', 'Hits'])
+
+    def clear(self):
+        """Drop every cached result (computations in flight still complete)"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
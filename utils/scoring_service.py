@@ -0,0 +1,401 @@
+"""Local asyncio HTTP service scoring customers and carts from persisted segmentation and bundle outputs"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.market_basket import basket_frame, encode_baskets, find_product_bundles
+from utils.rule_index import RuleIndex
+from utils.segmentation import SegmentationModel, calculate_customer_metrics, segment_customers
+from utils.similarity import CustomerSimilarityIndex
+
+# Artifact files written by save_scoring_artifacts
+MODEL_FILE = 'segmentation_model.joblib'
+CUSTOMERS_FILE = 'customers.csv'
+RULES_FILE = 'bundle_rules.npz'
+
+# Latencies kept per endpoint for the percentiles in /metrics
+METRICS_WINDOW = 10_000
+
+# Largest accepted request body
+MAX_BODY_BYTES = 16 * 2**20
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                500: 'Internal Server Error'}
+
+
+def save_scoring_artifacts(directory, model, customer_metrics, rules):
+    """
+    Persist everything the scoring service loads
+
+    Args:
+        directory: Output directory (created if missing)
+        model: SegmentationModel from segment_customers(..., return_model=True)
+        customer_metrics: Customer metrics with UserID, Segment, SegmentName
+            and the model's feature columns
+        rules: Rules DataFrame from find_product_bundles
+    """
+    os.makedirs(directory, exist_ok=True)
+    model.save(os.path.join(directory, MODEL_FILE))
+    columns = ['UserID', 'Segment', 'SegmentName'] + [
+        column for column in model.transformer.features if column not in ('UserID', 'Segment', 'SegmentName')
+    ]
+    customer_metrics[columns].to_csv(os.path.join(directory, CUSTOMERS_FILE), index=False)
+    RuleIndex.from_rules(rules).save(os.path.join(directory, RULES_FILE))
+
+
+def build_scoring_artifacts(df, directory, n_clusters='auto', min_support=0.01, min_confidence=0.3):
+    """
+    Segment customers, mine bundles and save the results for the scoring service
+
+    Args:
+        df: Transaction DataFrame
+        directory: Output directory
+        n_clusters: Number of segments, or 'auto'
+        min_support: Minimum bundle support
+        min_confidence: Minimum bundle confidence
+
+    Returns:
+        Tuple of (number of customers, number of rules)
+    """
+    customer_metrics, _, model = segment_customers(calculate_customer_metrics(df), n_clusters, return_model=True)
+    _, rules = find_product_bundles(basket_frame(encode_baskets(df, with_values=False), min_support),
+                                    min_support, min_confidence)
+    save_scoring_artifacts(directory, model, customer_metrics, rules)
+    return len(customer_metrics), len(rules)
+
+
+class LatencyRecorder:
+    """
+    Rolling per-endpoint request latencies
+
+    Args:
+        window: Number of most recent requests kept per endpoint
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self._latencies = {}
+        self._counts = {}
+
+    def record(self, endpoint, milliseconds, items=1):
+        """Record one request handling `items` lookups"""
+        self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(milliseconds)
+        requests, total_items = self._counts.get(endpoint, (0, 0))
+        self._counts[endpoint] = (requests + 1, total_items + items)
+
+    def summary(self):
+        """Dictionary of endpoint -> requests, items, p50_ms and p99_ms"""
+        summary = {}
+        for endpoint, latencies in self._latencies.items():
+            p50, p99 = np.percentile(np.fromiter(latencies, dtype=np.float64), [50, 99])
+            requests, items = self._counts[endpoint]
+            summary[endpoint] = {'requests': requests, 'items': items, 'p50_ms': round(float(p50), 3),
+                                 'p99_ms': round(float(p99), 3)}
+        return summary
+
+
+def _batch(payload, single, batched):
+    """Items of a request given as `single` (one item) or `batched` (a list); returns (items, is_batch)"""
+    if batched in payload:
+        if not isinstance(payload[batched], list):
+            raise ValueError(f"'{batched}' must be a list")
+        return payload[batched], True
+    if single in payload:
+        return [payload[single]], False
+    raise ValueError(f"Request needs '{single}' or '{batched}'")
+
+
+class ScoringService:
+    """
+    Segment, cart add-on and lookalike lookups over loaded models
+
+    The segmentation model, customer assignments, similarity index and rule
+    index are loaded once; every request is answered from memory. Each
+    endpoint takes one item or a batch (e.g. user_id or user_ids), and a
+    batch is answered with one vectorized lookup.
+
+    Endpoints (JSON in and out):
+        POST /segment     {"user_id" | "user_ids"} or {"customers": [metrics, ...]}
+        POST /recommend   {"cart" | "carts", "top_n", "metric"}
+        POST /lookalikes  {"user_id" | "user_ids", "k"}
+        GET  /metrics     request counts and p50/p99 latency per endpoint
+        GET  /health
+
+    Args:
+        model: SegmentationModel
+        customers: Customer metrics with UserID, SegmentName and the model's feature columns
+        rule_index: RuleIndex of the bundle rules
+    """
+
+    def __init__(self, model, customers, rule_index):
+        self.model = model
+        self.rule_index = rule_index
+        # Requests carry IDs as JSON strings or numbers; look them up as strings
+        self.user_ids = pd.Index(customers['UserID'].astype(str))
+        self.segment_names = customers['SegmentName'].to_numpy()
+        self.similarity_index = CustomerSimilarityIndex(self.user_ids, model.transformer.transform(customers))
+        self.metrics = LatencyRecorder()
+        self.routes = {
+            ('POST', '/segment'): self.segment,
+            ('POST', '/recommend'): self.recommend,
+            ('POST', '/lookalikes'): self.lookalikes,
+            ('GET', '/metrics'): lambda payload: self.metrics.summary(),
+            ('GET', '/health'): lambda payload: {'status': 'ok', 'customers': len(self.user_ids),
+                                                 'rules': len(self.rule_index)}
+        }
+
+    @classmethod
+    def from_directory(cls, directory):
+        """
+        Load the artifacts written by save_scoring_artifacts
+
+        Args:
+            directory: Artifact directory
+
+        Returns:
+            ScoringService
+        """
+        return cls(
+            SegmentationModel.load(os.path.join(directory, MODEL_FILE)),
+            pd.read_csv(os.path.join(directory, CUSTOMERS_FILE), dtype={'UserID': str}),
+            RuleIndex.load(os.path.join(directory, RULES_FILE))
+        )
+
+    def segment(self, payload):
+        """Segment of known customers by UserID, or of new customers from their metrics"""
+        if 'customers' in payload:
+            customers = pd.DataFrame(payload['customers'])
+            if 'UserID' not in customers:
+                customers['UserID'] = None
+            missing = [column for column in self.model.transformer.features if column not in customers]
+            if missing:
+                raise ValueError(f"Missing customer metrics: {', '.join(missing)}")
+            predicted = self.model.predict(customers)
+            return {'results': [
+                {'user_id': user_id, 'segment': segment}
+                for user_id, segment in zip(customers['UserID'].tolist(), predicted['SegmentName'].tolist())
+            ]}, len(customers)
+
+        user_ids, batched = _batch(payload, 'user_id', 'user_ids')
+        positions = self.user_ids.get_indexer([str(user_id) for user_id in user_ids])
+        results = [
+            {'user_id': user_id, 'segment': self.segment_names[position] if position >= 0 else None}
+            for user_id, position in zip(user_ids, positions.tolist())
+        ]
+        return ({'results': results} if batched else results[0]), len(results)
+
+    def recommend(self, payload):
+        """Best add-on products for one cart or a batch of carts"""
+        carts, batched = _batch(payload, 'cart', 'carts')
+        top_n = int(payload.get('top_n', 5))
+        metric = payload.get('metric', 'confidence')
+        if metric not in self.rule_index.metrics:
+            raise ValueError(f"Unknown metric '{metric}'. Choose from {sorted(self.rule_index.metrics)}")
+        results = [{'cart': cart, 'addons': self.rule_index.query(cart, top_n=top_n, metric=metric)} for cart in carts]
+        return ({'results': results} if batched else results[0]), len(results)
+
+    def lookalikes(self, payload):
+        """The k most similar customers to each given customer (one neighbour query for the whole batch)"""
+        user_ids, batched = _batch(payload, 'user_id', 'user_ids')
+        k = int(payload.get('k', 10))
+        positions = self.user_ids.get_indexer([str(user_id) for user_id in user_ids])
+        known = positions[positions >= 0]
+
+        neighbours = {}
+        if len(known):
+            # One extra neighbour since each customer is its own nearest
+            distances, nearest = self.similarity_index.query(self.similarity_index.features[known], k + 1)
+            for position, row_distances, row_nearest in zip(known.tolist(), distances, nearest):
+                keep = row_nearest != position
+                neighbours[position] = [
+                    {'user_id': self.user_ids[other], 'distance': round(float(distance), 6)}
+                    for other, distance in zip(row_nearest[keep][:k].tolist(), row_distances[keep][:k].tolist())
+                ]
+
+        results = [
+            {'user_id': user_id, 'lookalikes': neighbours.get(position, [])}
+            for user_id, position in zip(user_ids, positions.tolist())
+        ]
+        return ({'results': results} if batched else results[0]), len(results)
+
+    def dispatch(self, method, path, body):
+        """
+        Route one request
+
+        Args:
+            method: HTTP method
+            path: Request path (query string ignored)
+            body: Raw request body
+
+        Returns:
+            Tuple of (HTTP status, JSON-serializable response)
+        """
+        path = path.split('?', 1)[0]
+        handler = self.routes.get((method, path))
+        if handler is None:
+            return 404, {'error': f"No endpoint {method} {path}"}
+
+        started = time.perf_counter()
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object")
+            response = handler(payload)
+        except (ValueError, TypeError, KeyError) as error:
+            return 400, {'error': str(error)}
+        except Exception as error:
+            # Keep serving other requests; the client gets the error instead of a dropped connection
+            return 500, {'error': f"{type(error).__name__}: {error}"}
+
+        items = 1
+        if isinstance(response, tuple):
+            response, items = response
+        if method == 'POST':
+            self.metrics.record(path, (time.perf_counter() - started) * 1000, items)
+        return 200, response
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive unless the client closes)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, response = 413, {'error': f"Body larger than {MAX_BODY_BYTES} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = self.dispatch(method, path, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                data = json.dumps(response).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Dropped connection or malformed request line/headers
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """Start listening; returns the asyncio Server"""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """Accept connections until cancelled"""
+        async with await self.start(host, port) as server:
+            print(f"Serving on http://{host}:{port}", flush=True)
+            await server.serve_forever()
+
+
+class ScoringClient:
+    """
+    Minimal async HTTP client keeping one connection open to the scoring service
+
+    Requests on one client are sent one at a time; open several clients for
+    concurrent load.
+
+    Args:
+        host: Service host
+        port: Service port
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, payload=None):
+        """
+        Send one request
+
+        Args:
+            method: 'GET' or 'POST'
+            path: Endpoint path, e.g. '/segment'
+            payload: JSON-serializable request body
+
+        Returns:
+            Tuple of (HTTP status, decoded JSON response)
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self._writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await self._writer.drain()
+
+        status = int((await self._reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        response = json.loads(await self._reader.readexactly(int(headers['content-length'])))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, response
+
+    async def close(self):
+        """Close the connection"""
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._reader = self._writer = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve segment, cart add-on and lookalike lookups over HTTP")
+    parser.add_argument('directory', help="Directory written by save_scoring_artifacts")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--transactions', default=None,
+                        help="Transaction CSV to segment and mine into the directory before serving")
+    parser.add_argument('--clusters', default='auto', help="Number of segments, or 'auto'")
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--min-confidence', type=float, default=0.3)
+    args = parser.parse_args()
+
+    if args.transactions:
+        n_customers, n_rules = build_scoring_artifacts(
+            pd.read_csv(args.transactions, parse_dates=['Date']), args.directory,
+            args.clusters if args.clusters == 'auto' else int(args.clusters), args.min_support, args.min_confidence
+        )
+        print(f"Saved {n_customers:,} customer segments and {n_rules:,} rules to {args.directory}", flush=True)
+
+    started = time.perf_counter()
+    service = ScoringService.from_directory(args.directory)
+    print(f"Loaded {len(service.user_ids):,} customers and {len(service.rule_index):,} rules "
+          f"in {time.perf_counter() - started:.2f}s", flush=True)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
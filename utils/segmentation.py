@@ -1,15 +1,30 @@
 """Customer segmentation using K-Means clustering"""
+from dataclasses import dataclass
+
+import joblib
 import pandas as pd
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+from utils.features import CustomerFeatureTransformer
+from utils.churn import CHURN_COLUMNS, score_churn
+from utils.clv import CLV_HORIZONS, predict_clv
+from utils.query_engine import customer_aggregates, resolve_engine, segment_aggregates
 
-def calculate_customer_metrics(df):
+def calculate_customer_metrics(df, engine='pandas'):
     """
     Calculate RFM and other customer metrics
     
+    Churn scores from a BG/NBD fit (CHURN_COLUMNS) are added alongside the
+    RFM columns, and CLV is the BG/NBD x Gamma-Gamma expected spend over the
+    next year (CLV90 and CLV180 give shorter horizons).
+    
     Args:
         df: DataFrame with columns Date, UserID, Amount, TransactionID, ProductID
+        engine: Query engine for the RFM group-by ('pandas', 'polars' or
+            'duckdb'; falls back to pandas when not installed)
     
     Returns:
         DataFrame with customer metrics
@@ -17,41 +32,183 @@ def calculate_customer_metrics(df):
     # Calculate recency, frequency, monetary
     current_date = df['Date'].max()
     
-    customer_metrics = df.groupby('UserID').agg({
-        'Date': lambda x: (current_date - x.max()).days,  # Recency
-        'TransactionID': 'nunique',  # Frequency
-        'Amount': ['sum', 'mean'],  # Monetary
-        'ProductID': 'nunique'  # Variety
-    }).reset_index()
+    customer_metrics = customer_aggregates(df, resolve_engine(engine))
+    # Days since the last purchase, in one vectorized subtraction
+    customer_metrics['Recency'] = (current_date - customer_metrics['Recency']).dt.days
     
-    customer_metrics.columns = ['UserID', 'Recency', 'Frequency', 'TotalSpend', 'AvgOrderValue', 'UniqueProducts']
-    
-    # Calculate Customer Lifetime Value (simple version)
-    customer_metrics['CLV'] = customer_metrics['TotalSpend'] * (customer_metrics['Frequency'] / customer_metrics['Recency'].replace(0, 1))
+    # Probability of still being active, expected purchases and lifetime value
+    churn_scores, purchase_model = score_churn(df, current_date)
+    clv, _, _ = predict_clv(df, CLV_HORIZONS, current_date, summary=churn_scores, purchase_model=purchase_model)
+    customer_metrics = customer_metrics.merge(
+        churn_scores[['UserID'] + CHURN_COLUMNS].merge(clv, on='UserID'), on='UserID', how='left'
+    )
+    customer_metrics['CLV'] = customer_metrics[f'CLV{CLV_HORIZONS[-1]}']
     
     return customer_metrics
 
-def segment_customers(customer_metrics, n_clusters=3):
+@dataclass
+class ClusterSweep:
+    """
+    K-Means fits and quality scores for a range of cluster counts
+    
+    Attributes:
+        models: Dictionary mapping k -> fitted KMeans
+        scores: DataFrame indexed by k with Silhouette, DaviesBouldin, Inertia columns
+    """
+    models: dict
+    scores: pd.DataFrame
+    
+    @property
+    def best_k(self):
+        """Cluster count with the highest silhouette (ties go to lower Davies-Bouldin)"""
+        ranked = self.scores.sort_values(['Silhouette', 'DaviesBouldin'], ascending=[False, True])
+        return int(ranked.index[0])
+    
+    @property
+    def elbow_k(self):
+        """Cluster count furthest below the straight line joining the inertia endpoints"""
+        inertia = self.scores['Inertia'].to_numpy()
+        ks = self.scores.index.to_numpy()
+        if len(ks) < 3:
+            return int(ks[0])
+        line = inertia[0] + (inertia[-1] - inertia[0]) * (ks - ks[0]) / (ks[-1] - ks[0])
+        return int(ks[np.argmax(line - inertia)])
+
+@dataclass
+class SegmentationModel:
+    """
+    Everything needed to assign segments to new customers
+    
+    Attributes:
+        transformer: Fitted CustomerFeatureTransformer
+        kmeans: Fitted KMeans
+        segment_labels: Dictionary mapping cluster id -> segment name
+    """
+    transformer: CustomerFeatureTransformer
+    kmeans: KMeans
+    segment_labels: dict
+    
+    def predict(self, customer_metrics):
+        """
+        Assign segments to customers using the persisted transform
+        
+        Args:
+            customer_metrics: DataFrame with the transformer's feature columns
+        
+        Returns:
+            DataFrame with UserID, Segment and SegmentName columns
+        """
+        segments = self.kmeans.predict(self.transformer.transform(customer_metrics))
+        return pd.DataFrame({
+            'UserID': customer_metrics['UserID'].to_numpy(),
+            'Segment': segments,
+            'SegmentName': pd.Series(segments).map(self.segment_labels).to_numpy()
+        })
+    
+    def save(self, path):
+        """Persist the model to disk"""
+        joblib.dump(self, path)
+    
+    @staticmethod
+    def load(path):
+        """Load a model saved with save()"""
+        return joblib.load(path)
+
+def _fit_and_score(features_scaled, k, silhouette_sample, random_state):
+    """Fit K-Means for one k and score it (scores are None if the fit has fewer than 2 distinct labels)"""
+    kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=10).fit(features_scaled)
+    if len(np.unique(kmeans.labels_)) < 2:
+        # Duplicate points collapse into fewer clusters than asked for; neither score is defined
+        return k, kmeans, None, None
+    sample_size = min(silhouette_sample, len(features_scaled)) if silhouette_sample else None
+    silhouette = silhouette_score(features_scaled, kmeans.labels_, sample_size=sample_size, random_state=random_state)
+    davies_bouldin = davies_bouldin_score(features_scaled, kmeans.labels_)
+    return k, kmeans, silhouette, davies_bouldin
+
+def sweep_cluster_counts(features_scaled, k_min=2, k_max=8, silhouette_sample=5000, n_jobs=-1, random_state=42):
+    """
+    Fit K-Means for every k in a range in parallel and score each fit
+    
+    Args:
+        features_scaled: Array of scaled features
+        k_min: Smallest cluster count
+        k_max: Largest cluster count
+        silhouette_sample: Customers sampled for the silhouette score (None for all)
+        n_jobs: Parallel jobs (-1 for all cores)
+        random_state: Random seed for K-Means and silhouette sampling
+    
+    Returns:
+        ClusterSweep
+    
+    Raises:
+        ValueError: If there are fewer than 3 customers, or no k gives at
+            least 2 distinct clusters
+    """
+    # Silhouette is only defined for 2 <= k <= n_samples - 1
+    k_max = min(k_max, len(features_scaled) - 1)
+    ks = range(max(k_min, 2), k_max + 1)
+    if not ks:
+        raise ValueError(f"Need at least 3 customers for auto k, got {len(features_scaled)}")
+    
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_score)(features_scaled, k, silhouette_sample, random_state) for k in ks
+    )
+    # Skip fits that collapsed into a single cluster
+    results = [result for result in results if result[2] is not None]
+    if not results:
+        raise ValueError("No cluster count gives at least 2 distinct clusters; the customers' features are identical")
+    
+    models = {k: kmeans for k, kmeans, _, _ in results}
+    scores = pd.DataFrame(
+        [(k, silhouette, davies_bouldin, models[k].inertia_) for k, _, silhouette, davies_bouldin in results],
+        columns=['k', 'Silhouette', 'DaviesBouldin', 'Inertia']
+    ).set_index('k')
+    
+    return ClusterSweep(models, scores)
+
+def segment_customers(customer_metrics, n_clusters=3, sweep=None, transformer=None, return_model=False,
+                      features_scaled=None):
     """
     Perform K-Means clustering on customer metrics
     
     Args:
         customer_metrics: DataFrame with customer metrics
-        n_clusters: Number of clusters
+        n_clusters: Number of clusters, or 'auto' to pick it from a cluster sweep
+        sweep: Optional ClusterSweep over the same transformed features; fitted
+            models are reused instead of refitting
+        transformer: Optional CustomerFeatureTransformer (fitted or not);
+            defaults to standard scaling of the RFM features
+        return_model: Also return the SegmentationModel
+        features_scaled: Optional features already produced by the fitted
+            transformer for these customers; skips transforming them again
     
     Returns:
-        DataFrame with segment assignments and labels
+        Tuple of (customer_metrics with segment assignments and labels,
+        segment_profiles), plus the SegmentationModel if return_model is set
     """
-    # Select features for clustering
-    features = customer_metrics[['Recency', 'Frequency', 'TotalSpend', 'UniqueProducts']].values
+    # Transform features
+    if transformer is None:
+        transformer = CustomerFeatureTransformer()
+    if features_scaled is not None:
+        if not transformer.is_fitted:
+            raise ValueError("features_scaled requires the transformer that produced them")
+    elif transformer.is_fitted:
+        features_scaled = transformer.transform(customer_metrics)
+    else:
+        features_scaled = transformer.fit_transform(customer_metrics)
     
-    # Scale features
-    scaler = StandardScaler()
-    features_scaled = scaler.fit_transform(features)
+    if n_clusters == 'auto':
+        if sweep is None:
+            sweep = sweep_cluster_counts(features_scaled)
+        n_clusters = sweep.best_k
     
     # Perform K-Means
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    customer_metrics['Segment'] = kmeans.fit_predict(features_scaled)
+    if sweep is not None and n_clusters in sweep.models:
+        kmeans = sweep.models[n_clusters]
+        customer_metrics['Segment'] = kmeans.labels_
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        customer_metrics['Segment'] = kmeans.fit_predict(features_scaled)
     
     # Label segments based on characteristics
     segment_profiles = customer_metrics.groupby('Segment').agg({
@@ -82,34 +239,75 @@ def segment_customers(customer_metrics, n_clusters=3):
     
     customer_metrics['SegmentName'] = customer_metrics['Segment'].map(segment_labels)
     
+    if return_model:
+        return customer_metrics, segment_profiles, SegmentationModel(transformer, kmeans, segment_labels)
     return customer_metrics, segment_profiles
 
-def get_segment_insights(customer_metrics, df):
+def get_segment_insights(customer_metrics, df, engine='pandas'):
     """
     Generate detailed insights for each segment
     
     Args:
         customer_metrics: DataFrame with segment assignments
         df: Original transaction DataFrame
+        engine: Query engine for the per-segment group-bys ('pandas', 'polars'
+            or 'duckdb'; falls back to pandas when not installed)
     
     Returns:
         Dictionary with segment insights
     """
     insights = {}
     
+    engine = resolve_engine(engine)
+    if engine != 'pandas':
+        summary, top_products = segment_aggregates(customer_metrics, df, engine)
+        total_revenue = df['Amount'].sum()
+        for segment_name in customer_metrics['SegmentName'].unique():
+            insights[segment_name] = {
+                'size': int((customer_metrics['SegmentName'] == segment_name).sum()),
+                'total_revenue': summary.at[segment_name, 'Revenue'],
+                'avg_spend_per_customer': summary.at[segment_name, 'AvgSpend'],
+                'avg_frequency': summary.at[segment_name, 'AvgOrders'],
+                'top_products': top_products.get(segment_name, {}),
+                'avg_items_per_transaction': summary.at[segment_name, 'Lines'] / summary.at[segment_name, 'Transactions'],
+                'revenue_contribution': (summary.at[segment_name, 'Revenue'] / total_revenue) * 100
+            }
+        _add_churn_insights(insights, customer_metrics)
+        return insights
+    
+    # Per-customer totals and each line's segment are computed once over the
+    # whole log; segments then only select rows instead of re-grouping a
+    # filtered copy by UserID
+    segment_of_user = customer_metrics.set_index('UserID')['SegmentName']
+    line_segments = segment_of_user.reindex(df['UserID']).to_numpy()
+    per_customer = df.groupby('UserID').agg(Spend=('Amount', 'sum'), Orders=('TransactionID', 'nunique'))
+    total_revenue = df['Amount'].sum()
+    
     for segment_name in customer_metrics['SegmentName'].unique():
-        segment_users = customer_metrics[customer_metrics['SegmentName'] == segment_name]['UserID'].tolist()
-        segment_data = df[df['UserID'].isin(segment_users)]
+        segment_users = customer_metrics.loc[customer_metrics['SegmentName'] == segment_name, 'UserID']
+        segment_data = df[line_segments == segment_name]
+        segment_customers = per_customer[per_customer.index.isin(segment_users)]
         
         # Calculate insights
         insights[segment_name] = {
             'size': len(segment_users),
             'total_revenue': segment_data['Amount'].sum(),
-            'avg_spend_per_customer': segment_data.groupby('UserID')['Amount'].sum().mean(),
-            'avg_frequency': segment_data.groupby('UserID')['TransactionID'].nunique().mean(),
+            'avg_spend_per_customer': segment_customers['Spend'].mean(),
+            'avg_frequency': segment_customers['Orders'].mean(),
             'top_products': segment_data['ProductID'].value_counts().head(5).to_dict(),
             'avg_items_per_transaction': len(segment_data) / segment_data['TransactionID'].nunique(),
-            'revenue_contribution': (segment_data['Amount'].sum() / df['Amount'].sum()) * 100
+            'revenue_contribution': (segment_data['Amount'].sum() / total_revenue) * 100
         }
     
+    _add_churn_insights(insights, customer_metrics)
     return insights
+
+
+def _add_churn_insights(insights, customer_metrics):
+    """Add each segment's average P(active) and likely-churned count when churn scores exist"""
+    if 'PAlive' not in customer_metrics:
+        return
+    for segment_name in insights:
+        segment_scores = customer_metrics.loc[customer_metrics['SegmentName'] == segment_name, 'PAlive']
+        insights[segment_name]['avg_p_alive'] = segment_scores.mean()
+        insights[segment_name]['likely_churned'] = int((segment_scores < 0.5).sum())
@@ -0,0 +1,120 @@
+"""Nearest-neighbour lookup over the segmentation feature space"""
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+SIMILARITY_METHODS = ['auto', 'kdtree', 'brute']
+
+# KD-trees stop paying off in higher dimensions
+KDTREE_MAX_DIMENSIONS = 16
+
+# Upper bound on the query x customer distance block held in memory
+MAX_BLOCK_ELEMENTS = 2**24
+
+
+class CustomerSimilarityIndex:
+    """
+    Index of customers in the scaled feature space for k-NN lookups
+
+    Low-dimensional feature spaces use a KD-tree; otherwise queries run as
+    batched matrix products, with the query batch sized so the distance
+    block stays within MAX_BLOCK_ELEMENTS.
+
+    Args:
+        user_ids: Sequence of UserIDs, one per feature row
+        features: Array (customers x features), e.g. from the segmentation transformer
+        method: 'auto', 'kdtree' or 'brute'
+    """
+
+    def __init__(self, user_ids, features, method='auto'):
+        if method not in SIMILARITY_METHODS:
+            raise ValueError(f"Unknown similarity method '{method}'. Choose from {SIMILARITY_METHODS}")
+
+        self.user_ids = pd.Index(user_ids)
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+
+        if method == 'auto':
+            method = 'kdtree' if self.features.shape[1] <= KDTREE_MAX_DIMENSIONS else 'brute'
+        self.method = method
+
+        if method == 'kdtree':
+            self._tree = KDTree(self.features)
+        else:
+            self._squared_norms = np.einsum('ij,ij->i', self.features, self.features)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def query(self, vectors, k=50):
+        """
+        Find the k nearest customers to each query vector
+
+        Args:
+            vectors: Array (queries x features) in the indexed feature space
+            k: Number of neighbours
+
+        Returns:
+            Tuple of (distances, positions), each of shape (queries, k), nearest first
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        k = min(k, len(self))
+
+        if self.method == 'kdtree':
+            return self._tree.query(vectors, k=k)
+
+        batch_size = max(MAX_BLOCK_ELEMENTS // max(len(self), 1), 1)
+        distances = np.empty((len(vectors), k), dtype=np.float32)
+        positions = np.empty((len(vectors), k), dtype=np.int64)
+
+        for start in range(0, len(vectors), batch_size):
+            batch = vectors[start:start + batch_size]
+            # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2
+            squared = batch @ self.features.T
+            squared *= -2
+            squared += self._squared_norms
+            squared += np.einsum('ij,ij->i', batch, batch)[:, None]
+            np.maximum(squared, 0, out=squared)
+
+            nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+            nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+            order = np.argsort(nearest_squared, axis=1)
+
+            positions[start:start + len(batch)] = np.take_along_axis(nearest, order, axis=1)
+            distances[start:start + len(batch)] = np.sqrt(np.take_along_axis(nearest_squared, order, axis=1))
+
+        return distances, positions
+
+    def lookalikes(self, seed_user_ids, k=50):
+        """
+        Customers most similar to one or more seed customers
+
+        With several seeds, each candidate is ranked by its distance to the
+        closest seed. Seeds themselves are excluded from the audience.
+
+        Args:
+            seed_user_ids: UserID or list of UserIDs to find lookalikes for
+            k: Audience size
+
+        Returns:
+            DataFrame with UserID, SeedUserID, Distance, sorted nearest first
+        """
+        if np.isscalar(seed_user_ids):
+            seed_user_ids = [seed_user_ids]
+        seed_positions = self.user_ids.get_indexer(seed_user_ids)
+        seed_positions = seed_positions[seed_positions >= 0]
+        if len(seed_positions) == 0:
+            return pd.DataFrame(columns=['UserID', 'SeedUserID', 'Distance'])
+
+        # Over-fetch so removing the seeds still leaves k customers
+        distances, positions = self.query(self.features[seed_positions], k + len(seed_positions))
+
+        audience = pd.DataFrame({
+            'Position': positions.ravel(),
+            'SeedUserID': np.repeat(self.user_ids[seed_positions], positions.shape[1]),
+            'Distance': distances.ravel()
+        })
+        audience = audience[~audience['Position'].isin(seed_positions)]
+        audience = audience.sort_values('Distance').drop_duplicates('Position').head(k)
+        audience.insert(0, 'UserID', self.user_ids[audience['Position'].to_numpy()])
+
+        return audience.drop(columns='Position').reset_index(drop=True)
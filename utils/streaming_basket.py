@@ -0,0 +1,214 @@
+"""Out-of-core market basket mining for transaction files larger than memory"""
+import argparse
+import os
+import tempfile
+from math import ceil
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, association_rules
+
+from utils.market_basket import encode_baskets, format_rules
+
+BASKET_COLUMNS = ['TransactionID', 'ProductID']
+
+
+def iter_transaction_chunks(path, chunksize=100_000):
+    """
+    Read TransactionID/ProductID columns from a CSV or Parquet file in chunks
+
+    Args:
+        path: Path to a .csv or .parquet file
+        chunksize: Rows per chunk
+
+    Yields:
+        DataFrames with TransactionID and ProductID as strings; lines with a
+        missing ID are dropped
+    """
+    if path.endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet files requires pyarrow: pip install pyarrow") from e
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=BASKET_COLUMNS):
+            # Drop nulls before the cast, which would turn them into 'None'/'nan'
+            yield batch.to_pandas().dropna().astype(str)
+    else:
+        for chunk in pd.read_csv(path, usecols=BASKET_COLUMNS, dtype=str, chunksize=chunksize):
+            yield chunk.dropna()
+
+
+def partition_transactions(path, directory, n_partitions, chunksize=100_000):
+    """
+    Split a transaction file into partitions that each hold whole transactions
+
+    Lines are routed by a hash of their TransactionID, so a transaction never
+    straddles two partitions regardless of how the input file is ordered.
+
+    Args:
+        path: Path to a .csv or .parquet file
+        directory: Directory to write the partition files into
+        n_partitions: Number of partitions
+        chunksize: Rows per chunk read from the input
+
+    Returns:
+        List of partition file paths
+    """
+    paths = [os.path.join(directory, f'partition_{i:04d}.csv') for i in range(n_partitions)]
+
+    for chunk in iter_transaction_chunks(path, chunksize):
+        hashes = pd.util.hash_pandas_object(chunk['TransactionID'], index=False).to_numpy()
+        for partition, rows in chunk.groupby(hashes % n_partitions):
+            target = paths[partition]
+            rows.to_csv(target, mode='a', header=not os.path.exists(target), index=False)
+
+    return [p for p in paths if os.path.exists(p)]
+
+
+def _read_partition(path):
+    """Load one partition file with IDs kept as strings"""
+    return pd.read_csv(path, dtype=str)
+
+
+def _count_itemsets(baskets, itemsets):
+    """
+    Count the baskets containing each itemset in one partition
+
+    SON candidates are a union of downward-closed sets, so the prefix of
+    every candidate is itself a candidate. Counting runs level by level:
+    the transaction-id list of an itemset is the intersection of its
+    prefix's list with the list of its last item.
+
+    Args:
+        baskets: BasketMatrix of the partition
+        itemsets: List of frozensets of ProductIDs
+
+    Returns:
+        Array of counts aligned with itemsets
+    """
+    matrix = baskets.matrix.tocsc()
+    matrix.sort_indices()
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+
+    # Candidates as sorted tuples of column positions, grouped by length
+    levels = {}
+    for i, itemset in enumerate(itemsets):
+        columns = baskets.items.get_indexer(list(itemset))
+        if (columns < 0).any():
+            continue
+        levels.setdefault(len(columns), []).append((tuple(sorted(columns)), i))
+
+    def item_tids(column):
+        return matrix.indices[matrix.indptr[column]:matrix.indptr[column + 1]]
+
+    previous = {}
+    for size in sorted(levels):
+        current = {}
+        for key, i in levels[size]:
+            if size == 1:
+                tids = item_tids(key[0])
+            elif key[:-1] in previous:
+                tids = np.intersect1d(previous[key[:-1]], item_tids(key[-1]), assume_unique=True)
+            else:
+                # Prefix absent from this partition's candidates: intersect from scratch
+                tids = item_tids(key[0])
+                for column in key[1:]:
+                    tids = np.intersect1d(tids, item_tids(column), assume_unique=True)
+            counts[i] = len(tids)
+            current[key] = tids
+        previous = current
+
+    return counts
+
+
+def mine_bundles_out_of_core(path, min_support=0.05, min_confidence=0.3, metric='confidence',
+                             max_len=None, n_partitions=None, partition_bytes=256 * 2**20,
+                             chunksize=100_000, workdir=None):
+    """
+    Find frequent itemsets and association rules without loading the whole file
+
+    Uses the SON algorithm: the file is hash-partitioned on disk, each
+    partition is mined locally with Apriori at the same relative support,
+    and the union of local results is recounted against every partition in
+    a second pass. Any globally frequent itemset is locally frequent in at
+    least one partition, so the result is exact. Memory is bounded by the
+    size of one partition.
+
+    Args:
+        path: Path to a .csv or .parquet file with TransactionID and ProductID
+        min_support: Minimum support threshold
+        min_confidence: Minimum confidence threshold
+        metric: Column to sort the rules by
+        max_len: Maximum itemset length (None for no limit)
+        n_partitions: Number of partitions (derived from partition_bytes if None)
+        partition_bytes: Target on-disk size of one partition
+        chunksize: Rows per chunk read from the input
+        workdir: Directory for temporary partition files
+
+    Returns:
+        Tuple of (frequent_itemsets, rules DataFrame) in the same format as
+        find_product_bundles
+    """
+    if n_partitions is None:
+        n_partitions = max(ceil(os.path.getsize(path) / partition_bytes), 1)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        partitions = partition_transactions(path, directory, n_partitions, chunksize)
+
+        # Pass 1: locally frequent itemsets become global candidates
+        candidates = set()
+        n_transactions = 0
+        for partition in partitions:
+            basket_sets = encode_baskets(_read_partition(partition))
+            n_transactions += basket_sets.matrix.shape[0]
+            local_basket = pd.DataFrame.sparse.from_spmatrix(
+                basket_sets.matrix.astype(bool), columns=basket_sets.items
+            )
+            local_itemsets = apriori(local_basket, min_support=min_support, use_colnames=True, max_len=max_len)
+            candidates.update(local_itemsets['itemsets'])
+
+        # Pass 2: exact global support for every candidate
+        candidates = list(candidates)
+        counts = np.zeros(len(candidates), dtype=np.int64)
+        for partition in partitions:
+            counts += _count_itemsets(encode_baskets(_read_partition(partition)), candidates)
+
+    if n_transactions == 0:
+        return pd.DataFrame(columns=['support', 'itemsets']), pd.DataFrame()
+
+    support = counts / n_transactions
+    frequent = support >= min_support
+    frequent_itemsets = pd.DataFrame({
+        'support': support[frequent],
+        'itemsets': [itemset for itemset, keep in zip(candidates, frequent) if keep]
+    }).sort_values('support', ascending=False).reset_index(drop=True)
+
+    if len(frequent_itemsets) < 2:
+        return frequent_itemsets, pd.DataFrame()
+
+    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_confidence)
+    if rules.empty:
+        return frequent_itemsets, rules
+    return frequent_itemsets, format_rules(rules, metric)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mine product bundles from a large CSV/Parquet file")
+    parser.add_argument('path', help="Transaction file with TransactionID and ProductID columns")
+    parser.add_argument('--min-support', type=float, default=0.05)
+    parser.add_argument('--min-confidence', type=float, default=0.3)
+    parser.add_argument('--max-len', type=int, default=None)
+    parser.add_argument('--partitions', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Optional CSV path for the rules")
+    args = parser.parse_args()
+
+    _, rules = mine_bundles_out_of_core(
+        args.path, args.min_support, args.min_confidence,
+        max_len=args.max_len, n_partitions=args.partitions
+    )
+    if args.output:
+        rules.to_csv(args.output, index=False)
+    print(f"Found {len(rules)} rules")
+    if not rules.empty:
+        print(rules[['antecedents_str', 'consequents_str', 'confidence_pct', 'lift_score', 'support_pct']].head(20).to_string(index=False))
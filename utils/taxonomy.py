@@ -0,0 +1,271 @@
+"""Product taxonomy and multi-level (category, then product) bundle mining"""
+from dataclasses import dataclass
+from itertools import combinations
+from math import ceil
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import association_rules
+from scipy import sparse
+
+from utils.market_basket import BasketMatrix, join_level, format_rules
+
+TAXONOMY_COLUMNS = ['ProductID', 'Category']
+UNCATEGORIZED = 'Uncategorized'
+
+
+@dataclass
+class ProductTaxonomy:
+    """
+    Integer-coded product -> category mapping aligned with a BasketMatrix
+
+    Attributes:
+        categories: Index of category names (category codes are positions)
+        item_categories: Category code of every basket matrix column
+    """
+    categories: pd.Index
+    item_categories: np.ndarray
+
+    def category_baskets(self, baskets):
+        """
+        Roll a product basket matrix up to categories
+
+        One sparse product with the product x category indicator matrix
+        counts each basket's products per category; any count marks the
+        category as present.
+
+        Args:
+            baskets: BasketMatrix the taxonomy was built for
+
+        Returns:
+            BasketMatrix of transactions x categories
+        """
+        indicator = sparse.csr_matrix(
+            (np.ones(len(self.item_categories), dtype=np.int32),
+             (np.arange(len(self.item_categories)), self.item_categories)),
+            shape=(len(self.item_categories), len(self.categories))
+        )
+        matrix = (baskets.matrix @ indicator).tocsr()
+        matrix.data[:] = 1
+        return BasketMatrix(matrix, baskets.transaction_ids, self.categories)
+
+
+def read_category_mapping(file):
+    """
+    Read and validate a product -> category mapping
+
+    Args:
+        file: Path or file-like CSV with ProductID and Category columns
+
+    Returns:
+        DataFrame with ProductID and Category as strings, one row per product
+
+    Raises:
+        ValueError: If a column is missing or a product maps to several categories
+    """
+    mapping = pd.read_csv(file, dtype=str)
+    missing = [column for column in TAXONOMY_COLUMNS if column not in mapping.columns]
+    if missing:
+        raise ValueError(f"Missing required columns in category mapping: {', '.join(missing)}")
+
+    mapping = mapping[TAXONOMY_COLUMNS].dropna().drop_duplicates()
+    conflicting = mapping['ProductID'][mapping['ProductID'].duplicated()].unique()
+    if len(conflicting):
+        raise ValueError(
+            f"{len(conflicting)} products map to more than one category, e.g. {', '.join(conflicting[:3])}"
+        )
+    return mapping.reset_index(drop=True)
+
+
+def build_taxonomy(items, mapping):
+    """
+    Align a category mapping with basket matrix columns
+
+    Args:
+        items: Index of ProductIDs (BasketMatrix.items)
+        mapping: DataFrame with ProductID and Category
+
+    Returns:
+        ProductTaxonomy; products missing from the mapping fall under UNCATEGORIZED
+    """
+    lookup = pd.Series(mapping['Category'].to_numpy(), index=mapping['ProductID'].astype(str))
+    item_category = lookup.reindex(items.astype(str)).fillna(UNCATEGORIZED)
+    codes, categories = pd.factorize(item_category, sort=True)
+    return ProductTaxonomy(pd.Index(categories), codes.astype(np.int64))
+
+
+def _frequent_itemsets(matrix, columns, min_count, max_len, item_groups=None, frequent_group_sets=None):
+    """
+    Level-wise frequent itemset counting
+
+    Pairs are counted for all candidate columns at once with a sparse
+    M^T M product; larger itemsets intersect transaction-id lists of their
+    prefix and last item.
+
+    Args:
+        matrix: CSC basket matrix with sorted indices
+        columns: Candidate column positions (frequent single items)
+        min_count: Minimum number of baskets
+        max_len: Maximum itemset length (None for no limit)
+        item_groups: Optional group (category) code of every column
+        frequent_group_sets: Set of frozensets of group codes; itemsets whose
+            groups are not in it are pruned
+
+    Returns:
+        Tuple of (dict of column tuple -> basket count, number of candidates
+        counted, number of candidates pruned by group)
+    """
+    def item_tids(column):
+        return matrix.indices[matrix.indptr[column]:matrix.indptr[column + 1]]
+
+    # Intersections mark one list in a reusable flag buffer instead of sorting both
+    marks = np.zeros(matrix.shape[0], dtype=bool)
+
+    def intersect(left_tids, right_tids):
+        marks[left_tids] = True
+        common = right_tids[marks[right_tids]]
+        marks[left_tids] = False
+        return common
+
+    columns = np.sort(np.asarray(columns, dtype=np.int64))
+    counts = {(int(column),): len(item_tids(column)) for column in columns}
+    if len(columns) < 2 or (max_len is not None and max_len < 2):
+        return counts, 0, 0
+
+    sub = matrix[:, columns]
+    co_counts = (sub.T @ sub).tocoo()
+    upper = co_counts.row < co_counts.col
+    left, right, pair_counts = columns[co_counts.row[upper]], columns[co_counts.col[upper]], co_counts.data[upper]
+    counted, pruned = len(pair_counts), 0
+
+    if item_groups is not None:
+        # Frequent group pairs, plus frequent single groups for pairs within one group
+        n_groups = int(item_groups.max()) + 1
+        allowed = np.zeros((n_groups, n_groups), dtype=bool)
+        for group_set in frequent_group_sets:
+            codes = sorted(group_set)
+            if len(codes) == 1:
+                allowed[codes[0], codes[0]] = True
+            elif len(codes) == 2:
+                allowed[codes[0], codes[1]] = allowed[codes[1], codes[0]] = True
+        keep = allowed[item_groups[left], item_groups[right]]
+        pruned = int((~keep).sum())
+        counted -= pruned
+        left, right, pair_counts = left[keep], right[keep], pair_counts[keep]
+
+    frequent = pair_counts >= min_count
+    pairs = list(zip(left[frequent].tolist(), right[frequent].tolist()))
+    counts.update(zip(pairs, pair_counts[frequent].tolist()))
+    level = sorted(pairs)
+    # Pair lists are only built for pairs that prefix a larger candidate
+    tidsets = {}
+
+    size = 3
+    while level and (max_len is None or size <= max_len):
+        next_tidsets = {}
+        for candidate in join_level(level):
+            if not all(sub in counts for sub in combinations(candidate, size - 1)):
+                continue
+            if item_groups is not None and frozenset(item_groups[list(candidate)].tolist()) not in frequent_group_sets:
+                pruned += 1
+                continue
+            counted += 1
+            prefix = candidate[:-1]
+            if prefix not in tidsets:
+                tidsets[prefix] = intersect(item_tids(prefix[0]), item_tids(prefix[1]))
+            tids = intersect(tidsets[prefix], item_tids(candidate[-1]))
+            if len(tids) >= min_count:
+                counts[candidate] = len(tids)
+                next_tidsets[candidate] = tids
+        level = sorted(next_tidsets)
+        tidsets = next_tidsets
+        size += 1
+    return counts, counted, pruned
+
+
+def _itemsets_frame(counts, labels, n_transactions):
+    labels = np.asarray(labels, dtype=object)
+    return pd.DataFrame({
+        'support': [count / n_transactions for count in counts.values()],
+        'itemsets': [frozenset(labels[list(itemset)]) for itemset in counts]
+    })
+
+
+def _rules(frequent_itemsets, min_confidence, metric):
+    if len(frequent_itemsets) < 2 or frequent_itemsets['itemsets'].map(len).max() < 2:
+        return pd.DataFrame()
+    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_confidence)
+    return format_rules(rules, metric) if not rules.empty else rules
+
+
+def mine_hierarchical_bundles(baskets, taxonomy, min_support=0.05, min_confidence=0.3, metric='confidence',
+                              max_len=None, category_min_support=None, return_stats=False):
+    """
+    Mine category-level rules, then product rules only inside frequent category combinations
+
+    Every basket containing a set of products also contains their
+    categories, so a product itemset can only be frequent if its set of
+    categories is. Products of infrequent categories are never considered
+    and product candidates whose category set is not frequent are pruned.
+    With category_min_support equal to min_support the product result is
+    identical to flat mining; a higher category threshold restricts product
+    mining to the strongest category combinations (reduced support per level).
+
+    Args:
+        baskets: BasketMatrix of products
+        taxonomy: ProductTaxonomy built for baskets.items
+        min_support: Minimum support threshold for product itemsets
+        min_confidence: Minimum confidence threshold
+        metric: Column to sort the rules by
+        max_len: Maximum itemset length (None for no limit)
+        category_min_support: Minimum support for category itemsets (defaults to min_support)
+        return_stats: Also return candidate counts for both levels
+
+    Returns:
+        Tuple of (category_rules, frequent_itemsets, rules) with product-level
+        frequent_itemsets and rules in the find_product_bundles format, plus
+        a stats dictionary if return_stats
+    """
+    n_transactions = baskets.matrix.shape[0]
+    min_count = max(ceil(min_support * n_transactions), 1)
+    if category_min_support is None:
+        category_min_support = min_support
+    category_min_count = max(ceil(max(category_min_support, min_support) * n_transactions), 1)
+
+    category_matrix = taxonomy.category_baskets(baskets).matrix.tocsc()
+    category_matrix.sort_indices()
+    category_counts = np.diff(category_matrix.indptr)
+    category_itemsets, category_counted, _ = _frequent_itemsets(
+        category_matrix, np.flatnonzero(category_counts >= category_min_count), category_min_count, max_len
+    )
+
+    product_matrix = baskets.matrix.tocsc()
+    product_matrix.sort_indices()
+    product_counts = np.diff(product_matrix.indptr)
+    frequent_categories = [itemset[0] for itemset in category_itemsets if len(itemset) == 1]
+    columns = np.flatnonzero(
+        (product_counts >= min_count) & np.isin(taxonomy.item_categories, frequent_categories)
+    )
+
+    product_itemsets, product_counted, pruned = _frequent_itemsets(
+        product_matrix, columns, min_count, max_len,
+        item_groups=taxonomy.item_categories,
+        frequent_group_sets={frozenset(itemset) for itemset in category_itemsets}
+    )
+
+    category_frequent = _itemsets_frame(category_itemsets, taxonomy.categories, n_transactions)
+    frequent_itemsets = _itemsets_frame(product_itemsets, baskets.items, n_transactions)
+    category_rules = _rules(category_frequent, min_confidence, metric)
+    rules = _rules(frequent_itemsets, min_confidence, metric)
+
+    if not return_stats:
+        return category_rules, frequent_itemsets, rules
+    stats = {
+        'frequent_categories': len(frequent_categories),
+        'category_itemsets': len(category_itemsets),
+        'category_candidates_counted': category_counted,
+        'products_considered': len(columns),
+        'product_candidates_pruned': pruned,
+        'product_candidates_counted': product_counted
+    }
+    return category_rules, frequent_itemsets, rules, stats
@@ -0,0 +1,221 @@
+"""Windowed market basket analysis over weekly or monthly periods"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.market_basket import encode_baskets, format_rules
+
+WINDOW_FREQUENCIES = {
+    'Weekly': 'W',
+    'Monthly': 'M'
+}
+
+
+@dataclass
+class WindowedBasketCounts:
+    """
+    Per-window item and item-pair counts for range and trend queries
+
+    Counts are kept per tumbling window together with running totals, so the
+    counts for any contiguous range of windows are a single subtraction.
+    Pair counts cover rules with one product on each side.
+
+    Attributes:
+        windows: PeriodIndex of consecutive windows
+        items: Index of ProductIDs
+        pairs: Array of shape (n_pairs, 2) with item codes of tracked pairs
+        transaction_counts: Transactions per window
+        item_counts: Array (n_windows, n_items) of baskets containing each item
+        pair_counts: Array (n_windows, n_pairs) of baskets containing each pair
+    """
+    windows: pd.PeriodIndex
+    items: pd.Index
+    pairs: np.ndarray
+    transaction_counts: np.ndarray
+    item_counts: np.ndarray
+    pair_counts: np.ndarray
+    _cumulative: tuple = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._cumulative = tuple(
+            np.concatenate([np.zeros((1,) + counts.shape[1:], dtype=np.int64), np.cumsum(counts, axis=0)])
+            for counts in (self.transaction_counts, self.item_counts, self.pair_counts)
+        )
+
+    def window_index(self, date):
+        """Position of the window containing a date, clipped to the covered range"""
+        period = pd.Timestamp(date).to_period(self.windows.freq)
+        position = period.ordinal - self.windows[0].ordinal
+        return int(np.clip(position, 0, len(self.windows) - 1))
+
+    def range_counts(self, start=None, end=None):
+        """
+        Sum the counts over all windows between two dates (inclusive)
+
+        Args:
+            start: First date of the range (None for the first window)
+            end: Last date of the range (None for the last window)
+
+        Returns:
+            Tuple of (n_transactions, item_counts, pair_counts)
+        """
+        first = 0 if start is None else self.window_index(start)
+        last = len(self.windows) - 1 if end is None else self.window_index(end)
+        return tuple(cumulative[last + 1] - cumulative[first] for cumulative in self._cumulative)
+
+    def rolling_counts(self, span=1):
+        """
+        Counts summed over a rolling span of windows ending at each window
+
+        Args:
+            span: Number of windows per rolling sum (1 for tumbling windows)
+
+        Returns:
+            Tuple of (transaction_counts, item_counts, pair_counts), one row per window
+        """
+        ends = np.arange(1, len(self.windows) + 1)
+        starts = np.maximum(ends - span, 0)
+        return tuple(cumulative[ends] - cumulative[starts] for cumulative in self._cumulative)
+
+    def rules(self, start=None, end=None, min_support=0.05, min_confidence=0.3, metric='confidence'):
+        """
+        Single-product association rules for a date range
+
+        Args:
+            start: First date of the range (None for the first window)
+            end: Last date of the range (None for the last window)
+            min_support: Minimum support threshold
+            min_confidence: Minimum confidence threshold
+            metric: Column to sort the rules by
+
+        Returns:
+            Rules DataFrame in the same format as find_product_bundles
+        """
+        n_transactions, item_counts, pair_counts = self.range_counts(start, end)
+        if n_transactions == 0 or len(self.pairs) == 0:
+            return pd.DataFrame()
+
+        # Each pair yields a rule in both directions
+        antecedents = np.concatenate([self.pairs[:, 0], self.pairs[:, 1]])
+        consequents = np.concatenate([self.pairs[:, 1], self.pairs[:, 0]])
+        support = np.tile(pair_counts, 2) / n_transactions
+        antecedent_support = item_counts[antecedents] / n_transactions
+        consequent_support = item_counts[consequents] / n_transactions
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence = support / antecedent_support
+        keep = (support >= min_support) & (support > 0) & (confidence >= min_confidence)
+        if not keep.any():
+            return pd.DataFrame()
+
+        rules = pd.DataFrame({
+            'antecedents': [frozenset([item]) for item in self.items[antecedents[keep]]],
+            'consequents': [frozenset([item]) for item in self.items[consequents[keep]]],
+            'antecedent support': antecedent_support[keep],
+            'consequent support': consequent_support[keep],
+            'support': support[keep],
+            'confidence': confidence[keep],
+            'lift': confidence[keep] / consequent_support[keep],
+            'leverage': support[keep] - antecedent_support[keep] * consequent_support[keep]
+        })
+        return format_rules(rules, metric).reset_index(drop=True)
+
+    def rule_trends(self, rules, span=1):
+        """
+        Support, confidence and lift of rules in every window
+
+        Args:
+            rules: Rules DataFrame; only rules with one product on each side are tracked
+            span: Number of windows per rolling sum (1 for tumbling windows)
+
+        Returns:
+            Long DataFrame with Window, Rule, Support, Confidence, Lift columns
+        """
+        transaction_counts, item_counts, pair_counts = self.rolling_counts(span)
+        item_position = pd.Series(np.arange(len(self.items)), index=self.items)
+        pair_position = {(int(i), int(j)): position for position, (i, j) in enumerate(self.pairs)}
+
+        trends = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for _, rule in rules.iterrows():
+                if len(rule['antecedents']) != 1 or len(rule['consequents']) != 1:
+                    continue
+                antecedent = item_position[next(iter(rule['antecedents']))]
+                consequent = item_position[next(iter(rule['consequents']))]
+                position = pair_position.get((min(antecedent, consequent), max(antecedent, consequent)))
+                if position is None:
+                    continue
+
+                support = pair_counts[:, position] / transaction_counts
+                confidence = pair_counts[:, position] / item_counts[:, antecedent]
+                lift = confidence / (item_counts[:, consequent] / transaction_counts)
+                trends.append(pd.DataFrame({
+                    'Window': self.windows.to_timestamp(),
+                    'Rule': f"{rule['antecedents_str']} → {rule['consequents_str']}",
+                    'Support': support,
+                    'Confidence': confidence,
+                    'Lift': lift
+                }))
+
+        if not trends:
+            return pd.DataFrame(columns=['Window', 'Rule', 'Support', 'Confidence', 'Lift'])
+        return pd.concat(trends, ignore_index=True)
+
+
+def build_window_counts(df, frequency='Weekly', min_pair_count=2):
+    """
+    Count items and item pairs once per window of the transaction history
+
+    Args:
+        df: DataFrame with columns Date, TransactionID, ProductID
+        frequency: Window length, 'Weekly' or 'Monthly'
+        min_pair_count: Pairs co-occurring in fewer baskets over the whole
+            history are not tracked
+
+    Returns:
+        WindowedBasketCounts
+    """
+    baskets = encode_baskets(df, with_values=False)
+    matrix = baskets.matrix
+
+    # A transaction belongs to the window of its first line
+    txn_codes = baskets.transaction_ids.get_indexer(df['TransactionID'])
+    valid = txn_codes >= 0
+    txn_dates = pd.Series(df['Date'].to_numpy()[valid]).groupby(txn_codes[valid]).min()
+    periods = pd.PeriodIndex(txn_dates.dt.to_period(WINDOW_FREQUENCIES[frequency]))
+    windows = pd.period_range(periods.min(), periods.max(), freq=periods.freq)
+    window_codes = periods.asi8 - windows[0].ordinal
+
+    # Pairs worth tracking come from the global co-occurrence matrix
+    co_occurrence = sparse.triu(matrix.T @ matrix, k=1).tocoo()
+    tracked = co_occurrence.data >= min_pair_count
+    pairs = np.column_stack([co_occurrence.row[tracked], co_occurrence.col[tracked]]).astype(np.int64)
+
+    order = np.argsort(window_codes, kind='stable')
+    sorted_matrix = matrix[order]
+    bounds = np.searchsorted(window_codes[order], np.arange(len(windows) + 1))
+
+    n_windows = len(windows)
+    transaction_counts = np.diff(bounds)
+    item_counts = np.zeros((n_windows, matrix.shape[1]), dtype=np.int64)
+    pair_counts = np.zeros((n_windows, len(pairs)), dtype=np.int64)
+
+    for window in range(n_windows):
+        window_matrix = sorted_matrix[bounds[window]:bounds[window + 1]]
+        if window_matrix.shape[0] == 0:
+            continue
+        item_counts[window] = np.asarray(window_matrix.sum(axis=0)).ravel()
+        if len(pairs):
+            window_co_occurrence = (window_matrix.T @ window_matrix).tocsr()
+            pair_counts[window] = np.asarray(window_co_occurrence[pairs[:, 0], pairs[:, 1]]).ravel()
+
+    return WindowedBasketCounts(
+        windows=windows,
+        items=baskets.items,
+        pairs=pairs,
+        transaction_counts=transaction_counts,
+        item_counts=item_counts,
+        pair_counts=pair_counts
+    )
@@ -0,0 +1,360 @@
+"""Vectorized, chunked validation of transaction files"""
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from utils.columnar import PYARROW_AVAILABLE, to_dtype_backend
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.csv
+
+REQUIRED_COLUMNS = ['Date', 'UserID', 'ProductID', 'Amount', 'TransactionID']
+
+VALIDATION_MODES = ['strict', 'repair']
+
+# Read as text, since chunks inferred separately can disagree on their type
+ID_COLUMNS = ['UserID', 'ProductID', 'TransactionID']
+
+# Rules in report order, with what each one flags
+VALIDATION_RULES = {
+    'missing_columns': "Required columns absent from the header",
+    'unparsable_dates': "Date values that are not dates",
+    'unparsable_amounts': "Amount values that are not numbers",
+    'null_values': "Lines with an empty required field",
+    'negative_amounts': "Lines with a negative Amount",
+    'duplicate_lines': "Lines repeating an earlier line exactly",
+    'transaction_multiple_users': "Lines of TransactionIDs used by more than one UserID",
+    'transaction_multiple_dates': "Lines of TransactionIDs spread over more than one day"
+}
+
+# Offending lines kept per rule for the report
+SAMPLE_ROWS = 5
+
+# Lines per chunk read from the input
+CHUNK_ROWS = 250_000
+
+
+@dataclass
+class ValidationIssue:
+    """
+    Lines breaking one validation rule
+
+    Attributes:
+        rule: Key of VALIDATION_RULES
+        count: Number of offending lines (missing columns: number of columns)
+        sample: DataFrame of up to SAMPLE_ROWS offending lines as read, with
+            their CSV line number as index (None for missing columns)
+        detail: Extra context, e.g. the missing columns or transaction count
+    """
+    rule: str
+    count: int
+    sample: pd.DataFrame = None
+    detail: str = ''
+
+    @property
+    def description(self):
+        return VALIDATION_RULES[self.rule]
+
+
+@dataclass
+class ValidationReport:
+    """
+    Outcome of validating a transaction file
+
+    Attributes:
+        mode: 'strict' or 'repair'
+        n_rows: Lines read
+        n_dropped: Lines removed in repair mode
+        issues: ValidationIssue per failing rule, in VALIDATION_RULES order
+        seconds: Time spent reading and validating the file
+        error: Why the file was rejected, or None when the data can be used
+    """
+    mode: str
+    n_rows: int = 0
+    n_dropped: int = 0
+    issues: list = field(default_factory=list)
+    seconds: float = 0.0
+    error: str = None
+
+    def summary(self):
+        """DataFrame with one row per failing rule"""
+        return pd.DataFrame(
+            [(issue.rule, issue.count, issue.description, issue.detail) for issue in self.issues],
+            columns=['Rule', 'Count', 'Description', 'Detail']
+        )
+
+
+def iter_csv_chunks(file, dtype_backend='numpy', chunksize=CHUNK_ROWS):
+    """
+    Read a transaction CSV in chunks without parsing Date
+
+    In Arrow mode the file is streamed by pyarrow's CSV reader with Date and
+    Amount kept as strings, so one bad value cannot abort the read; they are
+    parsed per chunk during validation. ID_COLUMNS are read as strings in
+    both modes, as types inferred from the first block would reject IDs that
+    turn alphanumeric further down. At least one (possibly empty) chunk is
+    yielded so the header is always seen.
+
+    Args:
+        file: Path or file-like CSV
+        dtype_backend: 'numpy' or 'pyarrow'
+        chunksize: Lines per chunk (Arrow mode reads blocks of about this size)
+
+    Yields:
+        DataFrame chunks
+    """
+    if dtype_backend == 'pyarrow':
+        if not PYARROW_AVAILABLE:
+            raise ValueError("The pyarrow backend requires the pyarrow package (pip install pyarrow)")
+        reader = pa.csv.open_csv(
+            file,
+            read_options=pa.csv.ReadOptions(block_size=max(chunksize * 64, 1 << 20)),
+            convert_options=pa.csv.ConvertOptions(
+                column_types={column: pa.string() for column in ['Date', 'Amount'] + ID_COLUMNS},
+                strings_can_be_null=True
+            )
+        )
+        empty = True
+        for batch in reader:
+            empty = False
+            yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+        if empty:
+            yield pd.DataFrame(columns=reader.schema.names)
+    else:
+        yield from pd.read_csv(file, chunksize=chunksize, dtype={column: str for column in ID_COLUMNS})
+
+
+def _restore_numeric_ids(df):
+    """Cast ID_COLUMNS holding only integers back to int64, as a whole-file read would infer them"""
+    for column in ID_COLUMNS:
+        if column in df:
+            dtype = 'int64[pyarrow]' if isinstance(df[column].dtype, pd.ArrowDtype) else 'int64'
+            try:
+                df[column] = df[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def _guess_date_format(values):
+    """strftime format of the first recognizable value among the first non-null ones, or None"""
+    for value in values.dropna().head(SAMPLE_ROWS * 20):
+        date_format = guess_datetime_format(str(value))
+        if date_format is not None:
+            # ISO dates may mix precisions (dates, times), as Arrow's cast allows
+            return 'ISO8601' if date_format.startswith('%Y-%m-%d') else date_format
+    return None
+
+
+def _parse_dates(values, date_format=None):
+    """Dates of a chunk column; unparsable values become NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if isinstance(values.dtype, pd.ArrowDtype):
+        try:
+            # ISO dates cast in Arrow without creating Python strings
+            timestamps = pa.compute.cast(pa.array(values), pa.timestamp('us'))
+            return pd.Series(timestamps.to_numpy(zero_copy_only=False), index=values.index)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            values = values.astype(object)
+    return pd.to_datetime(values, format=date_format, errors='coerce')
+
+
+def _parse_amounts(values):
+    """Amounts of a chunk column; unparsable values become NaN"""
+    if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.ArrowDtype):
+        return values
+    if isinstance(values.dtype, pd.ArrowDtype):
+        array = pa.array(values)
+        for arrow_type in (pa.int64(), pa.float64()):
+            try:
+                return pd.Series(pa.compute.cast(array, arrow_type).to_numpy(zero_copy_only=False), index=values.index)
+            except pa.ArrowInvalid:
+                continue
+        values = values.astype(object)
+    return pd.to_numeric(values, errors='coerce')
+
+
+class _Findings:
+    """Counts, samples and repair mask accumulated over chunks"""
+
+    def __init__(self):
+        self.counts = {}
+        self.samples = {}
+        self.drop = []
+
+    def add(self, rule, mask, lines):
+        """Record the lines of a chunk where mask holds"""
+        count = int(mask.sum())
+        if not count:
+            return
+        self.counts[rule] = self.counts.get(rule, 0) + count
+        samples = self.samples.setdefault(rule, [])
+        have = sum(len(sample) for sample in samples)
+        if have < SAMPLE_ROWS:
+            samples.append(lines[mask].head(SAMPLE_ROWS - have))
+
+    def sample(self, rule):
+        sample = pd.concat(self.samples[rule])
+        sample.index = sample.index + 2  # CSV line number: 1-based, after the header
+        sample.index.name = 'Line'
+        return sample
+
+
+def validate_transactions(chunks, mode='repair'):
+    """
+    Validate and parse transaction chunks in one pass, collecting every issue
+
+    Each chunk's Date and Amount are parsed once, vectorized; parsing is the
+    check for unparsable values, and nulls and negative amounts are flagged
+    in the same pass. Duplicate lines and TransactionIDs spanning several
+    customers or days are found on the parsed frame afterwards, since they
+    can cross chunks. Every rule is evaluated; nothing stops at the first
+    failure.
+
+    In strict mode any issue rejects the file. In repair mode the offending
+    lines are dropped (whole transactions for the TransactionID rules) and
+    the file is rejected only if required columns are missing or no line is
+    left.
+
+    Args:
+        chunks: Iterable of DataFrame chunks, e.g. from iter_csv_chunks
+        mode: 'strict' or 'repair'
+
+    Returns:
+        tuple: (DataFrame with parsed Date and Amount and a fresh index, or
+        None when rejected, ValidationReport)
+
+    Raises:
+        ValueError: If mode is unknown
+    """
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode '{mode}'. Choose from {VALIDATION_MODES}")
+    started = time.perf_counter()
+    report = ValidationReport(mode)
+    findings = _Findings()
+    parsed, offset, missing_columns, date_format = [], 0, None, None
+
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        if missing_columns is None:
+            missing_columns = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+        present = [column for column in REQUIRED_COLUMNS if column in chunk.columns]
+
+        nulls = chunk[present].isna()
+        drop = nulls.any(axis=1)
+        findings.add('null_values', drop, chunk)
+        parsed_columns = {}
+        if 'Date' in chunk:
+            # One format for the whole file, as a single to_datetime call would infer
+            date_format = date_format or _guess_date_format(chunk['Date'])
+            parsed_columns['Date'] = dates = _parse_dates(chunk['Date'], date_format)
+            bad_dates = dates.isna() & ~nulls['Date']
+            findings.add('unparsable_dates', bad_dates, chunk)
+            drop |= bad_dates
+        if 'Amount' in chunk:
+            parsed_columns['Amount'] = amounts = _parse_amounts(chunk['Amount'])
+            bad_amounts = amounts.isna() & ~nulls['Amount']
+            negative = amounts < 0
+            findings.add('unparsable_amounts', bad_amounts, chunk)
+            findings.add('negative_amounts', negative, chunk)
+            drop |= bad_amounts | negative
+        parsed.append(chunk.assign(**parsed_columns))
+        findings.drop.append(drop)
+
+    df = pd.concat(parsed) if len(parsed) > 1 else parsed[0]
+    drop = pd.concat(findings.drop) if len(findings.drop) > 1 else findings.drop[0]
+    report.n_rows = len(df)
+
+    duplicates = df.duplicated()
+    findings.add('duplicate_lines', duplicates, df)
+    drop |= duplicates
+
+    details = {}
+    if 'TransactionID' in df:
+        for rule, column in (('transaction_multiple_users', 'UserID'), ('transaction_multiple_dates', 'Date')):
+            if column not in df:
+                continue
+            values = df[column].dt.normalize() if column == 'Date' else df[column]
+            keyed = df['TransactionID'].notna() & values.notna()
+            distinct = values[keyed].groupby(df.loc[keyed, 'TransactionID'], sort=False).nunique()
+            spanning = distinct.index[distinct > 1]
+            if len(spanning):
+                lines = df['TransactionID'].isin(spanning)
+                findings.add(rule, lines, df)
+                details[rule] = f"{len(spanning):,} TransactionID(s)"
+                drop |= lines
+
+    if missing_columns:
+        report.issues.append(ValidationIssue('missing_columns', len(missing_columns), detail=', '.join(missing_columns)))
+    report.issues += [
+        ValidationIssue(rule, findings.counts[rule], findings.sample(rule), details.get(rule, ''))
+        for rule in VALIDATION_RULES if rule in findings.counts
+    ]
+
+    if missing_columns:
+        report.error = f"Missing required columns: {', '.join(missing_columns)}"
+    elif report.n_rows == 0:
+        report.error = "CSV file is empty. Please upload a file with transaction data."
+    elif mode == 'strict' and report.issues:
+        report.error = f"{len(report.issues)} validation rule(s) failed on {int(drop.sum()):,} of {report.n_rows:,} lines"
+    elif drop.all():
+        report.error = "No valid lines are left after repair"
+
+    if report.error is None and drop.any():
+        report.n_dropped = int(drop.sum())
+        df = df[~drop.to_numpy()]
+    report.seconds = time.perf_counter() - started
+    if report.error is not None:
+        return None, report
+    return df.reset_index(drop=True), report
+
+
+def validate_csv(file, dtype_backend='numpy', mode='repair', chunksize=CHUNK_ROWS):
+    """
+    Read and validate a transaction CSV in one chunked pass
+
+    Args:
+        file: Path or file-like CSV
+        dtype_backend: 'numpy' or 'pyarrow'
+        mode: 'strict' or 'repair'
+        chunksize: Lines per chunk
+
+    Returns:
+        tuple: (DataFrame in the given dtype backend, or None when rejected,
+        ValidationReport)
+    """
+    df, report = validate_transactions(iter_csv_chunks(file, dtype_backend, chunksize), mode)
+    if df is not None:
+        started = time.perf_counter()
+        df = _restore_numeric_ids(df)
+        if dtype_backend == 'pyarrow':
+            df = to_dtype_backend(df, dtype_backend)
+        report.seconds += time.perf_counter() - started
+    return df, report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate a transaction CSV and list every issue")
+    parser.add_argument('path', help="Transaction CSV")
+    parser.add_argument('--mode', choices=VALIDATION_MODES, default='strict')
+    parser.add_argument('--backend', choices=['numpy', 'pyarrow'], default='numpy')
+    args = parser.parse_args()
+
+    _, report = validate_csv(args.path, args.backend, args.mode)
+    print(f"{report.n_rows:,} lines validated in {report.seconds:.2f}s ({report.mode} mode)")
+    for issue in report.issues:
+        print(f"\n{issue.rule}: {issue.count:,} ({issue.description}){' - ' + issue.detail if issue.detail else ''}")
+        if issue.sample is not None:
+            print(issue.sample.to_string())
+    if report.n_dropped:
+        print(f"\n{report.n_dropped:,} lines dropped")
+    if report.error:
+        print(f"\nRejected: {report.error}")
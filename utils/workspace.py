@@ -0,0 +1,349 @@
+"""Persistent on-disk workspace of transaction datasets and derived artifacts (DuckDB or SQLite)"""
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from utils.columnar import PYARROW_AVAILABLE, to_dtype_backend
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+
+WORKSPACE_BACKENDS = ['duckdb', 'sqlite']
+
+# File extensions opened with SQLite when no backend is given
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+
+# Transaction columns indexed in every stored dataset
+INDEXED_COLUMNS = ['UserID', 'ProductID', 'Date']
+
+CATALOG_TABLES = {
+    'datasets': """
+        CREATE TABLE IF NOT EXISTS datasets (
+            dataset_id VARCHAR PRIMARY KEY,
+            name VARCHAR,
+            n_rows BIGINT,
+            table_name VARCHAR,
+            columns VARCHAR,
+            saved_at TIMESTAMP
+        )
+    """,
+    'artifacts': """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            dataset_id VARCHAR,
+            name VARCHAR,
+            params VARCHAR,
+            n_rows BIGINT,
+            table_name VARCHAR,
+            columns VARCHAR,
+            saved_at TIMESTAMP,
+            PRIMARY KEY (dataset_id, name, params)
+        )
+    """
+}
+
+
+def _column_kind(series):
+    """How a column is stored: 'itemset' and 'json' values as JSON text, 'datetime' and 'bool' restored on load"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if series.dtype == object:
+        values = series.dropna()
+        if len(values) and isinstance(values.iloc[0], (frozenset, set)):
+            return 'itemset'
+        if len(values) and isinstance(values.iloc[0], (dict, list, tuple)):
+            return 'json'
+    return 'value'
+
+
+def _json_default(value):
+    """NumPy scalars as Python numbers, anything else as its string"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _encode(frame):
+    """(Frame ready to write with itemsets and nested values as JSON text, column kinds)"""
+    frame = to_dtype_backend(frame, 'numpy')
+    kinds = {column: _column_kind(frame[column]) for column in frame.columns}
+    encoded = frame.copy()
+    for column, kind in kinds.items():
+        if kind == 'itemset':
+            encoded[column] = [json.dumps(sorted(value, key=str), default=_json_default) for value in frame[column]]
+        elif kind == 'json':
+            encoded[column] = [json.dumps(value, default=_json_default) for value in frame[column]]
+    return encoded, kinds
+
+
+def _decode(frame, kinds):
+    """Inverse of _encode"""
+    for column, kind in kinds.items():
+        if kind == 'itemset':
+            frame[column] = [frozenset(json.loads(value)) for value in frame[column]]
+        elif kind == 'json':
+            frame[column] = [json.loads(value) for value in frame[column]]
+        elif kind == 'datetime' and not pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = pd.to_datetime(frame[column])
+        elif kind == 'bool':
+            frame[column] = frame[column].astype(bool)
+    return frame[list(kinds)]
+
+
+def _now():
+    """Current time as text, which both backends cast to TIMESTAMP"""
+    return datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def _params_key(params):
+    """Canonical JSON of artifact parameters"""
+    return json.dumps(params or {}, sort_keys=True, default=_json_default)
+
+
+class Workspace:
+    """
+    Local database of ingested transaction datasets and their derived tables
+
+    Each dataset is stored once under its content fingerprint (see
+    utils.profiling.dataset_fingerprint) in its own table, indexed on UserID,
+    ProductID and Date. Derived artifacts (customer metrics, rules, segment
+    insights, ...) are stored per dataset, name and parameters. Catalog
+    tables list both:
+
+        datasets   (dataset_id, name, n_rows, table_name, columns, saved_at)
+        artifacts  (dataset_id, name, params, n_rows, table_name, columns, saved_at)
+
+    so stored tables can be queried across runs with query() or any SQL
+    client. Calls are serialized with a lock, so one workspace can be shared
+    by every session of a Streamlit server.
+
+    Args:
+        path: Database file (defaults to workspace.duckdb or workspace.sqlite)
+        backend: 'duckdb', 'sqlite', or None for SQLite when path ends with
+            one of SQLITE_EXTENSIONS and otherwise DuckDB when it is installed
+
+    Raises:
+        ValueError: If backend is unknown or DuckDB is requested but not installed
+    """
+
+    def __init__(self, path=None, backend=None):
+        if backend is None:
+            sqlite_file = path is not None and path.endswith(SQLITE_EXTENSIONS)
+            backend = 'duckdb' if DUCKDB_AVAILABLE and not sqlite_file else 'sqlite'
+        if backend not in WORKSPACE_BACKENDS:
+            raise ValueError(f"Unknown workspace backend '{backend}'. Choose from {WORKSPACE_BACKENDS}")
+        if backend == 'duckdb' and not DUCKDB_AVAILABLE:
+            raise ValueError("The DuckDB workspace requires the duckdb package (pip install duckdb)")
+
+        self.backend = backend
+        self.path = path or f'workspace.{backend}'
+        self._lock = threading.Lock()
+        if backend == 'duckdb':
+            self._connection = duckdb.connect(self.path)
+        else:
+            # Streamlit sessions run in different threads; the lock serializes access
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            for statement in CATALOG_TABLES.values():
+                self._connection.execute(statement)
+            self._commit()
+
+    def _commit(self):
+        if self.backend == 'sqlite':
+            self._connection.commit()
+
+    def _read(self, sql, params=()):
+        """Run a query and return a DataFrame (caller holds the lock)"""
+        if self.backend == 'duckdb':
+            return self._connection.execute(sql, list(params)).df()
+        return pd.read_sql_query(sql, self._connection, params=list(params))
+
+    def _write_table(self, table_name, frame):
+        """Replace table_name with the rows of frame (caller holds the lock)"""
+        self._connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        if self.backend == 'duckdb':
+            # DuckDB scans Arrow tables natively but converts pandas string columns value by value
+            source = pa.Table.from_pandas(frame, preserve_index=False) if PYARROW_AVAILABLE else frame
+            self._connection.register('_incoming', source)
+            try:
+                self._connection.execute(f'CREATE TABLE "{table_name}" AS SELECT * FROM _incoming')
+            finally:
+                self._connection.unregister('_incoming')
+        else:
+            frame.to_sql(table_name, self._connection, index=False)
+
+    def query(self, sql, params=()):
+        """
+        Run a read query against the workspace
+
+        Args:
+            sql: SQL text; table names come from the datasets and artifacts catalogs
+            params: Positional query parameters
+
+        Returns:
+            DataFrame
+        """
+        with self._lock:
+            return self._read(sql, params)
+
+    def list_datasets(self):
+        """Stored datasets, most recently saved first"""
+        return self.query("SELECT dataset_id, name, n_rows, saved_at FROM datasets ORDER BY saved_at DESC")
+
+    def list_artifacts(self, dataset_id=None):
+        """Stored artifacts, of one dataset or of all"""
+        sql = "SELECT dataset_id, name, params, n_rows, table_name, saved_at FROM artifacts"
+        if dataset_id is None:
+            return self.query(sql + " ORDER BY saved_at DESC")
+        return self.query(sql + " WHERE dataset_id = ? ORDER BY saved_at DESC", [dataset_id])
+
+    def has_dataset(self, dataset_id):
+        """Whether a dataset with this fingerprint is stored"""
+        return len(self.query("SELECT 1 FROM datasets WHERE dataset_id = ?", [dataset_id])) > 0
+
+    def save_dataset(self, df, dataset_id, name):
+        """
+        Store a transaction dataset (a no-op when it is already stored)
+
+        Args:
+            df: Transaction DataFrame
+            dataset_id: Fingerprint of df (DatasetProfile.fingerprint)
+            name: Display name, e.g. the uploaded file name
+
+        Returns:
+            True if the dataset was written, False if it was already stored
+        """
+        table_name = f'transactions_{dataset_id}'
+        frame, kinds = _encode(df)
+        with self._lock:
+            if len(self._read("SELECT 1 FROM datasets WHERE dataset_id = ?", [dataset_id])):
+                return False
+            self._write_table(table_name, frame)
+            for column in INDEXED_COLUMNS:
+                if column in frame:
+                    self._connection.execute(
+                        f'CREATE INDEX "idx_{table_name}_{column}" ON "{table_name}" ("{column}")'
+                    )
+            self._connection.execute(
+                "INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?)",
+                [dataset_id, name, len(frame), table_name, json.dumps(kinds), _now()]
+            )
+            self._commit()
+        return True
+
+    def load_dataset(self, dataset_id):
+        """
+        Read a stored transaction dataset
+
+        Args:
+            dataset_id: Dataset fingerprint
+
+        Returns:
+            DataFrame with the stored columns and dtypes
+
+        Raises:
+            KeyError: If the dataset is not stored
+        """
+        with self._lock:
+            catalog = self._read("SELECT table_name, columns FROM datasets WHERE dataset_id = ?", [dataset_id])
+            if catalog.empty:
+                raise KeyError(f"Dataset '{dataset_id}' is not in the workspace")
+            frame = self._read(f'SELECT * FROM "{catalog.at[0, "table_name"]}"')
+        return _decode(frame, json.loads(catalog.at[0, 'columns']))
+
+    def has_artifact(self, dataset_id, name, params=None):
+        """Whether an artifact with this dataset, name and parameters is stored"""
+        return len(self.query(
+            "SELECT 1 FROM artifacts WHERE dataset_id = ? AND name = ? AND params = ?",
+            [dataset_id, name, _params_key(params)]
+        )) > 0
+
+    def save_artifact(self, dataset_id, name, frame, params=None):
+        """
+        Store a derived table, replacing any with the same dataset, name and parameters
+
+        Args:
+            dataset_id: Fingerprint of the dataset it was derived from
+            name: Artifact name, e.g. 'customer_metrics' or 'rules'
+            frame: DataFrame (frozenset columns such as rule antecedents and
+                dict/list columns are stored as JSON text)
+            params: Dictionary of the parameters it was computed with
+                (an empty frame gets a catalog row without a table)
+        """
+        params_key = _params_key(params)
+        digest = hashlib.sha256(params_key.encode('utf-8')).hexdigest()[:8]
+        table_name = f"{re.sub(r'[^0-9a-zA-Z_]', '_', name)}_{dataset_id}_{digest}"
+        frame, kinds = _encode(frame)
+        with self._lock:
+            if frame.empty:
+                # Neither backend creates a table from zero rows or zero columns
+                self._connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                table_name = None
+            else:
+                self._write_table(table_name, frame)
+            self._connection.execute(
+                "DELETE FROM artifacts WHERE dataset_id = ? AND name = ? AND params = ?", [dataset_id, name, params_key]
+            )
+            self._connection.execute(
+                "INSERT INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [dataset_id, name, params_key, len(frame), table_name, json.dumps(kinds), _now()]
+            )
+            self._commit()
+
+    def load_artifact(self, dataset_id, name, params=None):
+        """
+        Read a stored artifact
+
+        Args:
+            dataset_id: Dataset fingerprint
+            name: Artifact name
+            params: Parameters it was saved with
+
+        Returns:
+            DataFrame, or None if no such artifact is stored
+        """
+        with self._lock:
+            catalog = self._read(
+                "SELECT table_name, columns FROM artifacts WHERE dataset_id = ? AND name = ? AND params = ?",
+                [dataset_id, name, _params_key(params)]
+            )
+            if catalog.empty:
+                return None
+            kinds = json.loads(catalog.at[0, 'columns'])
+            if pd.isna(catalog.at[0, 'table_name']):
+                return pd.DataFrame(columns=list(kinds))
+            frame = self._read(f'SELECT * FROM "{catalog.at[0, "table_name"]}"')
+        return _decode(frame, kinds)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="List or query the tables stored in an analytics workspace")
+    parser.add_argument('path', help="Workspace database file")
+    parser.add_argument('sql', nargs='?', default=None, help="Query to run; without one, the catalogs are listed")
+    parser.add_argument('--backend', choices=WORKSPACE_BACKENDS, default=None)
+    args = parser.parse_args()
+
+    workspace = Workspace(args.path, args.backend)
+    with pd.option_context('display.max_rows', 100, 'display.max_columns', None, 'display.width', 200):
+        if args.sql:
+            print(workspace.query(args.sql))
+        else:
+            print(workspace.list_datasets(), end='\n\n')
+            print(workspace.list_artifacts())
+    workspace.close()